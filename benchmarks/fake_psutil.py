@@ -0,0 +1,78 @@
+import random
+import time
+from collections import namedtuple
+
+pmem = namedtuple('pmem', ['rss', 'vms'])
+pcputimes = namedtuple('pcputimes', ['user', 'system'])
+
+COMMON_NAMES = [
+    "chrome", "chrome.exe", "firefox", "code", "node", "python", "python3", "java", "postgres", "nginx",
+    "svchost.exe", "explorer.exe", "bash", "zsh", "sshd", "systemd", "dbus-daemon", "containerd-shim",
+    "kworker/0:1", "gunicorn", "redis-server", "docker", "slack", "teams.exe", "RuntimeBroker.exe",
+]
+STATUSES = ["running", "sleeping", "sleeping", "sleeping", "idle", "disk-sleep", "zombie"]
+# Above the pid range any real OS hands out, so a stray kill can only miss
+FIRST_PID = 1 << 30
+
+
+class FakeProcess:
+    __slots__ = ('info',)
+
+    def __init__(self, info):
+        self.info = info
+
+
+# Synthetic stand-in for psutil.process_iter: `count` processes whose memory
+# and CPU time drift on every tick(), while `churn` of them exit and are
+# replaced by new pids. A share of the names is unique per process, like
+# the worker/helper processes on a busy machine. Most processes are children
+# of an earlier one; the rest (and orphans whose parent exited) are roots.
+class FakeProcessTable:
+    def __init__(self, count, churn=0.02, unique_names=0.05, roots=0.1, seed=0):
+        self.churn = churn
+        self.unique_names = unique_names
+        self.roots = roots
+        self.random = random.Random(seed)
+        self.now = time.time()
+        self.next_pid = FIRST_PID
+        self.processes = []
+        for _ in range(count):
+            self.processes.append(self._spawn())
+
+    def _spawn(self):
+        rng = self.random
+        pid = self.next_pid
+        self.next_pid += 1
+        ppid, started = 0, self.now - 86400
+        if self.processes and rng.random() >= self.roots:
+            parent = rng.choice(self.processes).info
+            ppid, started = parent['pid'], parent['create_time']
+        if rng.random() < self.unique_names:
+            name = f"worker-{pid}"
+        else:
+            name = rng.choice(COMMON_NAMES)
+        rss = int(rng.lognormvariate(17, 1.5))
+        return FakeProcess({
+            'pid': pid, 'ppid': ppid, 'name': name, 'status': rng.choice(STATUSES),
+            'memory_info': pmem(rss, rss * 2), 'create_time': rng.uniform(started, self.now),
+            'cpu_times': pcputimes(rng.uniform(0, 500), rng.uniform(0, 100)),
+        })
+
+    def __len__(self):
+        return len(self.processes)
+
+    def tick(self, seconds=2.0):
+        rng = self.random
+        self.now += seconds
+        replaced = int(len(self.processes) * self.churn)
+        for i in rng.sample(range(len(self.processes)), replaced):
+            self.processes[i] = self._spawn()
+        for proc in self.processes:
+            info = proc.info
+            rss = max(4096, int(info['memory_info'].rss * rng.uniform(0.95, 1.05)))
+            cpu = info['cpu_times']
+            info['memory_info'] = pmem(rss, rss * 2)
+            info['cpu_times'] = pcputimes(cpu.user + rng.uniform(0, seconds * 0.1), cpu.system)
+
+    def process_iter(self, attrs=None):
+        return iter(list(self.processes))
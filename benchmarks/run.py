@@ -0,0 +1,355 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import psutil
+from PyQt6.QtCore import QEventLoop, QTimer, QT_VERSION_STR
+from PyQt6.QtWidgets import QApplication
+
+from src.app import TaskKillerApp
+from src.control_api import ControlAPI
+from src.daemon import SchedulerDaemon
+from src.details import fetch_details
+from src.fleet import AgentServer, FleetAgent, FleetClient, SnapshotSource, snapshot_delta
+from src.process_groups import ProcessGroups
+from src.process_tree import ProcessTree
+from src.recording import SnapshotReader
+from src.snapshot import collect_snapshot
+from benchmarks.fake_psutil import FakeProcessTable, FIRST_PID
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+KEYSTROKES = ["c", "ch", "chr", "chro", "chrom", "chrome", "chrom", "chro", "chr", "ch", "c", "",
+              "mem>100", "worker-", "/^py/", "pid:1073"]
+# Never-used pids far above FIRST_PID: kills against them always miss
+MISSING_PID = FIRST_PID * 2
+
+
+def summarize(benchmark, size, samples, **extra):
+    samples = sorted(samples)
+    result = {
+        'benchmark': benchmark, 'processes': size, 'samples': len(samples),
+        'mean_ms': round(statistics.fmean(samples), 3),
+        'p50_ms': round(samples[len(samples) // 2], 3),
+        'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        'max_ms': round(samples[-1], 3),
+    }
+    result.update(extra)
+    print(f"  {benchmark:<24}{size:>8}  mean {result['mean_ms']:9.2f} ms  p95 {result['p95_ms']:9.2f} ms")
+    return result
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def wait_for(signal, timeout_ms=60000):
+    loop = QEventLoop()
+    signal.connect(loop.quit)
+    QTimer.singleShot(timeout_ms, loop.quit)
+    loop.exec()
+    signal.disconnect(loop.quit)
+
+
+def new_window(table):
+    window = TaskKillerApp(process_iter=table.process_iter if table else psutil.process_iter)
+    window.auto_refresh_check.setChecked(False)
+    window.show()
+    window.on_first_frame()
+    wait_for(window.collector.snapshot_ready)
+    return window
+
+
+def close_window(window):
+    window.collector.stop()
+    window.kill_engine.stop()
+    window.logger.removeHandler(window.log_buffer)
+    window.deleteLater()
+
+
+def bench_refresh(window, table, size, repeat):
+    end_to_end, collect, apply = [], [], []
+    for _ in range(repeat):
+        table.tick()
+        start = time.perf_counter()
+        window.refresh_process_list()
+        wait_for(window.collector.snapshot_ready)
+        end_to_end.append((time.perf_counter() - start) * 1000)
+    previous = window.current_processes
+    for _ in range(repeat):
+        table.tick()
+        start = time.perf_counter()
+        snapshot = collect_snapshot(previous, table.process_iter)
+        collect.append((time.perf_counter() - start) * 1000)
+        apply.append(timed(window.on_snapshot_ready, snapshot))
+        previous = snapshot
+    return [summarize("refresh", size, end_to_end),
+            summarize("refresh.collect", size, collect),
+            summarize("refresh.apply_gui", size, apply)]
+
+
+def bench_filter(window, size, repeat):
+    samples = []
+    for _ in range(repeat):
+        for text in KEYSTROKES:
+            window.search_bar.setText(text)
+            samples.append(timed(window.filter_processes))
+    window.search_bar.setText("")
+    window.filter_processes()
+    return [summarize("filter.keystroke", size, samples)]
+
+
+def bench_tree(window, table, size, repeat):
+    build, apply = [], []
+    window.tree_view_check.setChecked(True)
+    model = window.tree_model
+    model.fetchMore(window.process_tree.rootIndex())
+    window.process_tree.expand(model.index(0, 0))
+    previous = window.current_processes
+    for _ in range(repeat):
+        table.tick()
+        snapshot = collect_snapshot(previous, table.process_iter)
+        build.append(timed(ProcessTree, snapshot))
+        snapshot.tree()
+        apply.append(timed(window.on_snapshot_ready, snapshot))
+        previous = snapshot
+    window.tree_view_check.setChecked(False)
+    return [summarize("tree.build", size, build),
+            summarize("tree.apply_gui", size, apply)]
+
+
+def bench_groups(window, table, size, repeat):
+    build, apply = [], []
+    window.group_view_check.setChecked(True)
+    window.process_groups.expand(window.group_model.index(0, 0))
+    previous = window.current_processes
+    for _ in range(repeat):
+        table.tick()
+        snapshot = collect_snapshot(previous, table.process_iter)
+        build.append(timed(ProcessGroups, snapshot))
+        snapshot.groups()
+        apply.append(timed(window.on_snapshot_ready, snapshot))
+        previous = snapshot
+    window.group_view_check.setChecked(False)
+    return [summarize("groups.build", size, build),
+            summarize("groups.apply_gui", size, apply)]
+
+
+# Loopback agents that each serve the synthetic table, polled by one fleet
+# client: a full round after the first sync, and the size of one agent's
+# delta on the wire
+def bench_fleet(table, size, repeat, hosts):
+    daemon = SchedulerDaemon()
+    servers = [AgentServer(FleetAgent(ControlAPI(daemon.engine, daemon), "bench",
+                                      SnapshotSource(0, table.process_iter)), 0) for _ in range(hosts)]
+    done = threading.Event()
+    fleet = FleetClient(["%s:%d" % server.address for server in servers], "bench", lambda snapshot: done.set())
+    fleet.start()
+
+    def poll():
+        done.clear()
+        fleet.refresh()
+        done.wait(60)
+    poll()
+    rounds, wire = [], []
+    previous = collect_snapshot(None, table.process_iter)
+    for _ in range(repeat):
+        table.tick()
+        rounds.append(timed(poll))
+        snapshot = collect_snapshot(previous, table.process_iter)
+        wire.append(len(json.dumps(snapshot_delta(previous, snapshot), separators=(',', ':'))))
+        previous = snapshot
+    full = len(json.dumps(snapshot_delta(None, previous), separators=(',', ':')))
+    fleet.stop()
+    for server in servers:
+        server.shutdown()
+    return [summarize("fleet.poll", size * hosts, rounds, hosts=hosts,
+                      delta_bytes=round(statistics.fmean(wire)), full_bytes=full)]
+
+
+# Per-process cost of the detail columns on this machine's real processes,
+# which is why they are only fetched for the rows on screen
+def bench_details(count):
+    snapshot = collect_snapshot()
+    rows = range(min(count, len(snapshot)))
+    samples = [timed(fetch_details, snapshot.pids[i], snapshot.create_times[i]) for i in rows]
+    return [summarize("details.fetch", len(samples), samples)]
+
+
+# Recorded snapshots from a real machine pushed through the same GUI path
+def bench_replay(path):
+    reader = SnapshotReader(path)
+    window = new_window(None)
+    size = max(len(reader.snapshot(k)) for k in range(0, len(reader), max(1, len(reader) // 10)))
+    decode, apply = [], []
+    for k in range(len(reader)):
+        start = time.perf_counter()
+        snapshot = reader.snapshot(k)
+        decode.append((time.perf_counter() - start) * 1000)
+        apply.append(timed(window.on_snapshot_ready, snapshot))
+    results = [summarize("replay.decode", size, decode),
+               summarize("replay.apply_gui", size, apply)]
+    results += bench_filter(window, size, 1)
+    close_window(window)
+    reader.close()
+    return results
+
+
+def make_tasks(count, deadline, first_pid):
+    return [{'pid': first_pid + i, 'name': f"bench-{i}", 'create_time': 1.0, 'tree': False, 'mode': 'Timer',
+             'deadline': deadline} for i in range(count)]
+
+
+def bench_scheduler(window, queued, due, repeat):
+    tasks = make_tasks(queued, time.time() + 3600, MISSING_PID)
+    window.add_task_items(tasks)
+    for task in tasks:
+        window.engine.schedule(task)
+    idle = [timed(window.check_scheduled_tasks) for _ in range(repeat)]
+    bursts = []
+    for r in range(repeat):
+        batch = make_tasks(due, time.time() - 1, MISSING_PID + queued + r * due)
+        window.add_task_items(batch)
+        for task in batch:
+            window.engine.schedule(task)
+        bursts.append(timed(window.check_scheduled_tasks))
+        wait_for(window.kill_engine.batch_finished)
+    for task in list(window.engine.tasks.values()):
+        window.cleanup_task(task)
+    return [summarize("scheduler.tick_idle", queued, idle),
+            summarize("scheduler.tick_due", queued, bursts, due=due)]
+
+
+def spawn_children(count):
+    children = [subprocess.Popen([sys.executable, "-c", "import time; time.sleep(120)"]) for _ in range(count)]
+    tasks = []
+    for child in children:
+        proc = psutil.Process(child.pid)
+        tasks.append({'pid': child.pid, 'name': proc.name(), 'create_time': proc.create_time(), 'type': 'instant'})
+    return children, tasks
+
+
+def bench_kill(window, single, batch):
+    window.kill_engine.grace = 1.0
+    children, tasks = spawn_children(single)
+    latencies = []
+    try:
+        for task in tasks:
+            start = time.perf_counter()
+            window.execute_kill(task)
+            wait_for(window.kill_engine.batch_finished)
+            latencies.append((time.perf_counter() - start) * 1000)
+    finally:
+        for child in children:
+            child.kill()
+            child.wait()
+    children, tasks = spawn_children(batch)
+    try:
+        start = time.perf_counter()
+        window.execute_kills(tasks)
+        wait_for(window.kill_engine.batch_finished)
+        batch_ms = (time.perf_counter() - start) * 1000
+    finally:
+        for child in children:
+            child.kill()
+            child.wait()
+    return [summarize("execute_kill", single, latencies),
+            summarize("execute_kills.batch", batch, [batch_ms])]
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {(r['benchmark'], r['processes']): r for r in json.load(f)['results']}
+    print(f"\nCompared with {baseline_path}:")
+    for r in results:
+        old = baseline.get((r['benchmark'], r['processes']))
+        if old and old['mean_ms'] > 0:
+            ratio = r['mean_ms'] / old['mean_ms']
+            print(f"  {r['benchmark']:<24}{r['processes']:>8}  {old['mean_ms']:9.2f} -> {r['mean_ms']:9.2f} ms"
+                  f"  ({ratio:.2f}x)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Qt-XKiller synthetic-load benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="process counts to simulate")
+    parser.add_argument("--churn", type=float, default=0.02, help="share of processes replaced per refresh")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--tasks", type=int, default=5000, help="scheduled kills queued for the tick benchmark")
+    parser.add_argument("--due", type=int, default=500, help="of which fire in a single tick")
+    parser.add_argument("--kills", type=int, default=10, help="real child processes killed one at a time")
+    parser.add_argument("--kill-batch", type=int, default=50, help="real child processes killed in one batch")
+    parser.add_argument("--output", default="benchmark-report.json")
+    parser.add_argument("--baseline", metavar="REPORT", help="earlier report to compare against")
+    parser.add_argument("--recording", metavar="FILE", help="also replay a recording made with --record")
+    parser.add_argument("--details", type=int, default=200, help="real processes whose detail columns are fetched")
+    parser.add_argument("--fleet-hosts", type=int, default=4, help="loopback agents polled by the fleet benchmark")
+    args = parser.parse_args(argv)
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    results = []
+    for size in args.sizes:
+        print(f"{size} synthetic processes")
+        table = FakeProcessTable(size, churn=args.churn)
+        window = new_window(table)
+        results += bench_refresh(window, table, size, args.repeat)
+        results += bench_filter(window, size, args.repeat)
+        results += bench_tree(window, table, size, args.repeat)
+        results += bench_groups(window, table, size, args.repeat)
+        close_window(window)
+        results += bench_fleet(table, size, args.repeat, args.fleet_hosts)
+
+    if args.recording:
+        print(f"Recording {args.recording}")
+        results += bench_replay(args.recording)
+
+    print("Scheduler and kills")
+    window = new_window(FakeProcessTable(100))
+    results += bench_scheduler(window, args.tasks, args.due, args.repeat)
+    results += bench_kill(window, args.kills, args.kill_batch)
+    close_window(window)
+    print("Process details")
+    results += bench_details(args.details)
+
+    report = {
+        'meta': {
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'qt': QT_VERSION_STR,
+            'psutil': psutil.__version__,
+            'cpus': os.cpu_count(),
+            'churn': args.churn,
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {args.output}")
+    if args.baseline:
+        compare(results, args.baseline)
+    app.processEvents()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -48,7 +48,7 @@ def main():
     
     # 3. Build Main App
     print("\n[1/3] Building Main Application...")
-    cmd = f'pyinstaller --noconfirm --onefile --windowed --name "Qt-XKiller" {icon_arg} --add-data "src;src" --hidden-import "qtawesome" --hidden-import "qt_material" main.py'
+    cmd = f'pyinstaller --noconfirm --onefile --windowed --name "Qt-XKiller" {icon_arg} --add-data "src;src" --hidden-import "qtawesome" --hidden-import "qt_material" --exclude-module "tkinter" main.py'
     run_command(cmd)
     
     if not os.path.exists("dist/Qt-XKiller.exe"):
@@ -1,19 +1,126 @@
-
 import sys
-from PyQt6.QtWidgets import QApplication
-from qt_material import apply_stylesheet
-from src.app import TaskKillerApp
+import argparse
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="Qt-XKiller")
+    parser.add_argument("--daemon", action="store_true",
+                        help="run the kill scheduler headless, without loading Qt")
+    parser.add_argument("--task", action="append", default=[], metavar="PID@WHEN",
+                        help="(daemon) schedule a kill, e.g. 1234@+10m or 1234@23:00")
+    parser.add_argument("--recurring", action="append", default=[], metavar="NAME@SCHEDULE",
+                        help="(daemon) kill every process with this name on a schedule, "
+                             "e.g. 'steam@weekdays 23:00' or 'backup*@every 2h'")
+    parser.add_argument("--kill-on-launch", action="append", default=[], metavar="PATTERN",
+                        help="(daemon) kill processes whose name matches as soon as they start, e.g. 'miner*'")
+    parser.add_argument("--whitelist", action="append", default=[], metavar="RULE",
+                        help="(daemon) protect a process name or pattern, e.g. sshd, 'python*', 'cmd:*--prod*'")
+    parser.add_argument("--exit-when-idle", action="store_true",
+                        help="(daemon) exit once every scheduled kill has fired")
+    parser.add_argument("--grace", type=float, default=3.0,
+                        help="(daemon) seconds to wait after terminate before force killing")
+    parser.add_argument("--state", metavar="FILE",
+                        help="where scheduled kills and the whitelist are saved (default: per-user state directory)")
+    parser.add_argument("--no-state", action="store_true",
+                        help="keep scheduled kills and the whitelist in memory only")
+    parser.add_argument("--log-file", metavar="FILE",
+                        help="append JSON-lines logs to FILE, rotated at 5 MB "
+                             "(GUI default: qt-xkiller.log in the state directory, none with --no-state)")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                        help="serve Prometheus metrics on http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--metrics-file", metavar="FILE",
+                        help="rewrite Prometheus metrics to FILE every 15 s (textfile collector)")
+    parser.add_argument("--api-port", type=int, metavar="PORT",
+                        help="serve the JSON control API on 127.0.0.1:PORT (0 picks a free port)")
+    parser.add_argument("--api-token-file", metavar="FILE",
+                        help="where the control API's bearer token is written (default: state directory)")
+    parser.add_argument("--record", metavar="FILE",
+                        help="append every process snapshot to a recording file (continued if it exists)")
+    parser.add_argument("--record-interval", type=float, default=5.0, metavar="SECONDS",
+                        help="(daemon) seconds between recorded snapshots")
+    parser.add_argument("--replay", metavar="FILE",
+                        help="(GUI) browse a recording instead of the live process list")
+    parser.add_argument("--agent-port", type=int, metavar="PORT",
+                        help="(daemon) serve this host's processes to fleet views on PORT")
+    parser.add_argument("--agent-host", default="127.0.0.1", metavar="ADDRESS",
+                        help="(daemon) address the agent listens on (default: 127.0.0.1); traffic is not encrypted")
+    parser.add_argument("--fleet", action="append", default=[], metavar="HOST:PORT",
+                        help="(GUI) list and kill processes on the agent at HOST:PORT; repeat for more hosts")
+    parser.add_argument("--fleet-token-file", metavar="FILE",
+                        help="token shared by agents and fleet views, created if missing (default: state directory)")
+    parser.add_argument("--profile-startup", nargs="?", const="-", metavar="FILE",
+                        help="print startup phase timings (to stderr, or FILE) once the process list is shown")
+    # Unknown arguments are left for Qt
+    return parser.parse_known_args(argv)[0]
+
+
+# Starts the requested metrics exports; returns a callable that stops them
+def start_metrics(args):
+    if not args.metrics_port and not args.metrics_file:
+        return lambda: None
+    from src.metrics import TextfileWriter, start_metrics_server
+    server = start_metrics_server(args.metrics_port) if args.metrics_port else None
+    writer = TextfileWriter(args.metrics_file) if args.metrics_file else None
+    if writer:
+        writer.start()
+
+    def stop():
+        if server:
+            server.shutdown()
+        if writer:
+            writer.stop()
+    return stop
+
+
+def run_gui(args):
+    from src.startup import PROFILER
+    if args.profile_startup:
+        PROFILER.enable(args.profile_startup)
+
+    from PyQt6.QtWidgets import QApplication
+    PROFILER.mark("import Qt")
+    from qt_material import apply_stylesheet
+    PROFILER.mark("import qt_material")
+    from src.app import TaskKillerApp
+    PROFILER.mark("import app")
 
-def main():
     app = QApplication(sys.argv)
     app.setQuitOnLastWindowClosed(False)
+    PROFILER.mark("QApplication")
     
     # Theme
     apply_stylesheet(app, theme='dark_cyan.xml')
+    PROFILER.mark("stylesheet")
 
-    window = TaskKillerApp()
+    import logging
+    from src.logs import LOGGER_NAME, start_file_sink
+    from src.store import default_path
+    state_path = None if args.no_state else (args.state or default_path("state.db"))
+    # --no-state writes no log file unless one is asked for
+    log_path = args.log_file or (None if args.no_state else default_path("qt-xkiller.log"))
+    log_listener = start_file_sink(logging.getLogger(LOGGER_NAME), log_path) if log_path else None
+    stop_metrics = start_metrics(args)
+    window = TaskKillerApp(state_path, api_port=args.api_port,
+                           api_token_path=args.api_token_file or default_path("api-token"),
+                           record_path=args.record, replay_path=args.replay, fleet_hosts=args.fleet,
+                           fleet_token_path=args.fleet_token_file or default_path("fleet-token"))
     window.show()
-    sys.exit(app.exec())
+    code = app.exec()
+    stop_metrics()
+    if log_listener:
+        log_listener.stop()
+    sys.exit(code)
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    if args.daemon:
+        from src.daemon import run_daemon
+        stop_metrics = start_metrics(args)
+        code = run_daemon(args)
+        stop_metrics()
+        sys.exit(code)
+    run_gui(args)
 
 if __name__ == "__main__":
     main()
@@ -1,37 +1,201 @@
 
 import sys
+import time
+from collections import Counter
 import psutil
-import datetime
-import qtawesome as qta
+import logging
+import sqlite3
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, 
-                             QHBoxLayout, QTableWidget, QTableWidgetItem, 
+                             QHBoxLayout, QTableView, QTreeView, QAbstractItemView, QStackedWidget,
                              QPushButton, QLineEdit, QLabel, QHeaderView, 
                              QTimeEdit, QMessageBox, QListWidget, QListWidgetItem, QSplitter,
                              QTabWidget, QSpinBox, QGroupBox, QGridLayout,
                              QSystemTrayIcon, QMenu, QStyle, QPlainTextEdit,
-                             QCheckBox, QApplication)
-from PyQt6.QtCore import Qt, QTimer, QTime, QDate, QDateTime, QSize, QEvent
+                             QCheckBox, QComboBox, QTableWidget, QTableWidgetItem, QSlider, QApplication)
+from PyQt6.QtCore import (Qt, QTimer, QTime, QDate, QDateTime, QSize, QEvent, QItemSelection,
+                          QItemSelectionModel, QModelIndex, pyqtSignal)
 from PyQt6.QtGui import QIcon, QAction
-from qt_material import apply_stylesheet
 
 from .constants import HARD_WHITELIST
+from .collector import SnapshotCollector
+from .process_model import (ProcessTableModel, ProcessTreeModel, ProcessGroupModel, COLUMNS, DETAIL_COLUMNS,
+                            FLEET_COLUMNS, HISTORY_COLUMN)
+from .details import DetailCache
+from .history import MetricsHistory
+from .sparkline import SparklineDelegate, HistoryGraph
+from .diff import diff_snapshots
+from .snapshot import task_key
+from .search import SearchIndex
+from .engine import KillerEngine
+from .kill_engine import KillEngine
+from .killer import DEFAULT_GRACE, describe_result
+from .rules import RuleEngine, parse_rule
+from .procwatch import LaunchWatcher
+from .recording import SnapshotReader, SnapshotRecorder
+from .recurrence import make_recurring_task, parse_schedule, resolve_targets, snapshot_targets
+from .icons import icon
+from .startup import PROFILER
+from .store import StateStore
+from .logs import LOGGER_NAME, LOG_CAPACITY, LogBuffer
+from .metrics import REGISTRY, FILTER, RULE_MATCH, SCHEDULER_LAG, SNAPSHOT_APPLY, TABLE_PAINT, rule_histogram
+
+AUTO_REFRESH_MS = 2000
+SEARCH_DEBOUNCE_MS = 120
+HISTORY_SAMPLES = 60
+# Upper bound on a single scheduler sleep so wall-clock jumps are noticed
+MAX_SCHEDULER_SLEEP_MS = 60 * 1000
+# Startup work still runs if the window never gets a paint event (e.g. started hidden)
+FIRST_FRAME_FALLBACK_MS = 500
+# New log lines reach the Logs tab in one batch per interval
+LOG_FLUSH_MS = 250
+LOG_LEVEL_FILTERS = [("All", logging.NOTSET), ("Warnings", logging.WARNING), ("Critical", logging.CRITICAL)]
+DIAGNOSTICS_REFRESH_MS = 1000
+DIAGNOSTICS_COLUMNS = ["Metric", "Count", "Mean (ms)", "p50 (ms)", "p95 (ms)", "Max (ms)"]
+# A filtered tree is expanded fully when it shows at most this many processes
+TREE_AUTO_EXPAND = 2000
+# Replay: scrubbing loads the frame once the slider rests this long, and
+# playback advances one recorded snapshot per step
+REPLAY_SCRUB_MS = 50
+REPLAY_STEP_MS = 500
+# Details are requested for the rows on screen once scrolling rests this
+# long, and cells are repainted at most once per interval as they arrive
+DETAIL_REQUEST_MS = 100
+DETAIL_REPAINT_MS = 50
+
+
+# QTableView that records how long each repaint takes
+class ProcessTableView(QTableView):
+    def paintEvent(self, event):
+        with TABLE_PAINT.time():
+            super().paintEvent(event)
+
+
+class ProcessTreeView(QTreeView):
+    def paintEvent(self, event):
+        with TABLE_PAINT.time():
+            super().paintEvent(event)
+
 
 class TaskKillerApp(QMainWindow):
-    def __init__(self):
+    started = False
+    # Control API requests arrive on server threads and are applied here
+    api_scheduled = pyqtSignal(list)
+    api_cancelled = pyqtSignal(list)
+    api_kill = pyqtSignal(list)
+    api_whitelist_changed = pyqtSignal()
+    # Processes matching a launch rule, reported from the launch watcher thread
+    launch_detected = pyqtSignal(dict)
+    # The launch watcher chose its event source
+    launch_watch_mode = pyqtSignal(str)
+    # Merged fleet snapshots and agent messages, from the fleet client thread
+    fleet_snapshot = pyqtSignal(object)
+    fleet_event = pyqtSignal(str, str)
+    # A process's details were fetched on a detail worker thread
+    details_ready = pyqtSignal(object)
+
+    def __init__(self, state_path=None, process_iter=psutil.process_iter, api_port=None, api_token_path=None,
+                 record_path=None, replay_path=None, fleet_hosts=None, fleet_token_path=None):
         super().__init__()
 
         self.setWindowTitle("Qt-XKiller")
         self.resize(1100, 800)
-        self.setWindowIcon(qta.icon('fa5s.robot', color='white'))
 
         # Data structures
-        self.scheduled_tasks = [] 
+        self.engine = KillerEngine()
+
+        # Logging: a bounded buffer behind the Logs tab, drained on a timer
+        self.logger = logging.getLogger(LOGGER_NAME)
+        self.logger.setLevel(logging.INFO)
+        self.log_buffer = LogBuffer(LOG_CAPACITY)
+        self.logger.addHandler(self.log_buffer)
+        self.log_flush_timer = QTimer(self)
+        self.log_flush_timer.setSingleShot(True)
+        self.log_flush_timer.setInterval(LOG_FLUSH_MS)
+        self.log_flush_timer.timeout.connect(self.flush_logs)
+        self.state_path = state_path
+        self.api_port = api_port
+        self.api_token_path = api_token_path
+        self.api_server = None
+        self.api_scheduled.connect(self.on_api_scheduled)
+        self.api_cancelled.connect(self.on_api_cancelled)
+        self.api_kill.connect(self.execute_kills)
+        self.api_whitelist_changed.connect(self.on_api_whitelist_changed)
         self.current_selection = None
-        self.current_processes = []
-        
-        # Whitelist
-        self.user_whitelist = set()
+        self.selected_processes = []
+        self.current_processes = None
+        # Fired recurring kills waiting for a snapshot to find their targets in
+        self.pending_recurring = []
+        self.search_index = None
+        self.watchdog = RuleEngine()
+        self.launch_watcher = None
+        self.launch_detected.connect(self.on_launch_detected)
+        self.launch_watch_mode.connect(
+            lambda mode: self.log_message("INFO", f"Watching process launches ({mode})."))
+        self.history = MetricsHistory(HISTORY_SAMPLES)
+        # Tree view, built the first time it is switched on. Expanded nodes
+        # are remembered by (pid, create_time) across refreshes.
+        self.process_tree = None
+        self.tree_model = None
+        self.tree_expanded = set()
+        self.tree_scroll = 0
+        # Group view, likewise built on first use. Expanded groups are
+        # remembered by name, the selection as group names and process keys.
+        self.process_groups = None
+        self.group_model = None
+        self.group_expanded = set()
+        self.group_selection = []
+        self.group_scroll = 0
+        # USS/PSS and other slow attributes, created when the detail columns
+        # are first shown and fetched only for the rows on screen
+        self.details = None
+        # Tabs are built the first time they are shown; icons are set after the first frame
+        self.lazy_tabs = {}
+        self.tab_icons = []
         
+        # Background process enumeration
+        self.collector = SnapshotCollector(self, process_iter)
+        self.collector.snapshot_ready.connect(self.on_snapshot_ready)
+        self.collector.error.connect(lambda e: self.log_message("WARNING", f"Error listing processes: {e}"))
+        self.collector.recording_error.connect(lambda e: self.log_message("WARNING", f"Recording stopped: {e}"))
+        if record_path:
+            try:
+                self.collector.set_recorder(SnapshotRecorder(record_path))
+                self.log_message("INFO", f"Recording snapshots to {record_path}.")
+            except (OSError, ValueError) as e:
+                self.log_message("WARNING", f"Could not record to {record_path}: {e}")
+
+        # Replay shows a recording instead of the live process list; the
+        # action tabs and watchdog rules stay off while it does
+        self.replay = None
+        self.replay_position = -1
+        if replay_path:
+            try:
+                self.replay = SnapshotReader(replay_path)
+                self.setWindowTitle(f"Qt-XKiller - replay of {replay_path}")
+            except (OSError, ValueError) as e:
+                self.log_message("WARNING", f"Could not open recording {replay_path}: {e}")
+
+        # Fleet mode lists the processes of remote agents instead of this
+        # machine's; kills and schedules for them are sent to their agent
+        self.fleet = None
+        if fleet_hosts and self.replay is None:
+            from .fleet import FleetClient, load_token
+            try:
+                self.fleet = FleetClient(fleet_hosts, load_token(fleet_token_path), self.fleet_snapshot.emit,
+                                         self.fleet_event.emit)
+            except (OSError, ValueError) as e:
+                self.log_message("WARNING", f"Could not set up the fleet: {e}")
+        if self.fleet:
+            self.fleet_snapshot.connect(self.on_snapshot_ready)
+            self.fleet_event.connect(self.log_message)
+            self.fleet.start()
+            self.setWindowTitle(f"Qt-XKiller - fleet of {len(self.fleet.connections)} hosts")
+
+        # Kills run off the GUI thread
+        self.kill_engine = KillEngine(self, is_protected=self.engine.is_protected)
+        self.kill_engine.result.connect(self.on_kill_result)
+        self.kill_engine.batch_finished.connect(self.on_kill_batch_finished)
+
         # System Tray Setup
         self.setup_system_tray()
 
@@ -50,45 +214,266 @@ class TaskKillerApp(QMainWindow):
 
         # Timers
         self.check_timer = QTimer()
+        self.check_timer.setSingleShot(True)
+        self.check_timer.setTimerType(Qt.TimerType.PreciseTimer)
         self.check_timer.timeout.connect(self.check_scheduled_tasks)
-        self.check_timer.start(1000) 
 
-        # Initial Load
+        self.auto_refresh_timer = QTimer()
+        self.auto_refresh_timer.timeout.connect(self.auto_refresh)
+        self.auto_refresh_timer.start(AUTO_REFRESH_MS)
+
+        # Process enumeration, icons and the tray wait until the window has painted once
+        QTimer.singleShot(FIRST_FRAME_FALLBACK_MS, self.on_first_frame)
+        PROFILER.mark("window constructed")
+
+    def event(self, event):
+        if not self.started and event.type() == QEvent.Type.Paint:
+            QTimer.singleShot(0, self.on_first_frame)
+        return super().event(event)
+
+    def on_first_frame(self):
+        if self.started: return
+        self.started = True
+        PROFILER.mark("first frame")
+        # Enumeration runs on the collector thread while icon fonts load here
         self.refresh_process_list()
-        self.refresh_whitelist_ui()
+        self.restore_state()
+        self.start_control_api()
+        self.load_icons()
         self.log_message("INFO", "Application started. Scheduler active.")
 
+    def restore_state(self):
+        if not self.state_path: return
+        try:
+            self.engine.store = StateStore(self.state_path)
+            restored, dropped = self.engine.restore(time.time())
+        except (OSError, sqlite3.Error) as e:
+            self.engine.store = None
+            self.log_message("WARNING", f"Could not open saved state {self.state_path}: {e}")
+            return
+        self.add_task_items(sorted(restored, key=lambda t: t['deadline']))
+        self.refresh_whitelist_ui()
+        if restored:
+            self.log_message("INFO", f"Restored {len(restored)} scheduled kills.")
+        if dropped:
+            self.log_message("INFO", f"Dropped {len(dropped)} overdue kills whose process already exited.")
+        self.arm_scheduler()
+        PROFILER.mark("state restored")
+
+    # After restore_state so API tasks never reuse a stored task id
+    def start_control_api(self):
+        if self.api_port is None: return
+        from .control_api import ControlAPI, start_control_server
+        try:
+            self.api_server = start_control_server(self.api_port, ControlAPI(self.engine, self), self.api_token_path)
+        except OSError as e:
+            self.log_message("WARNING", f"Could not start control API on port {self.api_port}: {e}")
+            return
+        port = self.api_server.server_address[1]
+        self.log_message("INFO", f"Control API listening on http://127.0.0.1:{port} (token in {self.api_token_path}).")
+
+    # Control API host interface, called on request threads
+    def snapshot(self):
+        return self.current_processes
+
+    def on_scheduled(self, tasks):
+        self.api_scheduled.emit(tasks)
+
+    def on_cancelled(self, tasks):
+        self.api_cancelled.emit(tasks)
+
+    def kill_now(self, tasks):
+        self.api_kill.emit([dict(t, type='instant') for t in tasks])
+
+    def on_whitelist_changed(self):
+        self.api_whitelist_changed.emit()
+
+    def on_api_scheduled(self, tasks):
+        # Some may already have fired or been cancelled
+        tasks = [t for t in tasks if t['id'] in self.engine.tasks]
+        self.add_task_items(tasks)
+        self.log_message("INFO", f"Control API scheduled {len(tasks)} kills.")
+        self.arm_scheduler()
+
+    def on_api_cancelled(self, tasks):
+        for task in tasks:
+            if 'list_item' in task:
+                self.tasks_list.takeItem(self.tasks_list.row(task['list_item']))
+        self.log_message("INFO", f"Control API cancelled {len(tasks)} kills.")
+        self.arm_scheduler()
+
+    def on_api_whitelist_changed(self):
+        self.refresh_whitelist_ui()
+        self.check_if_whitelisted()
+
+    def load_icons(self):
+        self.setWindowIcon(icon('fa5s.robot'))
+        self.tray_icon.setIcon(icon('fa5s.robot'))
+        self.tray_icon.show()
+        self.refresh_btn.setIcon(icon('fa5s.sync-alt'))
+        self.btn_kill_now.setIcon(icon('fa5s.skull-crossbones'))
+        self.btn_cancel_task.setIcon(icon('fa5s.ban'))
+        for tabs, index, name in self.tab_icons:
+            tabs.setTabIcon(index, icon(name))
+        PROFILER.mark("icons loaded")
+
+    def add_lazy_tab(self, tabs, builder, label, icon_name=None):
+        page = QWidget()
+        index = tabs.addTab(page, label)
+        self.lazy_tabs[page] = builder
+        if icon_name:
+            self.tab_icons.append((tabs, index, icon_name))
+        return page
+
+    def setup_replay_bar(self, main_layout):
+        self.auto_refresh_check.setChecked(False)
+        self.auto_refresh_check.setEnabled(False)
+        replay_layout = QHBoxLayout()
+        self.replay_play_btn = QPushButton("Play")
+        self.replay_play_btn.setCheckable(True)
+        self.replay_play_btn.toggled.connect(self.toggle_replay_playback)
+        self.replay_slider = QSlider(Qt.Orientation.Horizontal)
+        self.replay_slider.setRange(0, max(0, len(self.replay) - 1))
+        self.replay_label = QLabel("Empty recording" if not len(self.replay) else "")
+        self.replay_seek_timer = QTimer(self)
+        self.replay_seek_timer.setSingleShot(True)
+        self.replay_seek_timer.setInterval(REPLAY_SCRUB_MS)
+        self.replay_seek_timer.timeout.connect(self.show_replay_frame)
+        self.replay_slider.valueChanged.connect(self.replay_seek_timer.start)
+        self.replay_step_timer = QTimer(self)
+        self.replay_step_timer.setInterval(REPLAY_STEP_MS)
+        self.replay_step_timer.timeout.connect(self.step_replay)
+        replay_layout.addWidget(QLabel("Replay:"))
+        replay_layout.addWidget(self.replay_play_btn)
+        replay_layout.addWidget(self.replay_slider)
+        replay_layout.addWidget(self.replay_label)
+        main_layout.addLayout(replay_layout)
+
+    # Feeds the recorded snapshot under the slider through the live path
+    def show_replay_frame(self):
+        self.replay_seek_timer.stop()
+        if not len(self.replay): return
+        k = self.replay_slider.value()
+        try:
+            snapshot = self.replay.snapshot(k)
+        except ValueError as e:
+            # The view keeps the last good frame; playing on would only hit more damage
+            self.replay_play_btn.setChecked(False)
+            self.replay_step_timer.stop()
+            self.replay_label.setText(str(e))
+            self.log_message("WARNING", str(e))
+            return
+        if k != self.replay_position + 1:
+            self.history.clear()
+        self.replay_position = k
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(snapshot.timestamp))
+        self.replay_label.setText(f"{when}  ({k + 1}/{len(self.replay)}, {len(snapshot)} processes)")
+        self.on_snapshot_ready(snapshot)
+
+    def toggle_replay_playback(self, playing):
+        if playing:
+            if self.replay_slider.value() == self.replay_slider.maximum():
+                self.replay_slider.setValue(0)
+            self.replay_step_timer.start()
+        else:
+            self.replay_step_timer.stop()
+        self.replay_play_btn.setText("Pause" if playing else "Play")
+
+    def step_replay(self):
+        if self.replay_slider.value() >= self.replay_slider.maximum():
+            self.replay_play_btn.setChecked(False)
+            return
+        self.replay_slider.setValue(self.replay_slider.value() + 1)
+        self.show_replay_frame()
+
+    def build_lazy_tab(self, tabs, index):
+        page = tabs.widget(index)
+        builder = self.lazy_tabs.pop(page, None)
+        if builder:
+            builder(page)
+
     def setup_ui(self, main_layout):
         # --- Top Bar ---
         top_bar_layout = QHBoxLayout()
         self.search_bar = QLineEdit()
-        self.search_bar.setPlaceholderText("Search process by name or PID...")
+        self.search_bar.setPlaceholderText("Search name or PID... (pid:123  mem>500  cpu>50  status:zombie  /regex/)")
         self.search_bar.setClearButtonEnabled(True)
-        self.search_bar.textChanged.connect(self.filter_processes)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.filter_processes)
+        self.search_bar.textChanged.connect(self.search_timer.start)
+        self.search_bar.returnPressed.connect(self.filter_processes)
         
         self.refresh_btn = QPushButton("Refresh List")
-        self.refresh_btn.setIcon(qta.icon('fa5s.sync-alt', color='white'))
         self.refresh_btn.setCursor(Qt.CursorShape.PointingHandCursor)
         self.refresh_btn.clicked.connect(self.refresh_process_list)
 
+        self.auto_refresh_check = QCheckBox("Auto-refresh")
+        self.auto_refresh_check.setChecked(True)
+        self.auto_refresh_check.toggled.connect(self.toggle_auto_refresh)
+
+        self.tree_view_check = QCheckBox("Tree view")
+        self.tree_view_check.toggled.connect(self.set_tree_mode)
+        self.group_view_check = QCheckBox("Group by name")
+        self.group_view_check.toggled.connect(self.set_group_mode)
+        self.details_check = QCheckBox("Details")
+        self.details_check.setToolTip("USS, PSS, threads, open files, I/O and user of the rows on screen")
+        self.details_check.toggled.connect(self.set_details_mode)
+        self.detail_request_timer = QTimer(self)
+        self.detail_request_timer.setSingleShot(True)
+        self.detail_request_timer.setInterval(DETAIL_REQUEST_MS)
+        self.detail_request_timer.timeout.connect(self.request_visible_details)
+        self.detail_repaint_timer = QTimer(self)
+        self.detail_repaint_timer.setSingleShot(True)
+        self.detail_repaint_timer.setInterval(DETAIL_REPAINT_MS)
+        self.details_ready.connect(self.on_details_ready)
+
         top_bar_layout.addWidget(QLabel("Process Filter:"))
         top_bar_layout.addWidget(self.search_bar)
+        top_bar_layout.addWidget(self.tree_view_check)
+        top_bar_layout.addWidget(self.group_view_check)
+        top_bar_layout.addWidget(self.details_check)
+        top_bar_layout.addWidget(self.auto_refresh_check)
         top_bar_layout.addWidget(self.refresh_btn)
         main_layout.addLayout(top_bar_layout)
+        if self.replay is not None:
+            self.setup_replay_bar(main_layout)
+        if self.fleet:
+            # Parent pids mean nothing across hosts
+            self.tree_view_check.setEnabled(False)
+        if self.fleet or self.replay is not None:
+            # Details are read from this machine's live processes
+            self.details_check.setEnabled(False)
 
         # --- Splitter ---
         splitter = QSplitter(Qt.Orientation.Vertical)
         main_layout.addWidget(splitter)
 
         # --- Process Table ---
-        self.process_table = QTableWidget()
-        self.process_table.setColumnCount(4)
-        self.process_table.setHorizontalHeaderLabels(["PID", "Name", "Status", "Memory (MB)"])
+        self.process_model = ProcessTableModel(self)
+        self.process_model.history = self.history
+        if self.fleet:
+            self.process_model.set_columns(FLEET_COLUMNS)
+        self.process_table = ProcessTableView()
+        self.process_table.setModel(self.process_model)
         self.process_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
-        self.process_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.process_table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
-        self.process_table.itemSelectionChanged.connect(self.on_process_selected)
-        splitter.addWidget(self.process_table)
+        self.process_table.setItemDelegateForColumn(HISTORY_COLUMN, SparklineDelegate(self.process_table))
+        self.process_table.setColumnWidth(HISTORY_COLUMN, 140)
+        self.process_table.verticalHeader().setVisible(False)
+        self.process_table.verticalHeader().setDefaultSectionSize(24)
+        self.process_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.process_table.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.process_table.setSortingEnabled(True)
+        self.process_table.sortByColumn(-1, Qt.SortOrder.AscendingOrder)
+        self.process_table.selectionModel().selectionChanged.connect(self.on_process_selected)
+        self.process_table.verticalScrollBar().valueChanged.connect(self.schedule_detail_request)
+        self.process_model.modelReset.connect(self.schedule_detail_request)
+        self.process_model.layoutChanged.connect(self.schedule_detail_request)
+        self.detail_repaint_timer.timeout.connect(self.process_model.refresh_details)
+        self.process_views = QStackedWidget()
+        self.process_views.addWidget(self.process_table)
+        splitter.addWidget(self.process_views)
 
         # --- Bottom Control Area ---
         bottom_widget = QWidget()
@@ -103,6 +488,9 @@ class TaskKillerApp(QMainWindow):
         self.selected_label.setStyleSheet("font-weight: bold; font-size: 14px; color: #00d0ff;")
         action_layout.addWidget(self.selected_label)
 
+        self.kill_tree_check = QCheckBox("Kill process tree (include all child processes)")
+        action_layout.addWidget(self.kill_tree_check)
+
         self.tabs = QTabWidget()
         self.tabs.setEnabled(False)
         
@@ -130,18 +518,33 @@ class TaskKillerApp(QMainWindow):
         tab_instant = QWidget()
         lay_instant = QVBoxLayout(tab_instant)
         self.btn_kill_now = QPushButton("TERMINATE IMMEDIATELY")
-        self.btn_kill_now.setIcon(qta.icon('fa5s.skull-crossbones', color='white'))
         self.btn_kill_now.setIconSize(QSize(24, 24))
         self.btn_kill_now.setStyleSheet("background-color: #d32f2f; color: white; font-weight: bold; padding: 15px;")
         self.btn_kill_now.setCursor(Qt.CursorShape.PointingHandCursor)
         self.btn_kill_now.clicked.connect(self.kill_process_now)
+        self.spin_grace = QSpinBox()
+        self.spin_grace.setRange(0, 60)
+        self.spin_grace.setValue(int(DEFAULT_GRACE))
+        self.spin_grace.setSuffix(" s")
+        self.spin_grace.valueChanged.connect(self.set_grace_period)
+        grace_layout = QHBoxLayout()
+        grace_layout.addWidget(QLabel("Grace period before force kill:"))
+        grace_layout.addWidget(self.spin_grace)
         lay_instant.addWidget(QLabel("Warning: Stops process immediately."))
         lay_instant.addWidget(self.btn_kill_now)
+        lay_instant.addLayout(grace_layout)
         lay_instant.addStretch()
-        self.tabs.addTab(tab_instant, qta.icon('fa5s.bolt', color='white'), "Instant")
+        self.tabs.addTab(tab_instant, "Instant")
+        self.tab_icons.append((self.tabs, 0, 'fa5s.bolt'))
+
+        self.add_lazy_tab(self.tabs, self.build_timer_tab, "Timer", 'fa5s.stopwatch')
+        self.add_lazy_tab(self.tabs, self.build_clock_tab, "Clock", 'fa5s.clock')
+        self.recurring_name = None
+        self.add_lazy_tab(self.tabs, self.build_recurring_tab, "Recurring", 'fa5s.redo')
+        self.tab_whitelist = self.add_lazy_tab(self.tabs, self.build_whitelist_tab, "Whitelist", 'fa5s.shield-alt')
+        self.tabs.currentChanged.connect(lambda i: self.build_lazy_tab(self.tabs, i))
 
-        # 2. Timer
-        tab_countdown = QWidget()
+    def build_timer_tab(self, tab_countdown):
         lay_countdown = QGridLayout(tab_countdown)
         self.spin_hours = QSpinBox()
         self.spin_hours.setRange(0, 24)
@@ -153,37 +556,53 @@ class TaskKillerApp(QMainWindow):
         lay_countdown.addWidget(QLabel("Minutes:"), 1, 0)
         lay_countdown.addWidget(self.spin_minutes, 1, 1)
         self.btn_schedule_timer = QPushButton("Schedule Countdown")
-        self.btn_schedule_timer.setIcon(qta.icon('fa5s.hourglass-start', color='white'))
+        self.btn_schedule_timer.setIcon(icon('fa5s.hourglass-start'))
         self.btn_schedule_timer.clicked.connect(self.schedule_timer_kill)
         lay_countdown.addWidget(self.btn_schedule_timer, 2, 0, 1, 2)
         lay_countdown.setRowStretch(3, 1)
-        self.tabs.addTab(tab_countdown, qta.icon('fa5s.stopwatch', color='white'), "Timer")
 
-        # 3. Clock
-        tab_time = QWidget()
+    def build_clock_tab(self, tab_time):
         lay_time = QVBoxLayout(tab_time)
         self.time_edit = QTimeEdit()
         self.time_edit.setDisplayFormat("HH:mm:ss")
         self.time_edit.setTime(QTime.currentTime().addSecs(60))
         self.btn_schedule_time = QPushButton("Schedule Time")
-        self.btn_schedule_time.setIcon(qta.icon('fa5s.calendar-times', color='white'))
+        self.btn_schedule_time.setIcon(icon('fa5s.calendar-times'))
         self.btn_schedule_time.clicked.connect(self.schedule_time_kill)
         lay_time.addWidget(QLabel("Select Time:"))
         lay_time.addWidget(self.time_edit)
         lay_time.addWidget(self.btn_schedule_time)
         lay_time.addStretch()
-        self.tabs.addTab(tab_time, qta.icon('fa5s.clock', color='white'), "Clock")
 
-        # 4. Whitelist
-        self.tab_whitelist = QWidget()
-        lay_whitelist = QVBoxLayout(self.tab_whitelist)
+    def build_recurring_tab(self, tab_recurring):
+        lay_recurring = QGridLayout(tab_recurring)
+        self.recurring_name = QLineEdit()
+        self.recurring_name.setPlaceholderText("steam.exe  |  backup*")
+        if self.current_selection:
+            self.recurring_name.setText(self.current_selection['name'])
+        self.recurring_schedule = QLineEdit()
+        self.recurring_schedule.setPlaceholderText("weekdays 23:00  |  every 2h  |  0 23 * * 1-5")
+        self.recurring_schedule.textChanged.connect(self.preview_recurring_schedule)
+        self.recurring_schedule.returnPressed.connect(self.schedule_recurring_kill)
+        self.recurring_preview = QLabel("")
+        btn_schedule_recurring = QPushButton("Schedule Recurring Kill")
+        btn_schedule_recurring.clicked.connect(self.schedule_recurring_kill)
+        lay_recurring.addWidget(QLabel("Process name:"), 0, 0)
+        lay_recurring.addWidget(self.recurring_name, 0, 1)
+        lay_recurring.addWidget(QLabel("Schedule:"), 1, 0)
+        lay_recurring.addWidget(self.recurring_schedule, 1, 1)
+        lay_recurring.addWidget(self.recurring_preview, 2, 0, 1, 2)
+        lay_recurring.addWidget(btn_schedule_recurring, 3, 0, 1, 2)
+        lay_recurring.setRowStretch(4, 1)
+
+    def build_whitelist_tab(self, tab_whitelist):
+        lay_whitelist = QVBoxLayout(tab_whitelist)
         self.btn_add_whitelist = QPushButton("Add to Whitelist")
-        self.btn_add_whitelist.setIcon(qta.icon('fa5s.shield-alt', color='white'))
+        self.btn_add_whitelist.setIcon(icon('fa5s.shield-alt'))
         self.btn_add_whitelist.clicked.connect(self.add_current_to_whitelist)
         lay_whitelist.addWidget(QLabel("Protect this process from being killed."))
         lay_whitelist.addWidget(self.btn_add_whitelist)
         lay_whitelist.addStretch()
-        self.tabs.addTab(self.tab_whitelist, qta.icon('fa5s.shield-alt', color='white'), "Whitelist")
 
     def setup_info_tabs(self):
         # 1. Queue
@@ -192,33 +611,329 @@ class TaskKillerApp(QMainWindow):
         self.tasks_list = QListWidget()
         self.tasks_list.itemDoubleClicked.connect(self.cancel_task)
         queue_layout.addWidget(self.tasks_list)
-        btn_cancel = QPushButton("Cancel Selected Task")
-        btn_cancel.setIcon(qta.icon('fa5s.ban', color='white'))
-        btn_cancel.clicked.connect(self.cancel_selected_task)
-        queue_layout.addWidget(btn_cancel)
+        self.btn_cancel_task = QPushButton("Cancel Selected Task")
+        self.btn_cancel_task.clicked.connect(self.cancel_selected_task)
+        queue_layout.addWidget(self.btn_cancel_task)
         self.info_tabs.addTab(queue_tab, "Scheduled Queue")
 
-        # 2. Whitelist View
-        whitelist_tab = QWidget()
+        self.whitelist_list = None
+        self.watchdog_list = None
+        self.history_graph = None
+        self.log_viewer = None
+        self.log_level_combo = None
+        self.diagnostics_table = None
+        self.add_lazy_tab(self.info_tabs, self.build_whitelist_rules_tab, "Whitelist Rules")
+        self.add_lazy_tab(self.info_tabs, self.build_watchdog_tab, "Watchdog")
+        self.add_lazy_tab(self.info_tabs, self.build_history_tab, "History")
+        self.add_lazy_tab(self.info_tabs, self.build_logs_tab, "Logs")
+        self.diagnostics_tab = self.add_lazy_tab(self.info_tabs, self.build_diagnostics_tab, "Diagnostics")
+        self.info_tabs.currentChanged.connect(lambda i: self.build_lazy_tab(self.info_tabs, i))
+        self.info_tabs.currentChanged.connect(self.toggle_diagnostics_refresh)
+        self.diagnostics_timer = QTimer(self)
+        self.diagnostics_timer.setInterval(DIAGNOSTICS_REFRESH_MS)
+        self.diagnostics_timer.timeout.connect(self.refresh_diagnostics)
+
+    def build_whitelist_rules_tab(self, whitelist_tab):
         wl_layout = QVBoxLayout(whitelist_tab)
         self.whitelist_list = QListWidget()
         wl_layout.addWidget(self.whitelist_list)
+        wl_input_layout = QHBoxLayout()
+        self.whitelist_input = QLineEdit()
+        self.whitelist_input.setPlaceholderText("python*.exe  |  re:^java  |  exe:C:\\Tools\\*  |  cmd:*-jar app.jar*")
+        self.whitelist_input.returnPressed.connect(self.add_whitelist_rule)
+        btn_add_wl = QPushButton("Add Rule")
+        btn_add_wl.clicked.connect(self.add_whitelist_rule)
+        wl_input_layout.addWidget(self.whitelist_input)
+        wl_input_layout.addWidget(btn_add_wl)
+        wl_layout.addLayout(wl_input_layout)
         btn_remove_wl = QPushButton("Remove from Whitelist")
         btn_remove_wl.clicked.connect(self.remove_from_whitelist)
         wl_layout.addWidget(btn_remove_wl)
-        self.info_tabs.addTab(whitelist_tab, "Whitelist Rules")
-        
-        # 3. Logs
-        log_tab = QWidget()
+        self.refresh_whitelist_ui()
+
+    def build_watchdog_tab(self, watchdog_tab):
+        wd_layout = QVBoxLayout(watchdog_tab)
+        self.watchdog_list = QListWidget()
+        self.watchdog_list.addItems([rule.text for rule in self.watchdog.rules])
+        wd_layout.addWidget(self.watchdog_list)
+        wd_input_layout = QHBoxLayout()
+        self.watchdog_input = QLineEdit()
+        self.watchdog_input.setPlaceholderText("node* rss>4096 for 30s  |  * cpu>95 for 5m  |  miner* on launch")
+        self.watchdog_input.returnPressed.connect(self.add_watchdog_rule)
+        btn_add_rule = QPushButton("Add Rule")
+        btn_add_rule.clicked.connect(self.add_watchdog_rule)
+        wd_input_layout.addWidget(self.watchdog_input)
+        wd_input_layout.addWidget(btn_add_rule)
+        wd_layout.addLayout(wd_input_layout)
+        btn_remove_rule = QPushButton("Remove Selected Rule")
+        btn_remove_rule.clicked.connect(self.remove_watchdog_rule)
+        wd_layout.addWidget(btn_remove_rule)
+
+    def build_history_tab(self, history_tab):
+        history_layout = QVBoxLayout(history_tab)
+        self.history_graph = HistoryGraph()
+        history_layout.addWidget(self.history_graph)
+        self.update_history_graph()
+
+    def build_logs_tab(self, log_tab):
         log_layout = QVBoxLayout(log_tab)
+        filter_layout = QHBoxLayout()
+        self.log_level_combo = QComboBox()
+        for label, level in LOG_LEVEL_FILTERS:
+            self.log_level_combo.addItem(label, level)
+        self.log_level_combo.currentIndexChanged.connect(self.reload_log_view)
+        filter_layout.addWidget(QLabel("Show:"))
+        filter_layout.addWidget(self.log_level_combo)
+        filter_layout.addStretch()
+        log_layout.addLayout(filter_layout)
         self.log_viewer = QPlainTextEdit()
         self.log_viewer.setReadOnly(True)
+        self.log_viewer.setMaximumBlockCount(LOG_CAPACITY)
         log_layout.addWidget(self.log_viewer)
-        self.info_tabs.addTab(log_tab, "Logs")
+        self.reload_log_view()
+
+    def build_diagnostics_tab(self, diagnostics_tab):
+        layout = QVBoxLayout(diagnostics_tab)
+        self.diagnostics_table = QTableWidget(0, len(DIAGNOSTICS_COLUMNS))
+        self.diagnostics_table.setHorizontalHeaderLabels(DIAGNOSTICS_COLUMNS)
+        self.diagnostics_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.diagnostics_table.verticalHeader().setVisible(False)
+        self.diagnostics_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.diagnostics_table)
+        exports = ", ".join(REGISTRY.exports) or "off (see --metrics-port / --metrics-file)"
+        export_label = QLabel(f"Prometheus export: {exports}")
+        export_label.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse)
+        layout.addWidget(export_label)
+
+    def toggle_diagnostics_refresh(self, index):
+        # Only poll the histograms while someone is looking at them
+        if self.info_tabs.widget(index) is self.diagnostics_tab:
+            self.refresh_diagnostics()
+            self.diagnostics_timer.start()
+        else:
+            self.diagnostics_timer.stop()
+
+    def refresh_diagnostics(self):
+        if not self.isVisible():
+            self.diagnostics_timer.stop()
+            return
+        histograms = REGISTRY.histograms()
+        self.diagnostics_table.setRowCount(len(histograms))
+        for row, h in enumerate(histograms):
+            label = h.name + (f" [{', '.join(str(v) for _, v in h.labels)}]" if h.labels else "")
+            values = [label, str(h.count)] + [f"{v:.2f}" for v in (h.mean(), h.quantile(0.5), h.quantile(0.95), h.max)]
+            for column, text in enumerate(values):
+                item = self.diagnostics_table.item(row, column)
+                if item is None:
+                    item = QTableWidgetItem()
+                    if column:
+                        item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                    self.diagnostics_table.setItem(row, column, item)
+                item.setText(text)
+
+    def build_process_tree(self):
+        self.tree_model = ProcessTreeModel(self)
+        self.process_tree = ProcessTreeView()
+        self.process_tree.setModel(self.tree_model)
+        # Connected after setModel() so these run after the view's own reset
+        self.tree_model.modelAboutToBeReset.connect(self.save_tree_scroll)
+        self.tree_model.modelReset.connect(self.restore_tree_state)
+        self.process_tree.setUniformRowHeights(True)
+        self.process_tree.header().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
+        self.process_tree.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.process_tree.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.process_tree.setSortingEnabled(True)
+        self.process_tree.sortByColumn(-1, Qt.SortOrder.AscendingOrder)
+        self.process_tree.selectionModel().selectionChanged.connect(self.on_process_selected)
+        self.process_tree.expanded.connect(
+            lambda index: self.tree_expanded.add(self.tree_model.snapshot().key(index.internalId())))
+        self.process_tree.collapsed.connect(
+            lambda index: self.tree_expanded.discard(self.tree_model.snapshot().key(index.internalId())))
+        self.process_views.addWidget(self.process_tree)
+
+    def build_process_groups(self):
+        self.group_model = ProcessGroupModel(self)
+        self.process_groups = ProcessTreeView()
+        self.process_groups.setModel(self.group_model)
+        # Connected after setModel() so these run around the view's own reset
+        self.group_model.modelAboutToBeReset.connect(self.save_group_state)
+        self.group_model.modelReset.connect(self.restore_group_state)
+        self.process_groups.setUniformRowHeights(True)
+        self.process_groups.header().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.process_groups.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.process_groups.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.process_groups.setSortingEnabled(True)
+        self.process_groups.sortByColumn(-1, Qt.SortOrder.AscendingOrder)
+        self.process_groups.selectionModel().selectionChanged.connect(self.on_process_selected)
+        self.process_groups.expanded.connect(lambda index: self.group_expanded.add(self.group_name_at(index)))
+        self.process_groups.collapsed.connect(lambda index: self.group_expanded.discard(self.group_name_at(index)))
+        self.process_views.addWidget(self.process_groups)
+
+    def group_name_at(self, index):
+        return self.group_model.groups().names[self.group_model.group_at(index)]
+
+    def is_tree_mode(self):
+        return self.tree_view_check.isChecked()
+
+    def is_group_mode(self):
+        return self.group_view_check.isChecked()
+
+    def active_view(self):
+        if self.is_tree_mode():
+            return self.process_tree
+        if self.is_group_mode():
+            return self.process_groups
+        return self.process_table
+
+    def active_model(self):
+        if self.is_tree_mode():
+            return self.tree_model
+        if self.is_group_mode():
+            return self.group_model
+        return self.process_model
+
+    # Tree and group view are exclusive; unticking both shows the table
+    def set_tree_mode(self, enabled):
+        if enabled:
+            self.group_view_check.setChecked(False)
+        self.update_view_mode()
+
+    def set_group_mode(self, enabled):
+        if enabled:
+            self.tree_view_check.setChecked(False)
+        self.update_view_mode()
+
+    # Only the visible view's model follows snapshots; the other ones are
+    # brought up to date here when they are shown again
+    def update_view_mode(self):
+        if self.is_tree_mode() and self.process_tree is None:
+            self.build_process_tree()
+        if self.is_group_mode() and self.process_groups is None:
+            self.build_process_groups()
+        self.collector.set_build_tree(self.is_tree_mode())
+        self.collector.set_build_groups(self.is_group_mode())
+        view = self.active_view()
+        if self.process_views.currentWidget() is view:
+            return
+        self.process_views.setCurrentWidget(view)
+        if self.current_processes is not None:
+            rows = self.search_index.search(self.search_bar.text())
+            self.active_model().set_snapshot(self.current_processes, rows)
+        self.on_process_selected()
+
+    # Detail columns on the table view (the tree and group views keep their
+    # own columns)
+    def set_details_mode(self, enabled):
+        if enabled and self.details is None:
+            self.details = DetailCache(self.details_ready.emit)
+            self.process_model.details = self.details
+        self.process_model.set_columns(COLUMNS + DETAIL_COLUMNS if enabled else COLUMNS)
+        self.schedule_detail_request()
+
+    def schedule_detail_request(self):
+        if self.details_check.isChecked():
+            self.detail_request_timer.start()
+
+    def on_details_ready(self, key):
+        if not self.detail_repaint_timer.isActive():
+            self.detail_repaint_timer.start()
+
+    # Asks for the details of the rows between the top and bottom of the
+    # table's viewport; fetches queued for rows scrolled past are dropped
+    def request_visible_details(self):
+        if not self.details_check.isChecked() or self.is_tree_mode() or self.is_group_mode() or not self.isVisible():
+            return
+        table, model = self.process_table, self.process_model
+        count = model.rowCount()
+        # Details are read from this machine, so fleet rows have none
+        if not count or model.snapshot().hosts is not None:
+            return
+        first = max(0, table.rowAt(0))
+        last = table.rowAt(table.viewport().height() - 1)
+        if last < 0:
+            last = count - 1
+        snapshot = model.snapshot()
+        self.details.request([snapshot.key(model.snapshot_row(r)) for r in range(first, last + 1)])
+
+    def save_tree_scroll(self):
+        self.tree_scroll = self.process_tree.verticalScrollBar().value()
+
+    # A model reset drops the view's expansion and selection; put both back
+    # for every process that still exists
+    def restore_tree_state(self):
+        model, view = self.tree_model, self.process_tree
+        snapshot = model.snapshot()
+        view.blockSignals(True)
+        try:
+            if self.search_bar.text().strip() and model.visible_count() <= TREE_AUTO_EXPAND:
+                view.expandAll()
+            for key in list(self.tree_expanded):
+                row = snapshot.find(key)
+                if row is None:
+                    self.tree_expanded.discard(key)
+                    continue
+                index = model.index_of(row)
+                if index.isValid():
+                    view.setExpanded(index, True)
+        finally:
+            view.blockSignals(False)
+        selection = QItemSelection()
+        for proc in self.selected_processes:
+            row = snapshot.find(task_key(proc))
+            index = model.index_of(row) if row is not None else None
+            if index is not None and index.isValid():
+                selection.select(index, index)
+        if not selection.isEmpty():
+            view.selectionModel().select(selection, QItemSelectionModel.SelectionFlag.ClearAndSelect
+                                         | QItemSelectionModel.SelectionFlag.Rows)
+        view.doItemsLayout()
+        view.verticalScrollBar().setValue(self.tree_scroll)
+
+    def save_group_state(self):
+        view, model = self.process_groups, self.group_model
+        self.group_scroll = view.verticalScrollBar().value()
+        self.group_selection = []
+        for index in view.selectionModel().selectedRows():
+            g = model.group_at(index)
+            if g >= 0:
+                self.group_selection.append(('group', model.groups().names[g]))
+            else:
+                self.group_selection.append(('process', model.snapshot().key(model.snapshot_row(index))))
+
+    # Puts back expanded groups, the selection and the scroll position
+    # after a reset, for whatever still exists
+    def restore_group_state(self):
+        model, view = self.group_model, self.process_groups
+        snapshot, groups = model.snapshot(), model.groups()
+        group_ids = {name: g for g, name in enumerate(groups.names)}
+        view.blockSignals(True)
+        try:
+            for name in list(self.group_expanded):
+                index = model.index_of_group(group_ids.get(name, -1))
+                if index.isValid():
+                    view.setExpanded(index, True)
+                else:
+                    self.group_expanded.discard(name)
+        finally:
+            view.blockSignals(False)
+        selection = QItemSelection()
+        for kind, key in self.group_selection:
+            if kind == 'group':
+                index = model.index_of_group(group_ids.get(key, -1))
+            else:
+                row = snapshot.find(key)
+                index = model.index_of(row) if row is not None else QModelIndex()
+            if index.isValid():
+                selection.select(index, index)
+        if not selection.isEmpty():
+            view.selectionModel().select(selection, QItemSelectionModel.SelectionFlag.ClearAndSelect
+                                         | QItemSelectionModel.SelectionFlag.Rows)
+        view.doItemsLayout()
+        view.verticalScrollBar().setValue(self.group_scroll)
 
     def setup_system_tray(self):
+        # Icon is set and the tray shown in load_icons()
         self.tray_icon = QSystemTrayIcon(self)
-        self.tray_icon.setIcon(qta.icon('fa5s.robot', color='white'))
         
         tray_menu = QMenu()
         
@@ -239,7 +954,6 @@ class TaskKillerApp(QMainWindow):
         tray_menu.addAction(action_quit)
         
         self.tray_icon.setContextMenu(tray_menu)
-        self.tray_icon.show()
         
         self.tray_icon.activated.connect(self.on_tray_icon_activated)
 
@@ -258,62 +972,203 @@ class TaskKillerApp(QMainWindow):
         self.tray_icon.showMessage("Qt-XKiller", "Application running in background", QSystemTrayIcon.MessageIcon.Information, 2000)
 
     def force_quit(self):
+        if self.api_server:
+            self.api_server.shutdown()
+        if self.fleet:
+            self.fleet.stop()
+        if self.details:
+            self.details.close()
+        if self.launch_watcher:
+            self.launch_watcher.stop()
+        self.collector.stop()
+        if self.collector.recorder():
+            self.collector.recorder().close()
+        if self.replay:
+            self.replay.close()
+        self.kill_engine.stop()
+        if self.engine.store:
+            self.engine.store.close()
         QApplication.quit()
 
     def toggle_scheduler(self):
         self.scheduler_enabled = self.action_enable_scheduler.isChecked()
         status = "enabled" if self.scheduler_enabled else "disabled"
         self.log_message("INFO", f"Scheduler {status}.")
+        if self.scheduler_enabled:
+            self.check_scheduled_tasks()
+        else:
+            self.check_timer.stop()
 
     def refresh_process_list(self):
-        self.process_table.setRowCount(0)
-        self.current_processes = []
+        if self.replay is not None:
+            self.show_replay_frame()
+            return
+        if self.fleet:
+            self.fleet.refresh()
+            return
+        self.collector.request_refresh()
+
+    def toggle_auto_refresh(self, enabled):
+        if self.replay is not None:
+            return
+        if enabled or self.watchdog.rules or self.collector.recorder():
+            self.auto_refresh_timer.start(AUTO_REFRESH_MS)
+        else:
+            self.auto_refresh_timer.stop()
+
+    def auto_refresh(self):
+        # Watchdog rules and recording need samples even while minimized to tray
+        if self.replay is not None:
+            return
+        if self.watchdog.rules or self.collector.recorder() or (self.isVisible() and self.auto_refresh_check.isChecked()):
+            self.refresh_process_list()
+
+    def on_snapshot_ready(self, snapshot):
+        previous = self.current_processes
+        self.current_processes = snapshot
+        self.search_index = SearchIndex(snapshot)
+        self.history.record(snapshot)
+        query = self.search_bar.text()
+        if self.is_tree_mode() or self.is_group_mode():
+            with SNAPSHOT_APPLY.time():
+                self.active_model().set_snapshot(snapshot, self.search_index.search(query))
+        elif previous is None:
+            self.process_model.set_snapshot(snapshot, self.search_index.search(query))
+        else:
+            with SNAPSHOT_APPLY.time():
+                self.process_model.apply_diff(snapshot, diff_snapshots(previous, snapshot),
+                                              self.search_index.predicate(query))
+        if previous is None:
+            PROFILER.mark("first process list")
+            PROFILER.report()
+        if self.current_selection and not self.active_view().selectionModel().hasSelection():
+            self.on_process_selected()
+        self.update_history_graph()
+        # Expired details of the rows on screen are fetched again
+        self.schedule_detail_request()
+        self.run_watchdog()
+        if self.pending_recurring:
+            self.resolve_pending_recurring(snapshot)
+
+    def run_watchdog(self):
+        if self.replay is not None: return
+        hits = self.watchdog.evaluate(self.search_index, self.current_processes.timestamp)
+        if self.watchdog.rules:
+            RULE_MATCH.observe(self.watchdog.last_match_ms)
+            for rule, ms in zip(self.watchdog.rules, self.watchdog.last_rule_ms):
+                rule_histogram(rule.text).observe(ms)
+        tasks = {}
+        for rule, i in hits:
+            if i not in tasks:
+                task = self.process_task(self.current_processes, i)
+                self.log_message("WARNING", f"Watchdog rule '{rule.text}' triggered for {task['name']} ({task['pid']}).")
+                tasks[i] = dict(task, type='watchdog')
+        if tasks:
+            self.execute_kills(list(tasks.values()))
+
+    def add_watchdog_rule(self):
+        text = self.watchdog_input.text().strip()
+        if not text: return
         try:
-            for proc in psutil.process_iter(['pid', 'name', 'status', 'memory_info']):
-                try:
-                    info = proc.info
-                    self.current_processes.append(info)
-                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                    pass
-        except Exception as e:
-            self.log_message("WARNING", f"Error listing processes: {e}")
-        self.filter_processes()
+            rule = parse_rule(text)
+        except ValueError as e:
+            QMessageBox.warning(self, "Invalid Rule", str(e))
+            return
+        self.watchdog.set_rules(self.watchdog.rules + [rule])
+        self.watchdog_list.addItem(rule.text)
+        self.watchdog_input.clear()
+        self.toggle_auto_refresh(self.auto_refresh_check.isChecked())
+        self.update_launch_watcher()
+        self.log_message("INFO", f"Added watchdog rule '{rule.text}'.")
+
+    def remove_watchdog_rule(self):
+        row = self.watchdog_list.currentRow()
+        if row >= 0:
+            rules = list(self.watchdog.rules)
+            rule = rules.pop(row)
+            self.watchdog.set_rules(rules)
+            if rule not in rules:
+                REGISTRY.remove("rule_eval", rule=rule.text)
+            self.watchdog_list.takeItem(row)
+            self.toggle_auto_refresh(self.auto_refresh_check.isChecked())
+            self.update_launch_watcher()
+            self.log_message("INFO", f"Removed watchdog rule '{rule.text}'.")
+
+    # Runs the launch watcher only while there are launch rules
+    def update_launch_watcher(self):
+        patterns = self.watchdog.launch_patterns()
+        if not patterns:
+            if self.launch_watcher:
+                self.launch_watcher.stop()
+                self.launch_watcher = None
+            return
+        if self.launch_watcher:
+            self.launch_watcher.set_patterns(patterns)
+            return
+        # The connector handshake runs on the watcher thread, which reports its mode
+        self.launch_watcher = LaunchWatcher(patterns, self.launch_detected.emit, on_mode=self.launch_watch_mode.emit)
+        self.launch_watcher.start()
+
+    def on_launch_detected(self, task):
+        self.log_message("WARNING", f"Launch rule triggered for {task['name']} ({task['pid']}).")
+        self.execute_kills([task])
 
     def filter_processes(self):
-        query = self.search_bar.text().lower()
-        self.process_table.setRowCount(0)
-        row = 0
-        for p in self.current_processes:
-            p_name = p['name'] if p['name'] else ""
-            p_pid = str(p['pid'])
-            if query in p_name.lower() or query in p_pid:
-                self.process_table.insertRow(row)
-                self.process_table.setItem(row, 0, QTableWidgetItem(p_pid))
-                self.process_table.setItem(row, 1, QTableWidgetItem(p_name))
-                self.process_table.setItem(row, 2, QTableWidgetItem(p['status']))
-                mem_mb = p['memory_info'].rss / (1024 * 1024) if p['memory_info'] else 0
-                self.process_table.setItem(row, 3, QTableWidgetItem(f"{mem_mb:.2f} MB"))
-                row += 1
+        self.search_timer.stop()
+        if self.search_index is None: return
+        with FILTER.time():
+            self.active_model().set_rows(self.search_index.search(self.search_bar.text()))
 
     def on_process_selected(self):
-        selected_items = self.process_table.selectedItems()
-        if selected_items:
-            row = selected_items[0].row()
-            pid = int(self.process_table.item(row, 0).text())
-            name = self.process_table.item(row, 1).text()
-            self.current_selection = {'pid': pid, 'name': name}
-            self.selected_label.setText(f"{name} (PID: {pid})")
-            self.tabs.setEnabled(True)
+        selected_rows = self.active_view().selectionModel().selectedRows()
+        model = self.active_model()
+        if self.is_group_mode():
+            # A selected group stands for all of its listed members
+            rows = {}
+            for index in selected_rows:
+                rows.update(dict.fromkeys(self.group_model.rows_at(index)))
+        elif self.is_tree_mode():
+            rows = [self.tree_model.snapshot_row(index) for index in selected_rows]
+        else:
+            rows = [self.process_model.snapshot_row(index.row()) for index in selected_rows]
+        self.selected_processes = [self.process_task(model.snapshot(), r) for r in rows]
+        if self.selected_processes:
+            self.current_selection = self.selected_processes[0]
+            if len(self.selected_processes) == 1:
+                self.selected_label.setText(f"{self.current_selection['name']} (PID: {self.current_selection['pid']})")
+            else:
+                self.selected_label.setText(f"{len(self.selected_processes)} processes selected")
+            self.tabs.setEnabled(self.replay is None)
+            if self.recurring_name is not None:
+                self.recurring_name.setText(self.current_selection['name'])
             self.check_if_whitelisted()
         else:
             self.current_selection = None
             self.selected_label.setText("No process selected")
             self.tabs.setEnabled(False)
+        self.update_history_graph()
+
+    # Task fields for snapshot row i; fleet rows also name their agent
+    def process_task(self, snapshot, i):
+        task = {'pid': snapshot.pids[i], 'name': snapshot.names[i], 'create_time': snapshot.create_times[i]}
+        if snapshot.hosts is not None:
+            task['host'] = snapshot.hosts[i]
+        return task
+
+    def update_history_graph(self):
+        if self.history_graph is None: return
+        if not self.current_selection:
+            self.history_graph.set_series([])
+            return
+        key = task_key(self.current_selection)
+        self.history_graph.set_series([
+            ("Memory", self.history.series(key, 'rss'), "#00d0ff", "MB"),
+            ("CPU", self.history.series(key, 'cpu'), "#ffab40", "%"),
+        ])
 
     def check_if_whitelisted(self):
         if not self.current_selection: return False
-        name = self.current_selection['name'].lower()
-        if name in HARD_WHITELIST or name in self.user_whitelist:
+        if any(self.engine.is_task_protected(p) for p in self.selected_processes):
             self.selected_label.setText(self.selected_label.text() + " [WHITELISTED]")
             self.selected_label.setStyleSheet("color: #00e676; font-weight: bold;")
             return True
@@ -321,9 +1176,8 @@ class TaskKillerApp(QMainWindow):
             self.selected_label.setStyleSheet("color: #00d0ff; font-weight: bold;") 
             return False
 
-    def is_protected(self, name):
-        name = name.lower()
-        return name in HARD_WHITELIST or name in self.user_whitelist
+    def is_protected(self, name, pid=None, create_time=None):
+        return self.engine.is_protected(name, pid, create_time)
 
     def add_current_to_whitelist(self):
         if not self.current_selection: return
@@ -331,14 +1185,29 @@ class TaskKillerApp(QMainWindow):
         if name in HARD_WHITELIST:
              QMessageBox.information(self, "Info", "This process is already in the System Hard Whitelist.")
              return
-        if name not in self.user_whitelist:
-            self.user_whitelist.add(name)
+        if self.engine.add_to_whitelist(name):
             self.refresh_whitelist_ui()
             self.log_message("INFO", f"Added '{name}' to user whitelist.")
             self.check_if_whitelisted()
         else:
             self.log_message("INFO", f"'{name}' is already whitelisted.")
 
+    def add_whitelist_rule(self):
+        text = self.whitelist_input.text().strip()
+        if not text: return
+        try:
+            added = self.engine.add_to_whitelist(text)
+        except ValueError as e:
+            QMessageBox.warning(self, "Invalid Rule", str(e))
+            return
+        self.whitelist_input.clear()
+        if added:
+            self.refresh_whitelist_ui()
+            self.log_message("INFO", f"Added rule '{text}' to user whitelist.")
+            self.check_if_whitelisted()
+        else:
+            self.log_message("INFO", f"'{text}' is already whitelisted.")
+
     def remove_from_whitelist(self):
         row = self.whitelist_list.currentRow()
         if row >= 0:
@@ -347,24 +1216,28 @@ class TaskKillerApp(QMainWindow):
             if name in HARD_WHITELIST:
                 QMessageBox.warning(self, "Restricted", "Cannot remove System Hard Whitelist items.")
                 return
-            self.user_whitelist.remove(name)
+            self.engine.remove_from_whitelist(name)
             self.refresh_whitelist_ui()
             self.log_message("INFO", f"Removed '{name}' from user whitelist.")
-            if self.current_selection and self.current_selection['name'].lower() == name:
+            if self.current_selection:
                 self.check_if_whitelisted()
 
     def refresh_whitelist_ui(self):
+        if self.fleet:
+            self.fleet.set_whitelist(self.engine.whitelist_names())
+        if self.whitelist_list is None: return
         self.whitelist_list.clear()
         for w in sorted(HARD_WHITELIST):
             item = QListWidgetItem(f"[SYSTEM] {w}")
             item.setForeground(Qt.GlobalColor.gray)
             self.whitelist_list.addItem(item)
-        for w in sorted(self.user_whitelist):
+        for w in sorted(self.engine.user_whitelist):
             self.whitelist_list.addItem(w)
 
     def kill_process_now(self):
         if not self.current_selection: return
-        self.execute_kill({'pid': self.current_selection['pid'], 'name': self.current_selection['name'], 'type': 'instant'})
+        tree = self.kill_tree_check.isChecked()
+        self.execute_kills([dict(p, type='instant', tree=tree) for p in self.selected_processes])
 
     def schedule_timer_kill(self):
         if not self.current_selection: return
@@ -382,77 +1255,198 @@ class TaskKillerApp(QMainWindow):
         now = QDateTime.currentDateTime()
         target_time = QDateTime(now.date(), target_qtime)
         if target_time < now:
-             QMessageBox.warning(self, "Time Passed", "Time already passed today.")
-             return
+            target_time = target_time.addDays(1)
+            self.log_message("INFO", f"{target_qtime.toString('HH:mm:ss')} already passed today; scheduling for tomorrow.")
         self.add_task(target_time, "Clock")
 
-    def add_task(self, target_datetime, mode_str):
-        pid = self.current_selection['pid']
-        name = self.current_selection['name']
+    def preview_recurring_schedule(self, text):
+        if not text.strip():
+            self.recurring_preview.setText("")
+            return
+        try:
+            deadline = parse_schedule(text).next_fire(time.time())
+        except ValueError as e:
+            self.recurring_preview.setText(str(e))
+            return
+        self.recurring_preview.setText(f"Next run: {time.strftime('%a %Y-%m-%d %H:%M:%S', time.localtime(deadline))}")
+
+    def schedule_recurring_kill(self):
+        name = self.recurring_name.text().strip()
+        try:
+            task = make_recurring_task(name, self.recurring_schedule.text(), tree=self.kill_tree_check.isChecked())
+        except ValueError as e:
+            QMessageBox.warning(self, "Invalid Schedule", str(e))
+            return
         if self.is_protected(name):
+            reply = QMessageBox.question(self, "Protected Process",
+                                         f"'{name}' is on the whitelist; its kills will be blocked. Schedule anyway?",
+                                         QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+            if reply == QMessageBox.StandardButton.No:
+                return
+        self.add_task_items([task])
+        self.engine.schedule(task)
+        self.recurring_schedule.clear()
+        self.log_message("INFO", f"Scheduled recurring kill for '{name}' ({task['schedule']}), "
+                                 f"next at {time.strftime('%a %H:%M:%S', time.localtime(task['deadline']))}")
+        self.arm_scheduler()
+
+    def add_task(self, target_datetime, mode_str):
+        protected = sorted({p['name'] for p in self.selected_processes if self.engine.is_task_protected(p)})
+        if protected:
+             names = ", ".join(f"'{n}'" for n in protected)
              reply = QMessageBox.question(self, "Protected Process", 
-                                          f"'{name}' is on the whitelist. Are you SUPER sure you want to schedule a kill?",
+                                          f"{names} on the whitelist. Are you SUPER sure you want to schedule a kill?",
                                           QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
              if reply == QMessageBox.StandardButton.No:
                  return
 
         time_str = target_datetime.toString("HH:mm:ss")
-        display_str = f"[{mode_str}] Kill '{name}' ({pid}) at {time_str}"
-        self.tasks_list.addItem(display_str)
-        
-        task = {
-            'pid': pid,
-            'name': name,
-            'target_time': target_datetime,
-            'list_item': self.tasks_list.item(self.tasks_list.count() - 1)
-        }
-        self.scheduled_tasks.append(task)
-        self.process_table.clearSelection()
-        self.log_message("INFO", f"Scheduled kill for '{name}' ({pid}) at {time_str}")
+        tree = self.kill_tree_check.isChecked()
+        scope = " and children" if tree else ""
+        remote = [dict(p, tree=tree, deadline=target_datetime.toMSecsSinceEpoch() / 1000)
+                  for p in self.selected_processes if p.get('host')]
+        if remote:
+            # Agents keep their own schedule, so these fire even while this window is closed
+            self.fleet.schedule(remote)
+        for proc in self.selected_processes:
+            if proc.get('host'):
+                continue
+            pid = proc['pid']
+            name = proc['name']
+            task = {
+                'pid': pid,
+                'name': name,
+                'create_time': proc['create_time'],
+                'tree': tree,
+                'mode': mode_str,
+                'deadline': target_datetime.toMSecsSinceEpoch() / 1000,
+            }
+            self.add_task_items([task])
+            self.engine.schedule(task)
+            self.log_message("INFO", f"Scheduled kill for '{name}' ({pid}){scope} at {time_str}")
+        self.arm_scheduler()
+        self.active_view().clearSelection()
+
+    def task_item_text(self, task):
+        scope = ' and children' if task.get('tree') else ''
+        if task.get('schedule'):
+            return (f"[Recurring] Kill all '{task['name']}'{scope} {task['schedule']}, "
+                    f"next at {time.strftime('%a %H:%M:%S', time.localtime(task['deadline']))}")
+        return (f"[{task.get('mode') or 'Scheduled'}] Kill '{task['name']}' ({task['pid']})"
+                f"{scope} at {time.strftime('%H:%M:%S', time.localtime(task['deadline']))}")
+
+    def add_task_items(self, tasks):
+        start = self.tasks_list.count()
+        self.tasks_list.addItems([self.task_item_text(task) for task in tasks])
+        for i, task in enumerate(tasks, start):
+            task['list_item'] = self.tasks_list.item(i)
+
+    def arm_scheduler(self):
+        if not self.scheduler_enabled: return
+        deadline = self.engine.next_deadline()
+        if deadline is None:
+            self.check_timer.stop()
+            return
+        delay_ms = max(0, int((deadline - time.time()) * 1000))
+        self.check_timer.start(min(delay_ms, MAX_SCHEDULER_SLEEP_MS))
 
     def check_scheduled_tasks(self):
         if not self.scheduler_enabled: return
-        now = QDateTime.currentDateTime()
-        for task in self.scheduled_tasks[:]:
-            if now >= task['target_time']:
-                self.execute_kill(task)
+        now = time.time()
+        due = self.engine.pop_due(now)
+        for task in due:
+            SCHEDULER_LAG.observe((now - task['deadline']) * 1000)
+        if due:
+            self.execute_kills(self.resolve_due(due))
+        self.arm_scheduler()
+
+    # Recurring tasks stay queued under their next deadline and are replaced
+    # by the processes their name matches right now. Those are looked up in
+    # the first snapshot collected after the deadline, so the GUI thread
+    # never lists processes itself; fleet and replay snapshots are not this
+    # machine's, so there it still has to.
+    def resolve_due(self, due):
+        targets = []
+        for task in due:
+            if not task.get('schedule'):
+                targets.append(task)
+                continue
+            queued = self.engine.tasks.get(task['id'])
+            if queued is not None and 'list_item' in queued:
+                queued['list_item'].setText(self.task_item_text(queued))
+            elif 'list_item' in task:
+                self.tasks_list.takeItem(self.tasks_list.row(task['list_item']))
+            if self.fleet or self.replay is not None:
+                targets.extend(self.log_recurring_match(task, resolve_targets(task)))
+            else:
+                self.pending_recurring.append(task)
+        if self.pending_recurring:
+            self.collector.request_refresh()
+        return targets
+
+    def resolve_pending_recurring(self, snapshot):
+        ready = [t for t in self.pending_recurring if t['deadline'] <= snapshot.timestamp]
+        if not ready:
+            return
+        self.pending_recurring = [t for t in self.pending_recurring if t['deadline'] > snapshot.timestamp]
+        targets = []
+        for task in ready:
+            targets.extend(self.log_recurring_match(task, snapshot_targets(task, snapshot)))
+        self.execute_kills(targets)
+
+    def log_recurring_match(self, task, matched):
+        self.log_message("INFO", f"Recurring kill '{task['name']}' ({task['schedule']}) "
+                                 f"matched {len(matched)} processes.")
+        return matched
+
+    def set_grace_period(self, seconds):
+        self.kill_engine.grace = float(seconds)
 
     def execute_kill(self, task):
-        pid = task['pid']
-        name = task['name']
-        is_instant = task.get('type') == 'instant'
-        if self.is_protected(name):
-            msg = f"Prevented kill of whitelisted process: {name} ({pid})"
+        self.execute_kills([task])
+
+    def execute_kills(self, tasks):
+        for task in tasks:
+            self.cleanup_task(task)
+        allowed, blocked = self.engine.partition_protected(tasks)
+        if blocked:
+            targets = ", ".join(f"{t['name']} ({t['pid']})" for t in blocked)
+            msg = f"Prevented kill of whitelisted process: {targets}"
             self.log_message("WARNING", msg)
-            if is_instant:
+            if any(t.get('type') == 'instant' for t in blocked):
                  QMessageBox.warning(self, "Blocked", msg)
             else:
                  self.tray_icon.showMessage("Safety Block", msg, QSystemTrayIcon.MessageIcon.Warning, 3000)
-            self.cleanup_task(task)
-            return
+        remote = [t for t in allowed if t.get('host')]
+        if remote:
+            self.fleet.kill(remote)
+            allowed = [t for t in allowed if not t.get('host')]
+        if allowed:
+            self.kill_engine.submit_many(allowed)
 
-        try:
-            if psutil.pid_exists(pid):
-                p = psutil.Process(pid)
-                p.terminate()
-                try:
-                   p.wait(timeout=3)
-                except psutil.TimeoutExpired:
-                   p.kill()
-                success_msg = f"Process {name} ({pid}) was killed."
-                self.log_message("CRITICAL", success_msg)
-                if not is_instant:
-                    self.tray_icon.showMessage("Qt-XKiller", success_msg, QSystemTrayIcon.MessageIcon.Critical, 5000)
-            else:
-                self.log_message("INFO", f"Process {name} ({pid}) not found or already dead.")
-        except (psutil.NoSuchProcess, psutil.AccessDenied) as e:
-            err_msg = f"Failed to kill {name} ({pid}): {e}"
-            self.log_message("WARNING", err_msg)
-            if not is_instant:
-                 self.tray_icon.showMessage("Qt-XKiller Error", err_msg, QSystemTrayIcon.MessageIcon.Warning, 4000)
-
-        self.cleanup_task(task)
+    def on_kill_result(self, result):
+        self.log_message(*describe_result(result))
+
+    def on_kill_batch_finished(self, results):
         self.refresh_process_list()
+        scheduled = [r for r in results if r.task.get('type') != 'instant']
+        if len(results) > 1:
+            counts = Counter(r.outcome for r in results)
+            summary = ", ".join(f"{n} {outcome.replace('_', ' ')}" for outcome, n in counts.most_common())
+            self.log_message("INFO", f"Kill batch of {len(results)} processes finished: {summary}.")
+            if scheduled:
+                killed = counts['terminated'] + counts['killed']
+                self.tray_icon.showMessage("Qt-XKiller", f"Killed {killed} of {len(results)} processes.",
+                                           QSystemTrayIcon.MessageIcon.Critical, 5000)
+        elif scheduled:
+            result = scheduled[0]
+            name, pid = result.task['name'], result.task['pid']
+            if result.outcome in ('terminated', 'killed'):
+                self.tray_icon.showMessage("Qt-XKiller", f"Process {name} ({pid}) was killed.",
+                                           QSystemTrayIcon.MessageIcon.Critical, 5000)
+            elif result.outcome in ('denied', 'failed'):
+                self.tray_icon.showMessage("Qt-XKiller Error", f"Failed to kill {name} ({pid}): {result.detail}",
+                                           QSystemTrayIcon.MessageIcon.Warning, 4000)
 
     def cleanup_task(self, task):
         if 'list_item' in task:
@@ -460,8 +1454,7 @@ class TaskKillerApp(QMainWindow):
                 row = self.tasks_list.row(task['list_item'])
                 self.tasks_list.takeItem(row)
             except: pass
-            if task in self.scheduled_tasks:
-                self.scheduled_tasks.remove(task)
+            self.engine.cancel(task)
 
     def cancel_selected_task(self):
         row = self.tasks_list.currentRow()
@@ -470,15 +1463,29 @@ class TaskKillerApp(QMainWindow):
             self.cancel_task(item)
 
     def cancel_task(self, item):
-        for task in self.scheduled_tasks:
-            if task['list_item'] == item:
-                self.scheduled_tasks.remove(task)
+        for task in self.engine.list_tasks():
+            if task.get('list_item') == item:
+                self.engine.cancel(task)
+                self.arm_scheduler()
                 row = self.tasks_list.row(item)
                 self.tasks_list.takeItem(row)
                 self.log_message("INFO", f"Cancelled task for {task['name']}")
                 break
     
     def log_message(self, level, message):
-        timestamp = datetime.datetime.now().strftime("%H:%M:%S")
-        formatted = f"[{timestamp}] [{level}] {message}"
-        self.log_viewer.appendPlainText(formatted)
+        self.logger.log(logging.getLevelName(level), message)
+        if not self.log_flush_timer.isActive():
+            self.log_flush_timer.start()
+
+    def log_level(self):
+        return self.log_level_combo.currentData() if self.log_level_combo else logging.NOTSET
+
+    def flush_logs(self):
+        lines = self.log_buffer.take_pending(self.log_level())
+        if lines and self.log_viewer is not None:
+            self.log_viewer.appendPlainText("\n".join(lines))
+
+    def reload_log_view(self):
+        self.log_buffer.take_pending()
+        self.log_viewer.setPlainText("\n".join(self.log_buffer.lines(self.log_level())))
+        self.log_viewer.moveCursor(self.log_viewer.textCursor().MoveOperation.End)
@@ -0,0 +1,107 @@
+import psutil
+from PyQt6.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
+
+from .metrics import ENUMERATION
+from .snapshot import collect_snapshot
+
+
+class _SnapshotWorker(QObject):
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    recording_failed = pyqtSignal(str)
+
+    def __init__(self, process_iter):
+        super().__init__()
+        self.process_iter = process_iter
+        self.previous = None
+        # Set from the GUI thread while the tree or group view is shown
+        self.build_tree = False
+        self.build_groups = False
+        # SnapshotRecorder every snapshot is appended to, if any
+        self.recorder = None
+
+    @pyqtSlot()
+    def collect(self):
+        try:
+            with ENUMERATION.time():
+                self.previous = collect_snapshot(self.previous, self.process_iter)
+            if self.build_tree:
+                self.previous.tree()
+            if self.build_groups:
+                self.previous.groups()
+            self.finished.emit(self.previous)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        if self.recorder is not None:
+            try:
+                self.recorder.append(self.previous)
+            except (OSError, ValueError) as e:
+                self.recorder = None
+                self.recording_failed.emit(str(e))
+
+
+# Enumerates processes on a worker thread. Refresh requests arriving while
+# an enumeration is running are coalesced into a single follow-up pass.
+class SnapshotCollector(QObject):
+    snapshot_ready = pyqtSignal(object)
+    error = pyqtSignal(str)
+    recording_error = pyqtSignal(str)
+    _collect = pyqtSignal()
+
+    def __init__(self, parent=None, process_iter=psutil.process_iter):
+        super().__init__(parent)
+        self._busy = False
+        self._pending = False
+
+        self._thread = QThread()
+        self._worker = _SnapshotWorker(process_iter)
+        self._worker.moveToThread(self._thread)
+        self._collect.connect(self._worker.collect)
+        self._worker.finished.connect(self._on_finished)
+        self._worker.failed.connect(self._on_failed)
+        self._worker.recording_failed.connect(self.recording_error)
+        self._thread.start()
+
+    # Have the worker build each snapshot's ProcessTree off the GUI thread
+    def set_build_tree(self, enabled):
+        self._worker.build_tree = enabled
+
+    def set_build_groups(self, enabled):
+        self._worker.build_groups = enabled
+
+    # Set before the first refresh; the recorder is only used on the worker
+    def set_recorder(self, recorder):
+        self._worker.recorder = recorder
+
+    def recorder(self):
+        return self._worker.recorder
+
+    def is_busy(self):
+        return self._busy
+
+    def request_refresh(self):
+        if self._busy:
+            self._pending = True
+            return
+        self._busy = True
+        self._collect.emit()
+
+    def stop(self):
+        self._pending = False
+        self._thread.quit()
+        self._thread.wait()
+
+    def _on_finished(self, snapshot):
+        self._done()
+        self.snapshot_ready.emit(snapshot)
+
+    def _on_failed(self, message):
+        self._done()
+        self.error.emit(message)
+
+    def _done(self):
+        self._busy = False
+        if self._pending:
+            self._pending = False
+            self.request_refresh()
@@ -0,0 +1,254 @@
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import psutil
+
+from .constants import HARD_WHITELIST
+from .protection import parse_protection_rule
+from .recurrence import make_recurring_task, parse_when
+from .search import SearchIndex
+
+MAX_BODY = 8 * 1024 * 1024
+TASK_KEYS = ('id', 'pid', 'name', 'create_time', 'deadline', 'tree', 'mode', 'schedule')
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# Writes a fresh random token readable only by the current user
+def write_token(path):
+    token = secrets.token_urlsafe(32)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        f.write(token)
+    return token
+
+
+# (pid, optional expected create_time) -> task dict with the live name and
+# create_time, or ApiError if the process is gone or was replaced.
+def resolve_process(item, **fields):
+    try:
+        pid = int(item['pid'])
+        expected = item.get('create_time')
+        expected = float(expected) if expected is not None else None
+    except (KeyError, TypeError, ValueError):
+        raise ApiError(400, "each entry needs an integer 'pid' and a numeric 'create_time', if given")
+    if pid <= 0:
+        raise ApiError(400, f"invalid pid {pid}")
+    try:
+        proc = psutil.Process(pid)
+        with proc.oneshot():
+            name, create_time = proc.name(), proc.create_time()
+    except psutil.NoSuchProcess:
+        raise ApiError(404, f"process {pid} not found")
+    except psutil.AccessDenied as e:
+        raise ApiError(403, f"process {pid}: {e}")
+    if expected is not None and expected != create_time:
+        raise ApiError(409, f"process {pid} was replaced by '{name}'")
+    return dict(fields, pid=pid, name=name, create_time=create_time, tree=bool(item.get('tree')))
+
+
+# {'at': epoch} | {'in': seconds} | {'when': '+10m' / '23:00'} -> epoch seconds
+def resolve_deadline(item, now):
+    try:
+        if 'at' in item:
+            return float(item['at'])
+        if 'in' in item:
+            return now + float(item['in'])
+        if 'when' in item:
+            return parse_when(str(item['when']), now)
+    except (TypeError, ValueError) as e:
+        raise ApiError(400, str(e))
+    raise ApiError(400, "each entry needs 'at', 'in' or 'when'")
+
+
+# {'name': 'steam', 'schedule': 'weekdays 23:00', 'tree': false} -> recurring task
+def resolve_recurring(item, now):
+    try:
+        return make_recurring_task(str(item.get('name') or ''), str(item['schedule']), now, tree=item.get('tree'))
+    except ValueError as e:
+        raise ApiError(400, str(e))
+
+
+def task_json(task):
+    return {key: task.get(key) for key in TASK_KEYS}
+
+
+# Request handling against a KillerEngine plus a host (the GUI window or the
+# daemon) that provides:
+#   snapshot()              latest ProcessSnapshot or None
+#   on_scheduled(tasks)     tasks were added to the engine
+#   on_cancelled(tasks)     tasks were removed from the engine
+#   kill_now(tasks)         run the normal kill path for these tasks
+#   on_whitelist_changed()
+# Host callbacks run on the request thread and must hand work to their own
+# thread if they need to.
+class ControlAPI:
+    def __init__(self, engine, host):
+        self.engine = engine
+        self.host = host
+
+    def handle(self, method, path, query, body):
+        route = (method, path.rstrip('/') or '/')
+        if route == ('GET', '/processes'):
+            return self.list_processes(query)
+        if route == ('GET', '/tasks'):
+            return {'tasks': [task_json(t) for t in sorted(self.engine.list_tasks(), key=lambda t: t['deadline'])]}
+        if route == ('POST', '/tasks'):
+            return self.schedule(body)
+        if route == ('POST', '/tasks/cancel'):
+            return self.cancel(body)
+        if route == ('POST', '/kill'):
+            return self.kill(body)
+        if route == ('GET', '/whitelist'):
+            return {'hard': sorted(HARD_WHITELIST), 'user': self.engine.whitelist_names()}
+        if route == ('POST', '/whitelist'):
+            return self.edit_whitelist(body)
+        raise ApiError(404, f"no route for {method} {path}")
+
+    def list_processes(self, query):
+        snapshot = self.host.snapshot()
+        if snapshot is None:
+            return {'processes': []}
+        text = query.get('q', [''])[0]
+        rows = SearchIndex(snapshot).search(text) if text else range(len(snapshot))
+        matcher = self.engine.matcher
+        processes = []
+        for i in rows:
+            p = snapshot.row(i)
+            processes.append({'pid': p.pid, 'name': p.name, 'status': p.status, 'rss': p.rss,
+                              'cpu_percent': round(p.cpu_percent, 1), 'create_time': p.create_time,
+                              'protected': matcher.is_protected(p.name, p.pid, p.create_time)})
+        return {'processes': processes}
+
+    def _entries(self, body, key):
+        entries = body.get(key) if isinstance(body, dict) else None
+        if not isinstance(entries, list):
+            raise ApiError(400, f"expected a JSON object with a '{key}' list")
+        return entries
+
+    def schedule(self, body):
+        now = time.time()
+        tasks, errors = [], []
+        for n, item in enumerate(self._entries(body, 'tasks')):
+            try:
+                if not isinstance(item, dict):
+                    raise ApiError(400, "entries must be objects")
+                if 'schedule' in item:
+                    tasks.append(resolve_recurring(item, now))
+                else:
+                    tasks.append(resolve_process(item, deadline=resolve_deadline(item, now), mode='API', type='api'))
+            except ApiError as e:
+                errors.append({'index': n, 'error': str(e)})
+        self.engine.schedule_many(tasks)
+        if tasks:
+            self.host.on_scheduled(tasks)
+        protected = sorted({t['name'] for t in tasks if not t.get('schedule')
+                            and self.engine.is_protected(t['name'], t['pid'], t['create_time'])})
+        return {'scheduled': [task_json(t) for t in tasks], 'errors': errors, 'protected': protected}
+
+    def cancel(self, body):
+        if not isinstance(body, dict):
+            raise ApiError(400, "expected a JSON object")
+        ids = set(body.get('ids') or [])
+        pids = set(body.get('pids') or [])
+        everything = bool(body.get('all'))
+        # Recurring tasks carry pid 0 and are cancelled by id only
+        targets = [t for t in self.engine.list_tasks()
+                   if everything or t['id'] in ids or (t['pid'] in pids and not t.get('schedule'))]
+        cancelled = self.engine.cancel_many(targets)
+        if cancelled:
+            self.host.on_cancelled(cancelled)
+        return {'cancelled': [t['id'] for t in cancelled]}
+
+    def kill(self, body):
+        tasks, errors = [], []
+        for n, item in enumerate(self._entries(body, 'targets')):
+            try:
+                if not isinstance(item, dict):
+                    raise ApiError(400, "entries must be objects")
+                tasks.append(resolve_process(item, type='api'))
+            except ApiError as e:
+                errors.append({'index': n, 'error': str(e)})
+        allowed, blocked = self.engine.partition_protected(tasks)
+        if allowed:
+            self.host.kill_now(allowed)
+        return {'submitted': [t['pid'] for t in allowed], 'protected': [t['pid'] for t in blocked],
+                'errors': errors}
+
+    def edit_whitelist(self, body):
+        if not isinstance(body, dict):
+            raise ApiError(400, "expected a JSON object")
+        added, removed, errors = [], [], []
+        for text in body.get('add') or []:
+            try:
+                if self.engine.add_to_whitelist(str(text)):
+                    added.append(parse_protection_rule(str(text)).text)
+            except ValueError as e:
+                errors.append({'rule': text, 'error': str(e)})
+        removed = [text for text in body.get('remove') or [] if self.engine.remove_from_whitelist(str(text))]
+        if added or removed:
+            self.host.on_whitelist_changed()
+        return {'added': added, 'removed': removed, 'errors': errors}
+
+
+class _ControlHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self._dispatch()
+
+    def do_POST(self):
+        self._dispatch()
+
+    def _dispatch(self):
+        try:
+            server = self.server
+            auth = self.headers.get('Authorization', '')
+            if not hmac.compare_digest(auth.encode(), f"Bearer {server.token}".encode()):
+                raise ApiError(401, "missing or wrong bearer token")
+            url = urlsplit(self.path)
+            body = None
+            if self.command == 'POST':
+                length = int(self.headers.get('Content-Length') or 0)
+                if length > MAX_BODY:
+                    raise ApiError(413, "request body too large")
+                try:
+                    body = json.loads(self.rfile.read(length) or b'{}')
+                except ValueError as e:
+                    raise ApiError(400, f"invalid JSON: {e}")
+            status, reply = 200, server.api.handle(self.command, url.path, parse_qs(url.query), body)
+        except ApiError as e:
+            status, reply = e.status, {'error': str(e)}
+        except Exception as e:
+            status, reply = 500, {'error': str(e)}
+        data = json.dumps(reply).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Serves the API on localhost from a thread per request. Every request must
+# carry "Authorization: Bearer <token>"; the token is written to token_path.
+def start_control_server(port, api, token_path, host="127.0.0.1"):
+    server = ThreadingHTTPServer((host, port), _ControlHandler)
+    server.daemon_threads = True
+    server.api = api
+    server.token = write_token(token_path)
+    threading.Thread(target=server.serve_forever, name="control-api", daemon=True).start()
+    return server
@@ -0,0 +1,238 @@
+import datetime
+import logging
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import psutil
+
+from .engine import KillerEngine
+from .killer import DEFAULT_GRACE, describe_result, kill_targets
+from .procwatch import LaunchWatcher
+from .recurrence import make_recurring_task, parse_when, resolve_targets
+from .recording import SnapshotRecorder, start_recording
+from .snapshot import collect_snapshot
+from .store import StateStore, default_path
+from .logs import LOGGER_NAME, LOG_DATEFMT, LOG_FORMAT, start_file_sink
+from .metrics import KILL_LATENCY, SCHEDULER_LAG
+
+# Upper bound on a single scheduler sleep so wall-clock jumps are noticed
+MAX_SLEEP = 60.0
+MAX_CONCURRENT_BATCHES = 4
+
+log = logging.getLogger(LOGGER_NAME)
+
+# "1234@+10m" -> task dict for pid 1234, due in ten minutes
+def parse_task(spec, now=None):
+    pid_text, sep, when = spec.partition('@')
+    if not sep or not pid_text.isdigit():
+        raise ValueError(f"Invalid task '{spec}'. Expected PID@WHEN, e.g. 1234@+10m.")
+    p = psutil.Process(int(pid_text))
+    return {'pid': p.pid, 'name': p.name(), 'create_time': p.create_time(), 'deadline': parse_when(when, now),
+            'type': 'daemon'}
+
+
+# "steam@weekdays 23:00" -> recurring kill of every process named steam
+def parse_recurring(spec, now=None):
+    name, sep, schedule = spec.partition('@')
+    if not sep:
+        raise ValueError(f"Invalid recurring kill '{spec}'. Expected NAME@SCHEDULE, e.g. steam@weekdays 23:00.")
+    return make_recurring_task(name, schedule, now)
+
+
+# Headless scheduler loop: sleeps until the earliest deadline (or until woken
+# by a new task) and hands due tasks to a small pool of kill workers.
+class SchedulerDaemon:
+    def __init__(self, engine=None, grace=DEFAULT_GRACE, exit_when_idle=False):
+        self.engine = engine or KillerEngine()
+        self.grace = grace
+        self.exit_when_idle = exit_when_idle
+        self._wake = threading.Event()
+        self._stopped = False
+        self._pool = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_BATCHES)
+
+    def schedule(self, task):
+        self.engine.schedule(task)
+        if task.get('schedule'):
+            when = datetime.datetime.fromtimestamp(task['deadline']).strftime("%a %H:%M")
+            log.info("Scheduled recurring kill for '%s' (%s), next at %s", task['name'], task['schedule'], when)
+        else:
+            when = datetime.datetime.fromtimestamp(task['deadline']).strftime("%H:%M:%S")
+            log.info("Scheduled kill for '%s' (%s) at %s", task['name'], task['pid'], when)
+        self._wake.set()
+
+    def cancel(self, task):
+        if self.engine.cancel(task):
+            log.info("Cancelled task for %s", task['name'])
+            self._wake.set()
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+
+    # Control API host interface, called on request threads
+    def snapshot(self):
+        return collect_snapshot()
+
+    def on_scheduled(self, tasks):
+        log.info("Control API scheduled %d kills.", len(tasks))
+        self._wake.set()
+
+    def on_cancelled(self, tasks):
+        log.info("Control API cancelled %d kills.", len(tasks))
+        self._wake.set()
+
+    def kill_now(self, tasks):
+        self.execute_kills(tasks)
+
+    # Called on the launch watcher thread
+    def on_launch(self, task):
+        log.warning("Launch rule triggered for %s (%s)", task['name'], task['pid'])
+        self.execute_kills([task])
+
+    def on_whitelist_changed(self):
+        log.info("Control API updated the whitelist: %s", ", ".join(self.engine.whitelist_names()) or "(empty)")
+
+    def run(self):
+        log.info("Daemon started. Scheduler active.")
+        while not self._stopped:
+            # Checked before sleeping, so a daemon started with nothing queued exits at once
+            if self.exit_when_idle and not self.engine.tasks:
+                break
+            deadline = self.engine.next_deadline()
+            timeout = MAX_SLEEP if deadline is None else min(MAX_SLEEP, max(0.0, deadline - time.time()))
+            self._wake.wait(timeout)
+            self._wake.clear()
+            now = time.time()
+            due = self.engine.pop_due(now)
+            for task in due:
+                SCHEDULER_LAG.observe((now - task['deadline']) * 1000)
+            if due:
+                self.execute_kills(self.resolve_due(due))
+        self._pool.shutdown(wait=True)
+        log.info("Daemon stopped.")
+
+    # Recurring tasks are replaced by the processes their name matches now
+    def resolve_due(self, due):
+        targets = []
+        for task in due:
+            if not task.get('schedule'):
+                targets.append(task)
+                continue
+            matched = resolve_targets(task)
+            log.info("Recurring kill '%s' (%s) matched %d processes.", task['name'], task['schedule'], len(matched))
+            targets.extend(matched)
+        return targets
+
+    def execute_kills(self, tasks):
+        allowed, blocked = self.engine.partition_protected(tasks)
+        for task in blocked:
+            log.warning("Prevented kill of whitelisted process: %s (%s)", task['name'], task['pid'])
+        if allowed:
+            self._pool.submit(self._kill_batch, allowed, time.perf_counter())
+
+    def _kill_batch(self, tasks, submitted):
+        try:
+            results = kill_targets(tasks, self.grace, self.engine.is_protected)
+        except Exception:
+            log.exception("Kill batch failed")
+            return
+        latency = (time.perf_counter() - submitted) * 1000
+        for _ in results:
+            KILL_LATENCY.observe(latency)
+        for result in results:
+            level, message = describe_result(result)
+            log.log(logging.getLevelName(level), message)
+
+
+def run_daemon(args):
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT, datefmt=LOG_DATEFMT)
+    log_listener = start_file_sink(log, args.log_file) if args.log_file else None
+    store = None
+    try:
+        if not args.no_state:
+            # Separate from the GUI's file so the two never fire the same kill
+            store = StateStore(args.state or default_path("daemon.db"))
+        return _run(args, store)
+    finally:
+        if store:
+            store.close()
+        if log_listener:
+            log_listener.stop()
+
+
+def _run(args, store):
+    # Launch rules, recording and serving a fleet have no end, so they keep the daemon running
+    serving = args.kill_on_launch or args.record or args.agent_port is not None
+    daemon = SchedulerDaemon(KillerEngine(store), grace=args.grace, exit_when_idle=args.exit_when_idle and not serving)
+    restored, dropped = daemon.engine.restore(time.time())
+    if restored:
+        log.info("Restored %d scheduled kills.", len(restored))
+    if dropped:
+        log.info("Dropped %d overdue kills whose process already exited.", len(dropped))
+    for rule in args.whitelist:
+        try:
+            daemon.engine.add_to_whitelist(rule)
+        except ValueError as e:
+            log.error("%s", e)
+            return 2
+    for spec in args.task:
+        try:
+            daemon.schedule(parse_task(spec))
+        except (ValueError, psutil.Error) as e:
+            log.error("%s", e)
+            return 2
+    for spec in args.recurring:
+        try:
+            daemon.schedule(parse_recurring(spec))
+        except ValueError as e:
+            log.error("%s", e)
+            return 2
+    stop_recording = None
+    if args.record:
+        try:
+            stop_recording = start_recording(SnapshotRecorder(args.record), args.record_interval)
+        except (OSError, ValueError) as e:
+            log.error("Could not record to %s: %s", args.record, e)
+            return 2
+        log.info("Recording snapshots to %s every %gs.", args.record, args.record_interval)
+    launch_watcher = None
+    if args.kill_on_launch:
+        launch_watcher = LaunchWatcher(args.kill_on_launch, daemon.on_launch)
+        launch_watcher.start()
+        launch_watcher.wait_ready()
+        log.info("Killing %s on launch (%s).", ", ".join(args.kill_on_launch), launch_watcher.mode)
+    server = None
+    if args.api_port is not None:
+        from .control_api import ControlAPI, start_control_server
+        token_path = args.api_token_file or default_path("api-token")
+        server = start_control_server(args.api_port, ControlAPI(daemon.engine, daemon), token_path)
+        log.info("Control API listening on http://127.0.0.1:%d (token in %s).", server.server_address[1], token_path)
+    agent = None
+    if args.agent_port is not None:
+        from .control_api import ControlAPI
+        from .fleet import AgentServer, FleetAgent, is_loopback, load_token
+        token_path = args.fleet_token_file or default_path("fleet-token")
+        try:
+            agent = AgentServer(FleetAgent(ControlAPI(daemon.engine, daemon), load_token(token_path)),
+                                args.agent_port, args.agent_host)
+        except OSError as e:
+            log.error("Could not start the fleet agent on port %d: %s", args.agent_port, e)
+            return 2
+        log.info("Fleet agent listening on %s:%d (token in %s).", agent.address[0], agent.address[1], token_path)
+        if not is_loopback(agent.address[0]):
+            log.warning("The fleet agent is reachable from other machines without encryption: the token and "
+                        "kill commands can be read on the network. Prefer 127.0.0.1 and an SSH tunnel.")
+    signal.signal(signal.SIGINT, lambda *_: daemon.stop())
+    signal.signal(signal.SIGTERM, lambda *_: daemon.stop())
+    daemon.run()
+    if stop_recording:
+        stop_recording()
+    if launch_watcher:
+        launch_watcher.stop()
+    if server:
+        server.shutdown()
+    if agent:
+        agent.shutdown()
+    return 0
@@ -0,0 +1,118 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import psutil
+
+# Fetched details are shown for this long before the row asks again, and
+# dropped once they are this much older still without being asked for
+DETAIL_TTL = 5.0
+DETAIL_WORKERS = 4
+
+
+def _memory(proc):
+    # USS and PSS walk every mapping of the process (smaps on Linux), which
+    # is what makes them too slow for the whole list
+    mem = proc.memory_full_info()
+    return {'uss': getattr(mem, 'uss', None), 'pss': getattr(mem, 'pss', None)}
+
+
+def _io(proc):
+    io = proc.io_counters()
+    return {'read_bytes': io.read_bytes, 'write_bytes': io.write_bytes}
+
+
+# Detail field(s) -> reader. A reader that is refused or unsupported on this
+# platform leaves its fields None without hiding the others.
+_READERS = [
+    (('uss', 'pss'), _memory),
+    (('threads',), lambda proc: {'threads': proc.num_threads()}),
+    (('open_files',), lambda proc: {'open_files': len(proc.open_files())}),
+    (('read_bytes', 'write_bytes'), _io),
+    (('username',), lambda proc: {'username': proc.username()}),
+]
+DETAIL_FIELDS = tuple(field for fields, _ in _READERS for field in fields)
+
+
+# Details of one process, or None if it exited or its pid now belongs to
+# another process
+def fetch_details(pid, create_time):
+    try:
+        proc = psutil.Process(pid)
+        if proc.create_time() != create_time:
+            return None
+    except psutil.Error:
+        return None
+    details = {}
+    with proc.oneshot():
+        for fields, read in _READERS:
+            try:
+                details.update(read(proc))
+            except psutil.NoSuchProcess:
+                return None
+            except (psutil.Error, AttributeError, NotImplementedError, OSError):
+                details.update(dict.fromkeys(fields))
+    return details
+
+
+# Details per (pid, create_time), fetched on a small thread pool for the
+# keys the caller asks for (the rows on screen) and kept for `ttl` seconds.
+# on_ready(key) is called on a pool thread after each fetch.
+class DetailCache:
+    def __init__(self, on_ready=None, ttl=DETAIL_TTL, workers=DETAIL_WORKERS, fetch=fetch_details):
+        self.on_ready = on_ready
+        self.ttl = ttl
+        self.fetch = fetch
+        # key -> (expiry, details)
+        self._entries = {}
+        # key -> Future of a fetch not finished yet
+        self._queued = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="details")
+
+    def __len__(self):
+        return len(self._entries)
+
+    # Last fetched details, possibly expired, or None
+    def get(self, key):
+        entry = self._entries.get(key)
+        return entry[1] if entry else None
+
+    # Queues fetches for the keys with no details or expired ones. Queued
+    # fetches for keys no longer asked for are dropped, so scrolling past
+    # thousands of rows only costs the ones the view stops on.
+    def request(self, keys, now=None):
+        now = time.monotonic() if now is None else now
+        wanted = dict.fromkeys(keys)
+        with self._lock:
+            for key, future in list(self._queued.items()):
+                if key not in wanted and future.cancel():
+                    del self._queued[key]
+            self._evict(now)
+            for key in wanted:
+                if key in self._queued:
+                    continue
+                entry = self._entries.get(key)
+                if entry is None or entry[0] <= now:
+                    self._queued[key] = self._pool.submit(self._fetch, key)
+
+    # A fetch that raises is cached as no details, so the key is not stuck
+    # in _queued and is retried once it expires
+    def _fetch(self, key):
+        details = None
+        try:
+            details = self.fetch(*key)
+        finally:
+            with self._lock:
+                self._queued.pop(key, None)
+                self._entries[key] = (time.monotonic() + self.ttl, details)
+        if self.on_ready:
+            self.on_ready(key)
+
+    def _evict(self, now):
+        stale = now - self.ttl
+        for key in [key for key, (expiry, _) in self._entries.items() if expiry <= stale]:
+            del self._entries[key]
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,26 @@
+from array import array
+from collections import namedtuple
+
+# added: rows of the new snapshot; removed: rows of the old snapshot;
+# changed: rows of the new snapshot whose values differ; remap: old row ->
+# new row (or -1 when the process is gone).
+SnapshotDiff = namedtuple('SnapshotDiff', ['added', 'removed', 'changed', 'remap'])
+
+
+def diff_snapshots(old, new):
+    remap = array('l', [-1]) * len(old)
+    added, changed = array('l'), array('l')
+    old_rss, new_rss = old.rss, new.rss
+    old_status, new_status = old.statuses, new.statuses
+    old_cpu, new_cpu = old.cpu_percent, new.cpu_percent
+    for j, key in enumerate(new.keys()):
+        i = old.find(key)
+        if i is None:
+            added.append(j)
+            continue
+        remap[i] = j
+        if (old_rss[i] != new_rss[j] or old_cpu[i] != new_cpu[j] or old_status[i] != new_status[j]
+                or old.names[i] != new.names[j]):
+            changed.append(j)
+    removed = array('l', (i for i, j in enumerate(remap) if j < 0))
+    return SnapshotDiff(added, removed, changed, remap)
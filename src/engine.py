@@ -0,0 +1,189 @@
+import threading
+
+from .constants import HARD_WHITELIST
+from .killer import split_live
+from .protection import ProcessAttrCache, ProtectionMatcher, parse_protection_rule
+from .recurrence import parse_schedule
+from .scheduler import DeadlineQueue
+
+
+# GUI-independent core shared by the Qt app and the headless daemon: the user
+# whitelist (exact names, globs and regexes, see protection.py) and the queue
+# of scheduled kills. Tasks are plain dicts with at least 'pid', 'name' and
+# 'deadline' (epoch seconds); the engine assigns each one an 'id'. Recurring
+# tasks also carry a 'schedule' (see recurrence.py) and are re-armed for
+# their next fire instead of removed. With a StateStore every change is also
+# written through to disk. Methods are safe to call from any thread.
+class KillerEngine:
+    def __init__(self, store=None):
+        self.store = store
+        self.user_whitelist = set()
+        self._attrs = ProcessAttrCache()
+        self.matcher = ProtectionMatcher(exact=HARD_WHITELIST, attrs=self._attrs)
+        self.tasks = {}
+        self.deadlines = DeadlineQueue()
+        self._next_id = 1
+        self._lock = threading.RLock()
+
+    # pid and create_time let exe: and cmd: rules look at the process itself
+    def is_protected(self, name, pid=None, create_time=None):
+        return self.matcher.is_protected(name, pid, create_time)
+
+    def _rebuild_matcher(self):
+        rules = []
+        for text in self.user_whitelist:
+            try:
+                rules.append(parse_protection_rule(text))
+            except ValueError:
+                pass
+        self.matcher = ProtectionMatcher(rules, exact=HARD_WHITELIST, attrs=self._attrs)
+
+    # Raises ValueError for a malformed rule; False if already covered
+    def add_to_whitelist(self, text):
+        rule = parse_protection_rule(text)
+        with self._lock:
+            if rule.text in HARD_WHITELIST or rule.text in self.user_whitelist:
+                return False
+            self.user_whitelist.add(rule.text)
+            self._rebuild_matcher()
+            if self.store:
+                self.store.add_whitelist(rule.text)
+            return True
+
+    def remove_from_whitelist(self, text):
+        try:
+            text = parse_protection_rule(text).text
+        except ValueError:
+            pass
+        with self._lock:
+            if text not in self.user_whitelist:
+                return False
+            self.user_whitelist.discard(text)
+            self._rebuild_matcher()
+            if self.store:
+                self.store.remove_whitelist(text)
+            return True
+
+    def schedule(self, task):
+        return self.schedule_many([task])[0]
+
+    # Queues all tasks under one lock and persists them in one transaction
+    def schedule_many(self, tasks):
+        with self._lock:
+            for task in tasks:
+                if task.get('id') is None or task['id'] in self.tasks:
+                    task['id'] = self._next_id
+                self._next_id = max(self._next_id, task['id'] + 1)
+                self.tasks[task['id']] = task
+                self.deadlines.push(task['deadline'], task)
+            if self.store and tasks:
+                self.store.save_tasks(tasks)
+            return tasks
+
+    def cancel_many(self, tasks):
+        with self._lock:
+            cancelled = [task for task in tasks if self.tasks.pop(task.get('id'), None) is not None]
+            for task in cancelled:
+                self.deadlines.cancel(task)
+            if self.store and cancelled:
+                self.store.delete_tasks([task['id'] for task in cancelled])
+            return cancelled
+
+    def cancel(self, task):
+        return bool(self.cancel_many([task]))
+
+    def list_tasks(self):
+        with self._lock:
+            return list(self.tasks.values())
+
+    def whitelist_names(self):
+        with self._lock:
+            return sorted(self.user_whitelist)
+
+    def next_deadline(self):
+        with self._lock:
+            return self.deadlines.next_deadline()
+
+    # Due tasks, removed from the queue. A recurring task is returned as a
+    # copy carrying the deadline that fired while the original is re-armed.
+    def pop_due(self, now):
+        with self._lock:
+            due = self.deadlines.pop_due(now)
+            fired, finished, rearmed = [], [], []
+            for task in due:
+                if task.get('schedule'):
+                    fired.append(dict(task))
+                    if self._rearm(task, max(now, task['deadline'])):
+                        rearmed.append(task)
+                        continue
+                else:
+                    fired.append(task)
+                self.tasks.pop(task['id'], None)
+                finished.append(task)
+            if self.store:
+                if finished:
+                    self.store.delete_tasks([task['id'] for task in finished])
+                if rearmed:
+                    self.store.save_tasks(rearmed)
+            return fired
+
+    def _rearm(self, task, after):
+        try:
+            deadline = parse_schedule(task['schedule']).next_fire(after)
+        except ValueError:
+            deadline = None
+        if deadline is None:
+            return False
+        task['deadline'] = deadline
+        self.deadlines.push(deadline, task)
+        return True
+
+    # Tasks for another host of a fleet are checked by name only: exe and
+    # cmd rules would look up a local process that happens to share the pid
+    def is_task_protected(self, task):
+        if task.get('host'):
+            return self.is_protected(task['name'])
+        return self.is_protected(task['name'], task.get('pid'), task.get('create_time'))
+
+    def partition_protected(self, tasks):
+        allowed, blocked = [], []
+        for task in tasks:
+            protected = self.is_task_protected(task)
+            (blocked if protected else allowed).append(task)
+        return allowed, blocked
+
+    # Loads the stored whitelist and queue; call once, before scheduling
+    # anything, so stored ids cannot clash with new ones. Tasks whose
+    # deadline passed while we were not running are only kept if the same
+    # process (pid and create_time) is still alive; they then fire on the
+    # next pop_due(). Recurring tasks skip the runs they missed and wait for
+    # their next fire. Returns (restored tasks, dropped tasks).
+    def restore(self, now):
+        if not self.store:
+            return [], []
+        tasks, whitelist = self.store.load()
+        overdue = [task for task in tasks if task['deadline'] <= now and not task.get('schedule')]
+        live, gone = split_live(overdue) if overdue else ([], [])
+        rearmed = []
+        for task in tasks:
+            if task.get('schedule') and task['deadline'] <= now:
+                try:
+                    task['deadline'] = parse_schedule(task['schedule']).next_fire(now)
+                except ValueError:
+                    task['deadline'] = None
+                (rearmed if task['deadline'] is not None else gone).append(task)
+        gone_ids = {task['id'] for task in gone}
+        restored = [task for task in tasks if task['id'] not in gone_ids]
+        with self._lock:
+            self.user_whitelist.update(name for name in whitelist if name not in HARD_WHITELIST)
+            self._rebuild_matcher()
+            for task in restored:
+                self.tasks[task['id']] = task
+            self.deadlines.push_many((task['deadline'], task) for task in restored)
+            if restored:
+                self._next_id = max(self._next_id, max(task['id'] for task in restored) + 1)
+            if gone:
+                self.store.delete_tasks(gone_ids)
+            if rearmed:
+                self.store.save_tasks(rearmed)
+        return restored, gone
@@ -0,0 +1,529 @@
+import asyncio
+import hmac
+import ipaddress
+import json
+import socket
+import threading
+import time
+
+import psutil
+
+from .control_api import ApiError, write_token
+from .diff import diff_snapshots
+from .snapshot import ProcessSnapshot, collect_snapshot
+
+PROTOCOL_VERSION = 1
+DEFAULT_AGENT_PORT = 8766
+# However many fleets poll an agent, it enumerates processes at most this often
+AGENT_MIN_INTERVAL = 0.5
+CONNECT_TIMEOUT = 5.0
+REQUEST_TIMEOUT = 10.0
+# Seconds before reconnecting after the 1st, 2nd, ... failure in a row
+RECONNECT_DELAYS = (1, 2, 5, 10, 30)
+# Connection attempts in flight at once, so a large fleet is not dialled
+# in a single burst
+MAX_CONNECTING = 32
+MAX_REPLY_LINE = 64 * 1024 * 1024
+MAX_REQUEST_LINE = 1024 * 1024
+
+
+class AgentError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+# "host:port" or "host" (default port); IPv6 as "[::1]:8766"
+def parse_address(text):
+    text = text.strip()
+    host, port = text, DEFAULT_AGENT_PORT
+    if text.startswith('['):
+        host, _, rest = text[1:].partition(']')
+        if rest.startswith(':'):
+            port = rest[1:]
+    elif text.count(':') == 1:
+        host, port = text.split(':')
+    try:
+        port = int(port)
+    except ValueError:
+        raise ValueError(f"Invalid agent address '{text}'. Expected HOST:PORT.")
+    if not host or not 0 < port < 65536:
+        raise ValueError(f"Invalid agent address '{text}'. Expected HOST:PORT.")
+    return host, port
+
+
+# Whether a bound address is reachable only from this machine. The token and
+# every command travel as plain text, so anything else needs a trusted network.
+def is_loopback(host):
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return host == "localhost"
+
+
+# The token in `path`, or a fresh one written there. Agents and the fleet
+# view that talks to them share the file (or a copy of it).
+def load_token(path):
+    try:
+        with open(path) as f:
+            token = f.read().strip()
+        if token:
+            return token
+    except FileNotFoundError:
+        pass
+    return write_token(path)
+
+
+# Cancels what is still running on a stopped loop, e.g. connections that
+# were open at shutdown, so nothing is left pending when it closes
+def _finish_tasks(loop):
+    tasks = asyncio.all_tasks(loop)
+    for task in tasks:
+        task.cancel()
+    loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+
+
+def _line(message):
+    return json.dumps(message, separators=(',', ':')).encode() + b"\n"
+
+
+# On the wire a process is [pid, ppid, name, status, rss, create_time, cpu%]
+def _row(snapshot, i):
+    return [snapshot.pids[i], snapshot.ppids[i], snapshot.names[i], snapshot.statuses[i], snapshot.rss[i],
+            snapshot.create_times[i], round(snapshot.cpu_percent[i], 1)]
+
+
+# What a connection that last received `sent` needs to get to `snapshot`:
+# everything if it has nothing yet, else the pids that exited plus the
+# rows that are new or look different once rounded for the wire. A
+# recycled pid is both removed and re-added.
+def snapshot_delta(sent, snapshot):
+    if sent is None:
+        return {'full': True, 'removed': [], 'rows': [_row(snapshot, i) for i in range(len(snapshot))]}
+    if sent is snapshot:
+        return {'full': False, 'removed': [], 'rows': []}
+    diff = diff_snapshots(sent, snapshot)
+    rows = [_row(snapshot, j) for j in diff.added]
+    for j in diff.changed:
+        row = _row(snapshot, j)
+        if row != _row(sent, sent.find(snapshot.key(j))):
+            rows.append(row)
+    return {'full': False, 'removed': [sent.pids[i] for i in diff.removed], 'rows': rows}
+
+
+# pid -> row, updated in place from a snapshot_delta() reply
+def apply_delta(rows, delta):
+    if delta.get('full'):
+        rows.clear()
+    for pid in delta.get('removed') or ():
+        rows.pop(pid, None)
+    for row in delta.get('rows') or ():
+        rows[row[0]] = row
+
+
+# Latest snapshot, shared by every connection to an agent
+class SnapshotSource:
+    def __init__(self, min_interval=AGENT_MIN_INTERVAL, process_iter=psutil.process_iter):
+        self.min_interval = min_interval
+        self.process_iter = process_iter
+        self._latest = None
+        self._taken = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._latest is None or time.monotonic() - self._taken >= self.min_interval:
+                self._latest = collect_snapshot(self._latest, self.process_iter)
+                self._taken = time.monotonic()
+            return self._latest
+
+
+# Serves one host to fleet views. Every message is a JSON object on its own
+# line, answered with the same 'id'. A connection opens with
+# {"op": "hello", "token": ...}; after that
+#   {"op": "snapshot"}    -> snapshot_delta() since this connection's last one
+#   {"op": "api", "method", "path", "body"}
+#                         -> the ControlAPI request (kill, schedule, whitelist)
+# Kills and whitelist checks therefore run on the agent, against its own
+# KillerEngine. Blocking work runs in the default executor.
+class FleetAgent:
+    def __init__(self, api, token, source=None):
+        self.api = api
+        self.token = token
+        self.source = source or SnapshotSource()
+
+    async def handle(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        sent = None
+        authorized = False
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                    if not isinstance(message, dict):
+                        raise ValueError("expected a JSON object")
+                except ValueError as e:
+                    writer.write(_line({'error': f"invalid message: {e}", 'status': 400}))
+                    break
+                reply = {'id': message.get('id')}
+                op = message.get('op')
+                if not authorized:
+                    token = str(message.get('token') or '')
+                    if op != 'hello' or not hmac.compare_digest(token.encode(), self.token.encode()):
+                        reply.update(error="missing or wrong token", status=401)
+                        writer.write(_line(reply))
+                        break
+                    authorized = True
+                    reply.update(host=socket.gethostname(), version=PROTOCOL_VERSION)
+                elif op == 'snapshot':
+                    snapshot = await loop.run_in_executor(None, self.source.get)
+                    reply.update(snapshot_delta(sent, snapshot))
+                    sent = snapshot
+                elif op == 'api':
+                    query = {key: [str(value)] for key, value in (message.get('query') or {}).items()}
+                    try:
+                        reply['result'] = await loop.run_in_executor(
+                            None, self.api.handle, str(message.get('method') or 'GET'),
+                            str(message.get('path') or '/'), query, message.get('body'))
+                    except ApiError as e:
+                        reply.update(error=str(e), status=e.status)
+                    except Exception as e:
+                        reply.update(error=str(e), status=500)
+                else:
+                    reply.update(error=f"unknown op {op!r}", status=400)
+                writer.write(_line(reply))
+                await writer.drain()
+        except (ConnectionError, ValueError, asyncio.CancelledError):
+            # Dropped connections, request lines over MAX_REQUEST_LINE and
+            # connections still open when the agent shuts down
+            pass
+        finally:
+            writer.close()
+
+
+# Runs a FleetAgent on its own event loop thread until shutdown()
+class AgentServer:
+    def __init__(self, agent, port, host="127.0.0.1"):
+        self.loop = asyncio.new_event_loop()
+        self.address = None
+        self._error = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(agent, host, port), name="fleet-agent", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error:
+            self._thread.join()
+            raise self._error
+
+    def _run(self, agent, host, port):
+        asyncio.set_event_loop(self.loop)
+        try:
+            server = self.loop.run_until_complete(
+                asyncio.start_server(agent.handle, host, port, limit=MAX_REQUEST_LINE))
+        except OSError as e:
+            self._error = e
+            self._ready.set()
+            self.loop.close()
+            return
+        self.address = server.sockets[0].getsockname()[:2]
+        self._ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            server.close()
+            _finish_tasks(self.loop)
+            self.loop.run_until_complete(server.wait_closed())
+            self.loop.close()
+
+    def shutdown(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+
+
+# One persistent connection to an agent, opened on first use and reopened
+# after failures with a growing delay. Requests are pipelined: each carries
+# an id and its reply is matched by the read loop, so a slow kill never
+# holds up snapshot polls. Any failure closes the connection and clears
+# `rows`, since the agent's delta state for it is gone too.
+class AgentConnection:
+    def __init__(self, address, token):
+        self.address = address
+        self.host, self.port = parse_address(address)
+        self.token = token
+        self.hostname = None
+        self.rows = {}
+        self.error = None
+        # Whitelist rules this fleet view has pushed to the agent
+        self.pushed = set()
+        self._writer = None
+        self._pending = {}
+        self._next_id = 1
+        self._failures = 0
+        self._retry_at = 0.0
+        self._connect_lock = asyncio.Lock()
+
+    @property
+    def connected(self):
+        return self._writer is not None
+
+    async def _connect(self, gate):
+        if time.monotonic() < self._retry_at:
+            raise ConnectionError(self.error or "waiting to reconnect")
+        try:
+            async with gate:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port, limit=MAX_REPLY_LINE), CONNECT_TIMEOUT)
+        except (OSError, asyncio.TimeoutError) as e:
+            self._failed(str(e) or "connection timed out")
+            raise ConnectionError(self.error)
+        self._writer = writer
+        asyncio.ensure_future(self._read_loop(reader, writer))
+        self.rows = {}
+        try:
+            reply = await self._send({'op': 'hello', 'token': self.token})
+        except (AgentError, ConnectionError, OSError, asyncio.TimeoutError) as e:
+            self._drop(writer, str(e) or "no reply")
+            # An agent that refuses the token hangs up right after saying so
+            if isinstance(e, AgentError):
+                self.error = str(e)
+            raise ConnectionError(self.error)
+        self.hostname = reply.get('host')
+        self._failures = 0
+        self.error = None
+
+    async def request(self, gate, op, **fields):
+        if self._writer is None:
+            async with self._connect_lock:
+                if self._writer is None:
+                    await self._connect(gate)
+        writer = self._writer
+        try:
+            return await self._send(dict(fields, op=op))
+        except (ConnectionError, OSError, asyncio.TimeoutError) as e:
+            self._drop(writer, str(e) or "request timed out")
+            raise ConnectionError(self.error)
+
+    async def _send(self, message):
+        rid = self._next_id
+        self._next_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[rid] = future
+        try:
+            self._writer.write(_line(dict(message, id=rid)))
+            await self._writer.drain()
+            reply = await asyncio.wait_for(future, REQUEST_TIMEOUT)
+        finally:
+            self._pending.pop(rid, None)
+        if 'error' in reply:
+            raise AgentError(reply['error'], reply.get('status'))
+        return reply
+
+    async def _read_loop(self, reader, writer):
+        error = "connection closed by agent"
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                reply = json.loads(line)
+                future = self._pending.get(reply.get('id'))
+                if future is not None and not future.done():
+                    future.set_result(reply)
+        except (OSError, ValueError) as e:
+            error = str(e)
+        self._drop(writer, error)
+
+    def _failed(self, error):
+        self.error = error
+        self._failures += 1
+        self._retry_at = time.monotonic() + RECONNECT_DELAYS[min(self._failures, len(RECONNECT_DELAYS)) - 1]
+
+    def _drop(self, writer, error):
+        if writer is not self._writer or writer is None:
+            return
+        self._writer = None
+        self.rows = {}
+        writer.close()
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError(error))
+        self._failed(error)
+
+    async def poll(self, gate):
+        # Connecting replaces `rows`, so it is looked up after the reply
+        reply = await self.request(gate, 'snapshot')
+        apply_delta(self.rows, reply)
+
+    async def api(self, gate, method, path, body=None):
+        reply = await self.request(gate, 'api', method=method, path=path, body=body)
+        return reply['result']
+
+    def close(self):
+        self._drop(self._writer, "closed")
+
+
+# Fleet side: polls every agent concurrently from one event loop thread and
+# merges their processes into a single ProcessSnapshot whose `hosts` column
+# names the agent of each row. on_snapshot(snapshot) and
+# on_event(level, message) are called on that thread. Overlapping
+# refresh() calls are coalesced into one follow-up round.
+class FleetClient:
+    def __init__(self, addresses, token, on_snapshot, on_event=None):
+        self.connections = {}
+        for address in addresses:
+            self.connections.setdefault(address.strip(), AgentConnection(address.strip(), token))
+        self.on_snapshot = on_snapshot
+        self.on_event = on_event or (lambda level, message: None)
+        self.whitelist = set()
+        self.loop = asyncio.new_event_loop()
+        self._gate = asyncio.Semaphore(MAX_CONNECTING)
+        self._polling = False
+        self._poll_again = False
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="fleet-client", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+        finally:
+            _finish_tasks(self.loop)
+            self.loop.close()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._call(self._close()).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self._thread = None
+
+    async def _close(self):
+        for conn in self.connections.values():
+            conn.close()
+
+    def _call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def connected_count(self):
+        return sum(1 for conn in self.connections.values() if conn.connected)
+
+    # The next round of polls; thread-safe
+    def refresh(self):
+        self._call(self._refresh())
+
+    async def _refresh(self):
+        if self._polling:
+            self._poll_again = True
+            return
+        self._polling = True
+        try:
+            while True:
+                self._poll_again = False
+                await asyncio.gather(*(self._poll(conn) for conn in self.connections.values()))
+                self.on_snapshot(self.merge())
+                if not self._poll_again:
+                    break
+        finally:
+            self._polling = False
+
+    async def _poll(self, conn):
+        was_connected, had_error = conn.connected, conn.error
+        try:
+            if not was_connected:
+                await self._sync_whitelist(conn)
+            await conn.poll(self._gate)
+        except (ConnectionError, AgentError) as e:
+            if was_connected or had_error is None:
+                self.on_event("WARNING", f"Agent {conn.address}: {e}")
+            return
+        if not was_connected:
+            self.on_event("INFO", f"Connected to agent {conn.address} ({conn.hostname}).")
+
+    # Makes the agent's whitelist include this view's user rules, and drop
+    # the ones this view pushed earlier and has removed since
+    async def _sync_whitelist(self, conn):
+        rules = set(self.whitelist)
+        add, remove = sorted(rules), sorted(conn.pushed - rules)
+        if add or remove:
+            await conn.api(self._gate, 'POST', '/whitelist', {'add': add, 'remove': remove})
+        conn.pushed = rules
+
+    def set_whitelist(self, rules):
+        self._call(self._set_whitelist(set(rules)))
+
+    async def _set_whitelist(self, rules):
+        self.whitelist = rules
+        for conn in self.connections.values():
+            if conn.connected:
+                try:
+                    await self._sync_whitelist(conn)
+                except (ConnectionError, AgentError) as e:
+                    self.on_event("WARNING", f"Agent {conn.address}: could not update the whitelist: {e}")
+
+    # Every row of every connected agent, in agent order
+    def merge(self):
+        pids, ppids, names, statuses, rss, create_times, cpu_percent, hosts = [], [], [], [], [], [], [], []
+        for conn in self.connections.values():
+            rows = conn.rows.values()
+            for pid, ppid, name, status, mem, create_time, cpu in rows:
+                pids.append(pid)
+                ppids.append(ppid)
+                names.append(name)
+                statuses.append(status)
+                rss.append(mem)
+                create_times.append(create_time)
+                cpu_percent.append(cpu)
+            hosts.extend([conn.address] * len(rows))
+        return ProcessSnapshot(pids, names, statuses, rss, create_times, None, cpu_percent, time.time(), ppids,
+                               hosts=hosts)
+
+    # Task dicts carry 'host'; each agent gets one request for its share
+    def kill(self, tasks):
+        self._call(self._send_tasks(tasks, '/kill', 'targets', self._kill_entry))
+
+    def schedule(self, tasks):
+        self._call(self._send_tasks(tasks, '/tasks', 'tasks', self._schedule_entry))
+
+    @staticmethod
+    def _kill_entry(task):
+        return {'pid': task['pid'], 'create_time': task.get('create_time'), 'tree': bool(task.get('tree'))}
+
+    @classmethod
+    def _schedule_entry(cls, task):
+        return dict(cls._kill_entry(task), at=task['deadline'])
+
+    async def _send_tasks(self, tasks, path, key, entry):
+        by_host = {}
+        for task in tasks:
+            by_host.setdefault(task['host'], []).append(task)
+        await asyncio.gather(*(self._send_host_tasks(host, batch, path, key, entry)
+                               for host, batch in by_host.items()))
+
+    async def _send_host_tasks(self, host, tasks, path, key, entry):
+        conn = self.connections.get(host)
+        if conn is None:
+            self.on_event("WARNING", f"No agent {host} in this fleet.")
+            return
+        try:
+            result = await conn.api(self._gate, 'POST', path, {key: [entry(task) for task in tasks]})
+        except (ConnectionError, AgentError) as e:
+            self.on_event("WARNING", f"Agent {host}: {path} failed: {e}")
+            return
+        if path == '/kill':
+            if result['submitted']:
+                self.on_event("INFO", f"Agent {host}: killing {len(result['submitted'])} processes.")
+            for pid in result['protected']:
+                self.on_event("WARNING", f"Agent {host}: prevented kill of whitelisted process {pid}.")
+        else:
+            for task in result['scheduled']:
+                when = time.strftime('%H:%M:%S', time.localtime(task['deadline']))
+                self.on_event("INFO", f"Agent {host}: scheduled kill for '{task['name']}' ({task['pid']}) at {when}.")
+        for error in result['errors']:
+            self.on_event("WARNING", f"Agent {host}: {error['error']}")
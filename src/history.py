@@ -0,0 +1,77 @@
+from array import array
+
+MB = 1024 * 1024
+
+DEFAULT_SAMPLES = 60
+
+
+# Fixed-size ring buffers of RSS (MB) and CPU% for every live process.
+# Each process owns a slot of `samples` float32 cells in two flat arrays;
+# all slots share one write position because every snapshot samples every
+# process at once. Slots of exited processes go back to a free list, so
+# memory is bounded by samples x peak live processes and recording a sample
+# allocates no Python objects.
+class MetricsHistory:
+    def __init__(self, samples=DEFAULT_SAMPLES):
+        self.samples = samples
+        self.clear()
+
+    # Forgets every series, e.g. when replay jumps to another point in time
+    def clear(self):
+        self._slots = {}
+        self._free = []
+        self._rss = array('f')
+        self._cpu = array('f')
+        self._count = array('l')
+        self._seen = array('q')
+        self._tick = 0
+
+    def __len__(self):
+        return len(self._slots)
+
+    def capacity(self):
+        return len(self._count)
+
+    def record(self, snapshot):
+        samples = self.samples
+        pos = self._tick % samples
+        self._tick += 1
+        tick = self._tick
+        slots, rss, cpu, count, seen = self._slots, self._rss, self._cpu, self._count, self._seen
+        snap_rss, snap_cpu = snapshot.rss, snapshot.cpu_percent
+        for i, key in enumerate(snapshot.keys()):
+            slot = slots.get(key)
+            if slot is None:
+                slot = slots[key] = self._allocate()
+            cell = slot * samples + pos
+            rss[cell] = snap_rss[i] / MB
+            cpu[cell] = snap_cpu[i]
+            if count[slot] < samples:
+                count[slot] += 1
+            seen[slot] = tick
+        gone = [key for key, slot in slots.items() if seen[slot] != tick]
+        for key in gone:
+            self._free.append(slots.pop(key))
+
+    def series(self, key, metric='rss'):
+        slot = self._slots.get(key)
+        if slot is None:
+            return []
+        values = self._rss if metric == 'rss' else self._cpu
+        samples = self.samples
+        n = self._count[slot]
+        end = (self._tick - 1) % samples
+        base = slot * samples
+        return [values[base + (end - k) % samples] for k in range(n - 1, -1, -1)]
+
+    def _allocate(self):
+        if self._free:
+            slot = self._free.pop()
+        else:
+            slot = len(self._count)
+            self._rss.extend(array('f', [0.0]) * self.samples)
+            self._cpu.extend(array('f', [0.0]) * self.samples)
+            self._count.append(0)
+            self._seen.append(0)
+        self._count[slot] = 0
+        return slot
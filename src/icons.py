@@ -0,0 +1,12 @@
+_cache = {}
+
+
+# qtawesome is slow to import and loads its icon fonts on first use, so it
+# is only imported once the first icon is actually needed.
+def icon(name, color='white'):
+    key = (name, color)
+    cached = _cache.get(key)
+    if cached is None:
+        import qtawesome as qta
+        cached = _cache[key] = qta.icon(name, color=color)
+    return cached
@@ -0,0 +1,76 @@
+import time
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+
+from .killer import DEFAULT_GRACE, KillResult, kill_targets
+from .metrics import KILL_LATENCY
+
+MAX_CONCURRENT_BATCHES = 4
+
+
+class _KillSignals(QObject):
+    result = pyqtSignal(object)
+    finished = pyqtSignal(list)
+
+
+class _KillBatch(QRunnable):
+    def __init__(self, tasks, grace, is_protected, signals):
+        super().__init__()
+        self.tasks = tasks
+        self.grace = grace
+        self.is_protected = is_protected
+        self.signals = signals
+        self.submitted = time.perf_counter()
+
+    def run(self):
+        try:
+            results = kill_targets(self.tasks, self.grace, self.is_protected)
+        except Exception as e:
+            results = [KillResult(task, 'failed', str(e)) for task in self.tasks]
+        latency = (time.perf_counter() - self.submitted) * 1000
+        for _ in results:
+            KILL_LATENCY.observe(latency)
+        for r in results:
+            self.signals.result.emit(r)
+        self.signals.finished.emit(results)
+
+
+# Runs kills on a thread pool. Targets submitted during the same event loop
+# iteration are sent as one batch, so they share a single grace period.
+class KillEngine(QObject):
+    result = pyqtSignal(object)
+    batch_finished = pyqtSignal(list)
+
+    def __init__(self, parent=None, grace=DEFAULT_GRACE, is_protected=None):
+        super().__init__(parent)
+        self.grace = grace
+        self.is_protected = is_protected
+        self._pending = []
+        self._pool = QThreadPool(self)
+        # Batches mostly sleep in wait_procs, so don't tie them to the core count
+        self._pool.setMaxThreadCount(MAX_CONCURRENT_BATCHES)
+        self._signals = _KillSignals(self)
+        self._signals.result.connect(self.result)
+        self._signals.finished.connect(self.batch_finished)
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(0)
+        self._flush_timer.timeout.connect(self._flush)
+
+    def submit(self, task):
+        self._pending.append(task)
+        self._flush_timer.start()
+
+    def submit_many(self, tasks):
+        self._pending.extend(tasks)
+        self._flush_timer.start()
+
+    def stop(self, timeout_ms=5000):
+        self._flush_timer.stop()
+        self._pending = []
+        self._pool.waitForDone(timeout_ms)
+
+    def _flush(self):
+        tasks, self._pending = self._pending, []
+        if tasks:
+            self._pool.start(_KillBatch(tasks, self.grace, self.is_protected, self._signals))
@@ -0,0 +1,147 @@
+from collections import namedtuple
+
+import psutil
+
+from .procwatch import ExitWatcher
+
+DEFAULT_GRACE = 3.0
+
+# outcome: 'terminated', 'killed', 'not_found', 'reused', 'protected',
+# 'denied' or 'failed'
+KillResult = namedtuple('KillResult', ['task', 'outcome', 'detail'])
+
+
+# (log level, message) describing a KillResult, shared by the GUI and daemon
+def describe_result(result):
+    task = result.task
+    target = f"{task['name']} ({task['pid']})"
+    if result.outcome == 'terminated':
+        return "CRITICAL", f"Process {target} was killed."
+    if result.outcome == 'killed':
+        return "CRITICAL", f"Process {target} was force killed."
+    if result.outcome == 'not_found':
+        return "INFO", f"Process {target} not found or already dead."
+    if result.outcome == 'reused':
+        return "INFO", f"Process {target} already exited; PID now belongs to '{result.detail}'."
+    if result.outcome == 'protected':
+        return "WARNING", f"Prevented kill of whitelisted process: {target}"
+    return "WARNING", f"Failed to kill {target}: {result.detail}"
+
+
+# Splits tasks into those whose process (same pid and create_time) is still
+# running and those that exited or whose pid was reused.
+def split_live(tasks):
+    pids = set(psutil.pids())
+    live, gone = [], []
+    for task in tasks:
+        alive = False
+        if task['pid'] in pids:
+            try:
+                alive = not task.get('create_time') or psutil.Process(task['pid']).create_time() == task['create_time']
+            except psutil.AccessDenied:
+                alive = True
+            except psutil.Error:
+                pass
+        (live if alive else gone).append(task)
+    return live, gone
+
+
+# Replaces every task flagged with 'tree' by its descendants followed by the
+# task itself, deepest processes first, so children are signalled before
+# their parents can respawn them.
+def expand_tree(tasks):
+    expanded = []
+    seen = set()
+    for task in tasks:
+        if task['pid'] in seen:
+            continue
+        seen.add(task['pid'])
+        if not task.get('tree'):
+            expanded.append(task)
+            continue
+        try:
+            root = psutil.Process(task['pid'])
+            if task.get('create_time') and root.create_time() != task['create_time']:
+                expanded.append(task)
+                continue
+            children = root.children(recursive=True)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            expanded.append(task)
+            continue
+        depth = {root.pid: 0}
+        members = []
+        for child in children:
+            try:
+                depth[child.pid] = depth.get(child.ppid(), 0) + 1
+                members.append({'pid': child.pid, 'name': child.name(), 'create_time': child.create_time(),
+                                'type': task.get('type'), 'root': task})
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+        members.sort(key=lambda m: depth[m['pid']], reverse=True)
+        for member in members:
+            if member['pid'] not in seen:
+                seen.add(member['pid'])
+                expanded.append(member)
+        expanded.append(task)
+    return expanded
+
+
+# Terminates every target at once, waits a single grace period for the whole
+# batch, then force-kills whatever is still alive. Exits are waited for with
+# an ExitWatcher (pidfds on Linux), so results arrive as processes die.
+# Tree tasks are expanded first and the whole set is checked against
+# is_protected before anything is signalled.
+def kill_targets(tasks, grace=DEFAULT_GRACE, is_protected=None):
+    results = []
+    pending = {}
+    if any(task.get('tree') for task in tasks):
+        tasks = expand_tree(tasks)
+    if is_protected is not None:
+        allowed = []
+        for task in tasks:
+            if is_protected(task['name'], pid=task['pid'], create_time=task.get('create_time')):
+                results.append(KillResult(task, 'protected', ""))
+            else:
+                allowed.append(task)
+        tasks = allowed
+    watcher = ExitWatcher()
+    try:
+        for task in tasks:
+            p = None
+            try:
+                p = psutil.Process(task['pid'])
+                if task.get('create_time') and p.create_time() != task['create_time']:
+                    results.append(KillResult(task, 'reused', p.name()))
+                    continue
+                watcher.add(p)
+                p.terminate()
+                pending[p] = task
+            except psutil.NoSuchProcess:
+                watcher.discard(p)
+                results.append(KillResult(task, 'not_found', ""))
+            except psutil.AccessDenied as e:
+                watcher.discard(p)
+                results.append(KillResult(task, 'denied', str(e)))
+        if not pending:
+            return results
+
+        gone, alive = watcher.wait(grace)
+        results.extend(KillResult(pending[p], 'terminated', "") for p in gone)
+
+        forced = False
+        for p in alive:
+            try:
+                p.kill()
+                forced = True
+            except psutil.NoSuchProcess:
+                pass
+            except psutil.AccessDenied as e:
+                watcher.discard(p)
+                results.append(KillResult(pending[p], 'denied', str(e)))
+        if alive:
+            gone, alive = watcher.wait(grace if forced else 0)
+            results.extend(KillResult(pending[p], 'killed', "") for p in gone)
+            results.extend(KillResult(pending[p], 'failed', "still running after kill") for p in alive)
+        return results
+    finally:
+        watcher.close()
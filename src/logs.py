@@ -0,0 +1,67 @@
+import json
+import logging
+import logging.handlers
+import os
+import queue
+from collections import deque
+
+LOGGER_NAME = "qt-xkiller"
+LOG_FORMAT = "[%(asctime)s] [%(levelname)s] %(message)s"
+LOG_DATEFMT = "%H:%M:%S"
+LOG_CAPACITY = 5000
+MAX_LOG_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 3
+
+
+# One JSON object per line, for the rotating file sink
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {'ts': round(record.created, 3), 'level': record.levelname, 'logger': record.name,
+                 'msg': record.getMessage()}
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+# Keeps the last `capacity` formatted lines for the Logs tab, plus the lines
+# the view has not picked up yet. Both are bounded, so a burst of messages
+# only ever costs one deque append each.
+class LogBuffer(logging.Handler):
+    def __init__(self, capacity=LOG_CAPACITY):
+        super().__init__()
+        self.setFormatter(logging.Formatter(LOG_FORMAT, LOG_DATEFMT))
+        self.records = deque(maxlen=capacity)
+        self.pending = deque(maxlen=capacity)
+
+    def emit(self, record):
+        entry = (record.levelno, self.format(record))
+        self.records.append(entry)
+        self.pending.append(entry)
+
+    def lines(self, min_level=logging.NOTSET):
+        with self.lock:
+            return [text for level, text in self.records if level >= min_level]
+
+    # Lines logged since the last call, oldest first
+    def take_pending(self, min_level=logging.NOTSET):
+        with self.lock:
+            entries = list(self.pending)
+            self.pending.clear()
+        return [text for level, text in entries if level >= min_level]
+
+
+# Writes records of `logger` as JSON lines to a size-rotated file. Records
+# are handed over through a queue, so file I/O happens on the listener's
+# thread; call stop() on the returned listener to flush on exit.
+def start_file_sink(logger, path, max_bytes=MAX_LOG_BYTES, backups=LOG_BACKUPS):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    file_handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                                        encoding='utf-8', delay=True)
+    file_handler.setFormatter(JsonFormatter())
+    records = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(records))
+    listener = logging.handlers.QueueListener(records, file_handler)
+    listener.start()
+    return listener
@@ -0,0 +1,208 @@
+import bisect
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIX = "qtxkiller"
+# Bucket upper bounds in milliseconds; anything slower lands in +Inf
+DEFAULT_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+TEXTFILE_INTERVAL = 15.0
+
+
+class _Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe((time.perf_counter() - self.start) * 1000)
+
+
+# Fixed-bucket latency histogram in milliseconds. observe() is a bisect and
+# a few additions under a lock, so it can sit on hot paths and be fed from
+# any thread.
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.bounds = tuple(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, ms):
+        i = bisect.bisect_left(self.bounds, ms)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.total += ms
+            if ms > self.max:
+                self.max = ms
+
+    def time(self):
+        return _Timer(self)
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    # Estimated by interpolating inside the bucket that holds the quantile
+    def quantile(self, q):
+        with self._lock:
+            counts, count, peak = list(self.counts), self.count, self.max
+        if not count:
+            return 0.0
+        rank = q * count
+        seen = 0
+        for i, n in enumerate(counts):
+            if n and seen + n >= rank:
+                low = self.bounds[i - 1] if i else 0.0
+                high = self.bounds[i] if i < len(self.bounds) else peak
+                return min(peak, low + (high - low) * (rank - seen) / n)
+            seen += n
+        return peak
+
+    def label_text(self):
+        return ",".join(f'{k}="{_escape(v)}"' for k, v in self.labels)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _seconds(ms):
+    return repr(ms / 1000)
+
+
+class MetricsRegistry:
+    def __init__(self, prefix=PREFIX):
+        self.prefix = prefix
+        self.exports = []
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name, help, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(name, help, key[1])
+            return histogram
+
+    def remove(self, name, **labels):
+        with self._lock:
+            self._histograms.pop((name, tuple(sorted(labels.items()))), None)
+
+    def histograms(self):
+        with self._lock:
+            return sorted(self._histograms.values(), key=lambda h: (h.name, h.labels))
+
+    # Prometheus text exposition format, in seconds as Prometheus expects
+    def render(self):
+        lines = []
+        described = set()
+        for h in self.histograms():
+            metric = f"{self.prefix}_{h.name}_seconds"
+            if metric not in described:
+                described.add(metric)
+                lines.append(f"# HELP {metric} {h.help}")
+                lines.append(f"# TYPE {metric} histogram")
+            with h._lock:
+                counts, count, total = list(h.counts), h.count, h.total
+            labels = h.label_text()
+            sep = "," if labels else ""
+            cumulative = 0
+            for bound, n in zip(h.bounds + (None,), counts):
+                cumulative += n
+                le = "+Inf" if bound is None else _seconds(bound)
+                lines.append(f'{metric}_bucket{{{labels}{sep}le="{le}"}} {cumulative}')
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{metric}_sum{suffix} {_seconds(total)}")
+            lines.append(f"{metric}_count{suffix} {count}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+ENUMERATION = REGISTRY.histogram("enumeration", "Process enumeration on the collector thread.")
+SNAPSHOT_APPLY = REGISTRY.histogram("snapshot_apply", "Applying a new snapshot to the process table.")
+FILTER = REGISTRY.histogram("filter", "Re-filtering the process table for the search text.")
+TABLE_PAINT = REGISTRY.histogram("table_paint", "Painting the process table.")
+SCHEDULER_LAG = REGISTRY.histogram("scheduler_lag", "Delay between a scheduled kill's deadline and it firing.")
+KILL_LATENCY = REGISTRY.histogram("kill_latency", "Time from submitting a kill to its result.")
+RULE_MATCH = REGISTRY.histogram("rule_match", "Matching watchdog name patterns against a snapshot.")
+
+
+def rule_histogram(rule_text):
+    return REGISTRY.histogram("rule_eval", "Evaluating one watchdog rule against a snapshot.", rule=rule_text)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Serves GET /metrics on localhost from a daemon thread
+def start_metrics_server(port, registry=REGISTRY, host="127.0.0.1"):
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    server.registry = registry
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    registry.exports.append(f"http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+def write_textfile(path, registry=REGISTRY):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        f.write(registry.render())
+    os.replace(tmp, path)
+
+
+# Rewrites `path` every `interval` seconds (node_exporter textfile collector
+# style) until stop() is called. Each write replaces the file atomically.
+class TextfileWriter(threading.Thread):
+    def __init__(self, path, interval=TEXTFILE_INTERVAL, registry=REGISTRY):
+        super().__init__(name="metrics-textfile", daemon=True)
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self._stopped = threading.Event()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        registry.exports.append(path)
+
+    def run(self):
+        self._write()
+        while not self._stopped.wait(self.interval):
+            self._write()
+
+    def stop(self):
+        self._stopped.set()
+        self._write()
+
+    def _write(self):
+        try:
+            write_textfile(self.path, self.registry)
+        except OSError:
+            pass
@@ -0,0 +1,60 @@
+from array import array
+
+
+# "Chrome.exe" and "chrome" are the same application
+def normalize_name(name):
+    name = name.lower()
+    return name[:-4] if name.endswith('.exe') else name
+
+
+# Processes of one ProcessSnapshot grouped by normalized name, built in a
+# single pass over the name, rss and cpu columns. Group g has members[g]
+# (snapshot rows), count[g], total_rss[g], max_rss[g] and total_cpu[g];
+# group_of[i] is the group of snapshot row i.
+class ProcessGroups:
+    __slots__ = ('names', 'members', 'count', 'total_rss', 'max_rss', 'total_cpu', 'group_of')
+
+    def __init__(self, snapshot):
+        n = len(snapshot)
+        names, members = [], []
+        count, total_rss, max_rss, total_cpu = array('l'), array('Q'), array('Q'), array('d')
+        group_of = array('l', [0]) * n
+        by_key = {}
+        # Raw name -> group, so each distinct spelling is normalized once
+        by_name = {}
+        for i, (name, rss, cpu) in enumerate(zip(snapshot.names, snapshot.rss, snapshot.cpu_percent)):
+            g = by_name.get(name)
+            if g is None:
+                key = normalize_name(name)
+                g = by_key.get(key)
+                if g is None:
+                    g = by_key[key] = len(names)
+                    names.append(key)
+                    members.append(array('l'))
+                    count.append(0)
+                    total_rss.append(0)
+                    max_rss.append(0)
+                    total_cpu.append(0.0)
+                by_name[name] = g
+            group_of[i] = g
+            members[g].append(i)
+            count[g] += 1
+            total_rss[g] += rss
+            if rss > max_rss[g]:
+                max_rss[g] = rss
+            total_cpu[g] += cpu
+        self.names = tuple(names)
+        self.members = members
+        self.count = count
+        self.total_rss = total_rss
+        self.max_rss = max_rss
+        self.total_cpu = total_cpu
+        self.group_of = group_of
+
+    def __len__(self):
+        return len(self.names)
+
+    # Groups containing any of the given snapshot rows
+    def groups_of(self, rows):
+        group_of = self.group_of
+        return sorted({group_of[r] for r in rows})
@@ -0,0 +1,562 @@
+from array import array
+
+from PyQt6.QtCore import Qt, QAbstractItemModel, QAbstractTableModel, QModelIndex
+
+from .snapshot import ProcessSnapshot
+from .sparkline import HISTORY_ROLE
+
+MB = 1024 * 1024
+
+# (header, snapshot column, display formatter). The 'history' column has no
+# snapshot data; it is drawn by SparklineDelegate from MetricsHistory.
+COLUMNS = [
+    ("PID", 'pids', str),
+    ("Name", 'names', str),
+    ("Status", 'statuses', str),
+    ("Memory (MB)", 'rss', lambda v: f"{v / MB:.2f} MB"),
+    ("CPU %", 'cpu_percent', lambda v: f"{v:.1f}"),
+    ("Memory Trend", 'history', None),
+]
+
+HISTORY_COLUMN = 5
+
+# Fleet mode adds the agent each process was reported by
+FLEET_COLUMNS = COLUMNS + [("Host", 'hosts', str)]
+
+# Slow per-process attributes, read from a DetailCache instead of the
+# snapshot; cells stay empty until their row has been on screen
+DETAIL_COLUMNS = [
+    ("USS (MB)", 'uss', lambda v: f"{v / MB:.2f} MB"),
+    ("PSS (MB)", 'pss', lambda v: f"{v / MB:.2f} MB"),
+    ("Threads", 'threads', str),
+    ("Open Files", 'open_files', str),
+    ("Read (MB)", 'read_bytes', lambda v: f"{v / MB:.1f} MB"),
+    ("Written (MB)", 'write_bytes', lambda v: f"{v / MB:.1f} MB"),
+    ("User", 'username', str),
+]
+DETAIL_ATTRS = {attr for _, attr, _ in DETAIL_COLUMNS}
+
+NUMERIC_COLUMNS = {'pids', 'rss', 'cpu_percent', 'subtree_rss', 'subtree_count',
+                   'count', 'total_rss', 'max_rss', 'total_cpu',
+                   'uss', 'pss', 'threads', 'open_files', 'read_bytes', 'write_bytes'}
+
+# Tree mode drops the sparkline and adds whole-subtree aggregates, which
+# live on the snapshot's ProcessTree rather than the snapshot itself
+TREE_COLUMNS = COLUMNS[:HISTORY_COLUMN] + [
+    ("Tree Memory (MB)", 'subtree_rss', lambda v: f"{v / MB:.2f} MB"),
+    ("Tree Processes", 'subtree_count', str),
+]
+TREE_ATTRS = {'subtree_rss', 'subtree_count'}
+
+# Children handed to the view per fetchMore(), so expanding a parent with
+# tens of thousands of children stays cheap
+TREE_FETCH_BATCH = 500
+
+# Group mode: (header, ProcessGroups column, snapshot column for member
+# rows, formatter). None leaves the cell empty on that level.
+GROUP_COLUMNS = [
+    ("Name", 'names', 'names', str),
+    ("PID", None, 'pids', str),
+    ("Instances", 'count', None, str),
+    ("Memory (MB)", 'total_rss', 'rss', lambda v: f"{v / MB:.2f} MB"),
+    ("Max Memory (MB)", 'max_rss', None, lambda v: f"{v / MB:.2f} MB"),
+    ("CPU %", 'total_cpu', 'cpu_percent', lambda v: f"{v:.1f}"),
+]
+
+
+# Table model over a columnar ProcessSnapshot. The visible rows are an index
+# layer (an array of snapshot row numbers) so filtering and sorting never
+# allocate per-cell objects.
+class ProcessTableModel(QAbstractTableModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._snapshot = ProcessSnapshot()
+        self._rows = array('l')
+        self._sort_column = -1
+        self._sort_order = Qt.SortOrder.AscendingOrder
+        self.columns = COLUMNS
+        self.history = None
+        self.details = None
+
+    def snapshot(self):
+        return self._snapshot
+
+    def set_columns(self, columns):
+        self.beginResetModel()
+        self.columns = columns
+        if self._sort_column >= len(columns):
+            self._sort_column = -1
+        self.endResetModel()
+
+    # Snapshot column value of a snapshot row, or its cached detail (None
+    # until fetched)
+    def value(self, row, attr):
+        if attr in DETAIL_ATTRS:
+            details = self.details.get(self._snapshot.key(row)) if self.details is not None else None
+            return details.get(attr) if details else None
+        return getattr(self._snapshot, attr)[row]
+
+    # Repaints the detail cells after new details arrived
+    def refresh_details(self):
+        columns = [c for c, column in enumerate(self.columns) if column[1] in DETAIL_ATTRS]
+        if columns and self._rows:
+            self.dataChanged.emit(self.index(0, columns[0]), self.index(len(self._rows) - 1, columns[-1]))
+
+    def set_snapshot(self, snapshot, rows=None):
+        self.beginResetModel()
+        self._snapshot = snapshot
+        self._rows = array('l', range(len(snapshot)) if rows is None else rows)
+        self._apply_sort()
+        self.endResetModel()
+
+    def set_rows(self, rows):
+        self.beginResetModel()
+        self._rows = array('l', rows)
+        self._apply_sort()
+        self.endResetModel()
+
+    # Removes the rows at the given ascending positions, one range at a time
+    def _remove_positions(self, positions):
+        rows = self._rows
+        while positions:
+            last = positions.pop()
+            first = last
+            while positions and positions[-1] == first - 1:
+                first = positions.pop()
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del rows[first:last + 1]
+            self.endRemoveRows()
+
+    # Applies a new snapshot in place. `accept` is the search predicate:
+    # changed processes are checked again, so value filters such as mem>500
+    # drop rows that fell below them and pick up ones that rose above.
+    def apply_diff(self, snapshot, diff, accept):
+        # Removed processes go first, while the old snapshot still backs data()
+        remap = diff.remap
+        self._remove_positions([n for n, r in enumerate(self._rows) if remap[r] < 0])
+
+        # Surviving rows keep their position; only their snapshot row moves
+        self._snapshot = snapshot
+        self._rows = array('l', (remap[r] for r in self._rows))
+
+        changed = set(diff.changed)
+        entered = []
+        if changed:
+            listed = set(self._rows)
+            entered = [r for r in diff.changed if r not in listed and accept(r)]
+            self._remove_positions([n for n, r in enumerate(self._rows) if r in changed and not accept(r)])
+        rows = self._rows
+
+        if changed and rows:
+            positions = [n for n, r in enumerate(rows) if r in changed]
+            if positions:
+                self.dataChanged.emit(self.index(min(positions), 0),
+                                      self.index(max(positions), len(self.columns) - 1))
+
+        added = [r for r in diff.added if accept(r)] + entered
+        if added:
+            self.beginInsertRows(QModelIndex(), len(rows), len(rows) + len(added) - 1)
+            rows.extend(added)
+            self.endInsertRows()
+
+        if self._sort_column >= 0 and (added or diff.changed):
+            self.sort(self._sort_column, self._sort_order)
+
+    def process_at(self, row):
+        return self._snapshot.row(self._rows[row])
+
+    def snapshot_row(self, row):
+        return self._rows[row]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        _, attr, fmt = self.columns[index.column()]
+        if attr == 'history':
+            if role == HISTORY_ROLE and self.history is not None:
+                return self.history.series(self._snapshot.key(self._rows[index.row()]))
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            value = self.value(self._rows[index.row()], attr)
+            return "" if value is None else fmt(value)
+        if role == Qt.ItemDataRole.UserRole:
+            return self.value(self._rows[index.row()], attr)
+        if role == Qt.ItemDataRole.TextAlignmentRole and attr in NUMERIC_COLUMNS:
+            return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.columns[section][0]
+        return None
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self._sort_column = column
+        self._sort_order = order
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        tracked = [self._rows[i.row()] for i in persistent]
+        self._apply_sort()
+        if persistent:
+            position = {r: n for n, r in enumerate(self._rows)}
+            self.changePersistentIndexList(
+                persistent, [self.index(position[r], i.column()) for r, i in zip(tracked, persistent)])
+        self.layoutChanged.emit()
+
+    def _apply_sort(self):
+        if self._sort_column < 0:
+            return
+        attr = self.columns[self._sort_column][1]
+        if attr == 'history':
+            attr = 'rss'
+
+        if attr in DETAIL_ATTRS:
+            # Only rows that have been on screen have details; the rest sort first
+            missing = '' if attr == 'username' else -1
+            def key(i):
+                value = self.value(i, attr)
+                return missing if value is None else value
+        elif attr == 'names':
+            values = self._snapshot.names
+            key = lambda i: values[i].lower()
+        else:
+            key = getattr(self._snapshot, attr).__getitem__
+        reverse = self._sort_order == Qt.SortOrder.DescendingOrder
+        self._rows = array('l', sorted(self._rows, key=key, reverse=reverse))
+
+
+# Tree model over a snapshot's ProcessTree. Each index carries its snapshot
+# row as internalId. A parent's child list is filtered and sorted only
+# when the view first asks for it and is handed out in TREE_FETCH_BATCH
+# chunks via canFetchMore()/fetchMore(), so collapsed subtrees cost nothing.
+class ProcessTreeModel(QAbstractItemModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._snapshot = ProcessSnapshot()
+        self._tree = self._snapshot.tree()
+        self._visible = None
+        self._sort_column = -1
+        self._sort_order = Qt.SortOrder.AscendingOrder
+        self._clear_cache()
+
+    def _clear_cache(self):
+        # parent row (-1 for the top level) -> visible child rows in order
+        self._children = {}
+        # parent row -> how many of those the view has fetched
+        self._fetched = {}
+        # row -> position under its parent
+        self._position = {}
+
+    def snapshot(self):
+        return self._snapshot
+
+    def tree(self):
+        return self._tree
+
+    # rows: matching snapshot rows, or None for all. Ancestors of matches
+    # stay visible so every match keeps its place in the tree.
+    def set_snapshot(self, snapshot, rows=None):
+        self.beginResetModel()
+        self._snapshot = snapshot
+        self._tree = snapshot.tree()
+        self._visible = self._visible_rows(rows)
+        self._clear_cache()
+        self.endResetModel()
+
+    def set_rows(self, rows):
+        self.beginResetModel()
+        self._visible = self._visible_rows(rows)
+        self._clear_cache()
+        self.endResetModel()
+
+    def _visible_rows(self, rows):
+        if rows is None or len(rows) == len(self._snapshot):
+            return None
+        visible = set()
+        parents = self._tree.parents
+        for r in rows:
+            while r >= 0 and r not in visible:
+                visible.add(r)
+                r = parents[r]
+        return visible
+
+    def visible_count(self):
+        return len(self._snapshot) if self._visible is None else len(self._visible)
+
+    def _child_rows(self, node):
+        rows = self._children.get(node)
+        if rows is None:
+            rows = self._tree.roots if node < 0 else self._tree.children_of(node)
+            if self._visible is not None:
+                rows = [r for r in rows if r in self._visible]
+            rows = array('l', self._sorted(rows))
+            self._children[node] = rows
+            self._position.update((r, n) for n, r in enumerate(rows))
+        return rows
+
+    def _sorted(self, rows):
+        if self._sort_column < 0:
+            return rows
+        attr = TREE_COLUMNS[self._sort_column][1]
+        values = getattr(self._tree if attr in TREE_ATTRS else self._snapshot, attr)
+        if attr == 'names':
+            key = lambda i: values[i].lower()
+        else:
+            key = values.__getitem__
+        return sorted(rows, key=key, reverse=self._sort_order == Qt.SortOrder.DescendingOrder)
+
+    def _node(self, index):
+        return index.internalId() if index.isValid() else -1
+
+    def process_at(self, index):
+        return self._snapshot.row(index.internalId())
+
+    def snapshot_row(self, index):
+        return index.internalId()
+
+    # Index of a snapshot row, fetching its ancestors' child lists as needed
+    def index_of(self, row, column=0):
+        if self._visible is not None and row not in self._visible:
+            return QModelIndex()
+        parent = self._tree.parents[row]
+        parent_index = self.index_of(parent) if parent >= 0 else QModelIndex()
+        self._child_rows(parent)
+        position = self._position[row]
+        while self._fetched.get(parent, 0) <= position:
+            self.fetchMore(parent_index)
+        return self.createIndex(position, column, row)
+
+    def hasChildren(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return False
+        node = self._node(parent)
+        if node >= 0 and self._visible is None:
+            return bool(self._tree.children_of(node))
+        return len(self._child_rows(node)) > 0
+
+    def canFetchMore(self, parent):
+        if parent.column() > 0:
+            return False
+        node = self._node(parent)
+        return self._fetched.get(node, 0) < len(self._child_rows(node))
+
+    def fetchMore(self, parent):
+        node = self._node(parent)
+        have = self._fetched.get(node, 0)
+        total = len(self._child_rows(node))
+        count = min(TREE_FETCH_BATCH, total - have)
+        if count <= 0:
+            return
+        self.beginInsertRows(parent, have, have + count - 1)
+        self._fetched[node] = have + count
+        self.endInsertRows()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        return self._fetched.get(self._node(parent), 0)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(TREE_COLUMNS)
+
+    def index(self, row, column, parent=QModelIndex()):
+        node = self._node(parent)
+        if row < 0 or column < 0 or column >= len(TREE_COLUMNS) or row >= self._fetched.get(node, 0):
+            return QModelIndex()
+        return self.createIndex(row, column, self._child_rows(node)[row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        p = self._tree.parents[index.internalId()]
+        if p < 0:
+            return QModelIndex()
+        if p not in self._position:
+            self._child_rows(self._tree.parents[p])
+        return self.createIndex(self._position[p], 0, p)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        _, attr, fmt = TREE_COLUMNS[index.column()]
+        if role == Qt.ItemDataRole.DisplayRole or role == Qt.ItemDataRole.UserRole:
+            value = getattr(self._tree if attr in TREE_ATTRS else self._snapshot, attr)[index.internalId()]
+            return fmt(value) if role == Qt.ItemDataRole.DisplayRole else value
+        if role == Qt.ItemDataRole.TextAlignmentRole and attr in NUMERIC_COLUMNS:
+            return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return TREE_COLUMNS[section][0]
+        return None
+
+    # Siblings are sorted; the view restores expansion after the reset
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self._sort_column = column
+        self._sort_order = order
+        self.beginResetModel()
+        self._clear_cache()
+        self.endResetModel()
+
+
+# Two-level model over a snapshot's ProcessGroups: one row per application
+# with its members as children. Group indexes carry internalId 0 and member
+# indexes the group number + 1, so parent() needs no lookup table. Member
+# lists are filtered and sorted when a group is first expanded.
+class ProcessGroupModel(QAbstractItemModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._snapshot = ProcessSnapshot()
+        self._groups = self._snapshot.groups()
+        self._matched = None
+        self._visible = array('l')
+        self._sort_column = -1
+        self._sort_order = Qt.SortOrder.AscendingOrder
+        self._members = {}
+
+    def snapshot(self):
+        return self._snapshot
+
+    def groups(self):
+        return self._groups
+
+    # rows: matching snapshot rows, or None for all. Groups are shown when
+    # any member matches and list only the matching members; their totals
+    # always cover the whole application.
+    def set_snapshot(self, snapshot, rows=None):
+        self.beginResetModel()
+        self._snapshot = snapshot
+        self._groups = snapshot.groups()
+        self._update(rows)
+        self.endResetModel()
+
+    def set_rows(self, rows):
+        self.beginResetModel()
+        self._update(rows)
+        self.endResetModel()
+
+    def _update(self, rows):
+        if rows is None or len(rows) == len(self._snapshot):
+            self._matched = None
+            visible = range(len(self._groups))
+        else:
+            self._matched = set(rows)
+            visible = self._groups.groups_of(rows)
+        self._visible = array('l', self._sorted(visible, True))
+        self._members = {}
+
+    def _sorted(self, items, groups):
+        if self._sort_column < 0:
+            return items
+        _, group_attr, member_attr, _ = GROUP_COLUMNS[self._sort_column]
+        if groups:
+            source, attr = self._groups, group_attr
+        else:
+            source, attr = self._snapshot, member_attr
+        if attr is None:
+            return items
+        values = getattr(source, attr)
+        if attr == 'names':
+            key = lambda i: values[i].lower()
+        else:
+            key = values.__getitem__
+        return sorted(items, key=key, reverse=self._sort_order == Qt.SortOrder.DescendingOrder)
+
+    def _member_rows(self, g):
+        rows = self._members.get(g)
+        if rows is None:
+            rows = self._groups.members[g]
+            if self._matched is not None:
+                rows = [r for r in rows if r in self._matched]
+            rows = self._members[g] = array('l', self._sorted(rows, False))
+        return rows
+
+    def group_at(self, index):
+        return self._visible[index.row()] if index.internalId() == 0 else -1
+
+    def process_at(self, index):
+        return self._snapshot.row(self.snapshot_row(index))
+
+    def snapshot_row(self, index):
+        return self._member_rows(index.internalId() - 1)[index.row()]
+
+    # Snapshot rows behind an index: the listed members for a group row
+    def rows_at(self, index):
+        g = self.group_at(index)
+        return list(self._member_rows(g)) if g >= 0 else [self.snapshot_row(index)]
+
+    def index_of_group(self, g, column=0):
+        try:
+            return self.createIndex(self._visible.index(g), column, 0)
+        except ValueError:
+            return QModelIndex()
+
+    def index_of(self, row, column=0):
+        g = self._groups.group_of[row]
+        try:
+            return self.createIndex(self._member_rows(g).index(row), column, g + 1)
+        except ValueError:
+            return QModelIndex()
+
+    def rowCount(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return len(self._visible)
+        if parent.column() > 0 or parent.internalId() != 0:
+            return 0
+        return len(self._member_rows(self._visible[parent.row()]))
+
+    def hasChildren(self, parent=QModelIndex()):
+        return not parent.isValid() or (parent.column() == 0 and parent.internalId() == 0)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(GROUP_COLUMNS)
+
+    def index(self, row, column, parent=QModelIndex()):
+        if row < 0 or column < 0 or column >= len(GROUP_COLUMNS) or row >= self.rowCount(parent):
+            return QModelIndex()
+        if not parent.isValid():
+            return self.createIndex(row, column, 0)
+        return self.createIndex(row, column, self._visible[parent.row()] + 1)
+
+    def parent(self, index):
+        if not index.isValid() or index.internalId() == 0:
+            return QModelIndex()
+        return self.index_of_group(index.internalId() - 1)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        _, group_attr, member_attr, fmt = GROUP_COLUMNS[index.column()]
+        is_group = index.internalId() == 0
+        attr = group_attr if is_group else member_attr
+        if attr is None:
+            return None
+        if role == Qt.ItemDataRole.DisplayRole or role == Qt.ItemDataRole.UserRole:
+            if is_group:
+                value = getattr(self._groups, attr)[self._visible[index.row()]]
+            else:
+                value = getattr(self._snapshot, attr)[self.snapshot_row(index)]
+            return fmt(value) if role == Qt.ItemDataRole.DisplayRole else value
+        if role == Qt.ItemDataRole.TextAlignmentRole and attr in NUMERIC_COLUMNS:
+            return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return GROUP_COLUMNS[section][0]
+        return None
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self._sort_column = column
+        self._sort_order = order
+        self.beginResetModel()
+        self._visible = array('l', self._sorted(self._visible, True))
+        self._members = {}
+        self.endResetModel()
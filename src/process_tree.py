@@ -0,0 +1,70 @@
+from array import array
+
+
+# Parent/child structure of one ProcessSnapshot, built in a single pass over
+# the ppid column. Everything is in snapshot row numbers: parents[i] is the
+# parent's row or -1, children maps a row to its child rows. subtree_rss
+# and subtree_count cover a process and all of its descendants.
+class ProcessTree:
+    __slots__ = ('parents', 'children', 'roots', 'subtree_rss', 'subtree_count')
+
+    def __init__(self, snapshot):
+        pids, ppids, create_times = snapshot.pids, snapshot.ppids, snapshot.create_times
+        n = len(pids)
+        row_of = {pid: i for i, pid in enumerate(pids)}
+        parents = array('l', [-1]) * n
+        children = {}
+        for i, ppid in enumerate(ppids):
+            p = row_of.get(ppid, -1)
+            # A "parent" that started after its child holds a recycled pid
+            if p >= 0 and p != i and create_times[p] <= create_times[i]:
+                parents[i] = p
+                children.setdefault(p, []).append(i)
+        roots = [i for i in range(n) if parents[i] < 0]
+
+        # Parents before children. Rows never reached sit on a ppid cycle
+        # (possible with equal start times) and are cut loose as roots.
+        order = self._walk(roots, children)
+        if len(order) < n:
+            seen = set(order)
+            for i in range(n):
+                if i not in seen:
+                    children[parents[i]].remove(i)
+                    parents[i] = -1
+                    roots.append(i)
+                    walked = self._walk([i], children)
+                    seen.update(walked)
+                    order += walked
+
+        subtree_rss = array('Q', snapshot.rss)
+        subtree_count = array('l', [1]) * n
+        for i in reversed(order):
+            p = parents[i]
+            if p >= 0:
+                subtree_rss[p] += subtree_rss[i]
+                subtree_count[p] += subtree_count[i]
+
+        self.parents = parents
+        self.children = children
+        self.roots = roots
+        self.subtree_rss = subtree_rss
+        self.subtree_count = subtree_count
+
+    @staticmethod
+    def _walk(start, children):
+        order = list(start)
+        for i in order:
+            order.extend(children.get(i, ()))
+        return order
+
+    def children_of(self, row):
+        return self.children.get(row, ())
+
+    def ancestors(self, row):
+        p = self.parents[row]
+        while p >= 0:
+            yield p
+            p = self.parents[p]
+
+    def descendants(self, row):
+        return self._walk(self.children_of(row), self.children)
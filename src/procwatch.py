@@ -0,0 +1,270 @@
+import errno
+import fnmatch
+import os
+import re
+import select
+import socket
+import struct
+import sys
+import threading
+import time
+
+import psutil
+
+# pidfds (Linux 5.3+, Python 3.9+) turn "has it exited yet" into a poll()
+# on file descriptors instead of repeated pid checks
+PIDFD_SUPPORTED = sys.platform.startswith('linux') and hasattr(os, 'pidfd_open')
+
+# Fallback launch detection: how often the pid list is diffed, and how long
+# a new pid is re-checked in case it was caught between fork and exec
+PID_SCAN_INTERVAL = 0.05
+EXEC_RECHECK = 1.0
+# How long to wait for the proc connector to acknowledge a subscription;
+# outside the initial namespaces it stays silent
+CONNECTOR_ACK_TIMEOUT = 0.5
+MAX_REPORTED = 10000
+
+_NETLINK_CONNECTOR = 11
+_CN_IDX_PROC = 1
+_CN_VAL_PROC = 1
+_PROC_CN_MCAST_LISTEN = 1
+_PROC_CN_MCAST_IGNORE = 2
+_PROC_EVENT_NONE = 0
+_PROC_EVENT_EXEC = 2
+_NLMSG_DONE = 3
+_NLMSG_HEADER = struct.Struct("=IHHII")
+_CN_MSG = struct.Struct("=IIIIHH")
+_PROC_EVENT = struct.Struct("=IIQ")
+_EXEC_EVENT = struct.Struct("=II")
+
+
+def _reap(proc):
+    # Collects our own children's exit status; others are already gone
+    try:
+        proc.wait(0)
+    except (psutil.TimeoutExpired, psutil.Error, ChildProcessError):
+        pass
+
+
+# Waits for many processes to exit at once. On Linux every process gets a
+# pidfd, opened before it is signalled so a recycled pid can never be
+# mistaken for it, and a single poll() sleeps until one of them exits.
+# Elsewhere psutil.wait_procs does the waiting.
+class ExitWatcher:
+    def __init__(self):
+        self._procs = {}
+        self._exited = []
+        self._poll = select.poll() if PIDFD_SUPPORTED else None
+
+    def add(self, proc):
+        if self._poll is None:
+            self._procs[proc.pid] = proc
+            return
+        try:
+            fd = os.pidfd_open(proc.pid)
+        except ProcessLookupError:
+            self._exited.append(proc)
+            return
+        except OSError:
+            # e.g. ENOSYS on kernels without pidfd support
+            self._fall_back()
+            self._procs[proc.pid] = proc
+            return
+        self._procs[fd] = proc
+        self._poll.register(fd, select.POLLIN)
+
+    def discard(self, proc):
+        for key, watched in list(self._procs.items()):
+            if watched is proc:
+                self._forget(key)
+
+    def _forget(self, key):
+        proc = self._procs.pop(key)
+        if self._poll is not None:
+            self._poll.unregister(key)
+            os.close(key)
+        return proc
+
+    def _fall_back(self):
+        for fd in list(self._procs):
+            proc = self._forget(fd)
+            self._procs[proc.pid] = proc
+        self._poll = None
+
+    # (gone, alive) among the watched processes after at most `timeout`
+    # seconds; gone ones stop being watched
+    def wait(self, timeout):
+        gone, self._exited = self._exited, []
+        if self._poll is None:
+            done, alive = psutil.wait_procs(list(self._procs.values()), timeout=timeout)
+            for proc in done:
+                self.discard(proc)
+            return gone + done, alive
+        deadline = time.monotonic() + timeout
+        while self._procs:
+            remaining = deadline - time.monotonic()
+            events = self._poll.poll(max(0, int(remaining * 1000)))
+            for fd, _ in events:
+                proc = self._forget(fd)
+                _reap(proc)
+                gone.append(proc)
+            if remaining <= 0:
+                break
+        return gone, list(self._procs.values())
+
+    def close(self):
+        for key in list(self._procs):
+            self._forget(key)
+
+
+def _compile_patterns(patterns):
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{fnmatch.translate(p)})" for p in patterns), re.IGNORECASE).match
+
+
+# Background thread that calls on_match(task) within milliseconds of a
+# process whose name matches one of `patterns` starting. On Linux with
+# CAP_NET_ADMIN it subscribes to exec events from the kernel proc
+# connector; otherwise it diffs the pid list every PID_SCAN_INTERVAL. Each
+# (pid, create_time) is reported once. `mode` tells which source is used;
+# it is chosen on the watcher thread, which then calls on_mode(mode).
+class LaunchWatcher(threading.Thread):
+    def __init__(self, patterns, on_match, scan_interval=PID_SCAN_INTERVAL, on_mode=None):
+        super().__init__(name="launch-watcher", daemon=True)
+        self.on_match = on_match
+        self.on_mode = on_mode
+        self.scan_interval = scan_interval
+        self.mode = None
+        self.set_patterns(patterns)
+        self._reported = set()
+        self._stopped = threading.Event()
+        self._ready = threading.Event()
+        self._wake_r, self._wake_w = os.pipe()
+
+    def set_patterns(self, patterns):
+        self._match = _compile_patterns(list(patterns))
+
+    # Waits until the connector has answered or not. Launches from then on
+    # are not missed; callers that must not block can use on_mode instead.
+    def wait_ready(self, timeout=CONNECTOR_ACK_TIMEOUT * 2):
+        return self._ready.wait(timeout)
+
+    def stop(self, timeout=1.0):
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        os.write(self._wake_w, b"x")
+        if self.is_alive():
+            self.join(timeout)
+        os.close(self._wake_r)
+        os.close(self._wake_w)
+
+    def run(self):
+        sock = self._subscribe() if sys.platform.startswith('linux') else None
+        if sock is not None:
+            self._set_mode('connector')
+            self._listen(sock)
+        else:
+            # Listed before wait_ready() returns so nothing launched after it is missed
+            known = set(psutil.pids())
+            self._set_mode('pid-scan')
+            self._scan(known)
+
+    def _set_mode(self, mode):
+        self.mode = mode
+        self._ready.set()
+        if self.on_mode:
+            self.on_mode(mode)
+
+    def check(self, pid):
+        match = self._match
+        if match is None:
+            return
+        try:
+            proc = psutil.Process(pid)
+            name, create_time = proc.name(), proc.create_time()
+        except psutil.Error:
+            return
+        key = (pid, create_time)
+        if not match(name) or key in self._reported:
+            return
+        if len(self._reported) >= MAX_REPORTED:
+            self._reported.clear()
+        self._reported.add(key)
+        self.on_match({'pid': pid, 'name': name, 'create_time': create_time, 'type': 'launch'})
+
+    def _subscribe(self):
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, _NETLINK_CONNECTOR)
+        except OSError:
+            return None
+        try:
+            sock.bind((0, _CN_IDX_PROC))
+            self._send_op(sock, _PROC_CN_MCAST_LISTEN)
+            sock.settimeout(CONNECTOR_ACK_TIMEOUT)
+            while True:
+                what, _ = self._parse(sock.recv(4096))
+                if what == _PROC_EVENT_NONE:
+                    break
+        except OSError:
+            sock.close()
+            return None
+        sock.setblocking(False)
+        return sock
+
+    def _send_op(self, sock, op):
+        payload = _CN_MSG.pack(_CN_IDX_PROC, _CN_VAL_PROC, 0, 0, 4, 0) + struct.pack("=I", op)
+        sock.send(_NLMSG_HEADER.pack(_NLMSG_HEADER.size + len(payload), _NLMSG_DONE, 0, 0, 0) + payload)
+
+    def _parse(self, data):
+        offset = _NLMSG_HEADER.size + _CN_MSG.size
+        if len(data) < offset + _PROC_EVENT.size:
+            return None, None
+        what = _PROC_EVENT.unpack_from(data, offset)[0]
+        if what == _PROC_EVENT_EXEC:
+            return what, _EXEC_EVENT.unpack_from(data, offset + _PROC_EVENT.size)[1]
+        return what, None
+
+    # Sleeps in poll() until the kernel sends events or stop() is called
+    def _listen(self, sock):
+        poller = select.poll()
+        poller.register(sock, select.POLLIN)
+        poller.register(self._wake_r, select.POLLIN)
+        try:
+            while not self._stopped.is_set():
+                poller.poll()
+                while True:
+                    try:
+                        data = sock.recv(4096)
+                    except BlockingIOError:
+                        break
+                    except OSError as e:
+                        # The receive buffer overflowed and events were
+                        # dropped; later ones still arrive
+                        if e.errno == errno.ENOBUFS:
+                            continue
+                        return
+                    what, pid = self._parse(data)
+                    if what == _PROC_EVENT_EXEC:
+                        self.check(pid)
+        finally:
+            try:
+                self._send_op(sock, _PROC_CN_MCAST_IGNORE)
+            except OSError:
+                pass
+            sock.close()
+
+    def _scan(self, known):
+        recent = {}
+        while not self._stopped.wait(self.scan_interval):
+            now = time.monotonic()
+            pids = set(psutil.pids())
+            for pid in pids - known:
+                recent[pid] = now
+            known = pids
+            for pid, seen in list(recent.items()):
+                if now - seen > EXEC_RECHECK or pid not in pids:
+                    del recent[pid]
+                else:
+                    self.check(pid)
@@ -0,0 +1,146 @@
+import fnmatch
+import re
+import threading
+from collections import namedtuple
+
+import psutil
+
+# field: 'name', 'exe' or 'cmd'; kind: 'exact', 'glob' or 'regex'
+ProtectionRule = namedtuple('ProtectionRule', ['field', 'kind', 'pattern', 'text'])
+
+_FIELD_PREFIXES = (('name:', 'name'), ('exe:', 'exe'), ('cmdline:', 'cmd'), ('cmd:', 'cmd'))
+_BACKREF_RE = re.compile(r'\\[1-9]|\(\?P=')
+
+
+# "chrome.exe"              exact process name (case-insensitive)
+# "python*.exe"             glob on the name
+# "re:^java(w)?$"           regex searched in the name
+# "exe:C:\Tools\*"          glob on the executable path
+# "cmd:*-jar build.jar*"    glob on the command line, arguments joined by spaces
+# "cmd:re:--profile=prod"   regex on the command line
+def parse_protection_rule(text):
+    text = text.strip()
+    body, field = text, 'name'
+    for prefix, name in _FIELD_PREFIXES:
+        if body.lower().startswith(prefix):
+            body, field = body[len(prefix):], name
+            break
+    if not body:
+        raise ValueError(f"Empty whitelist rule '{text}'.")
+    if body.lower().startswith('re:'):
+        pattern = body[3:]
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            raise ValueError(f"Invalid regex in whitelist rule '{text}': {e}")
+        return ProtectionRule(field, 'regex', pattern, text)
+    if field == 'name' and not any(c in body for c in '*?['):
+        return ProtectionRule(field, 'exact', body.lower(), body.lower())
+    return ProtectionRule(field, 'glob', body, text)
+
+
+# Tests for one field: every glob folded into one anchored regex and every
+# regex into one searched alternation, so a lookup costs one or two regex
+# calls however many rules there are. Regexes with backreferences would be
+# renumbered by the alternation and are compiled on their own.
+def _compile_field(rules):
+    tests = []
+    globs = [fnmatch.translate(r.pattern) for r in rules if r.kind == 'glob']
+    if globs:
+        tests.append(re.compile("|".join(f"(?:{g})" for g in globs), re.IGNORECASE).match)
+    regexes = [r.pattern for r in rules if r.kind == 'regex']
+    combinable = [p for p in regexes if not _BACKREF_RE.search(p)]
+    separate = [p for p in regexes if _BACKREF_RE.search(p)]
+    if combinable:
+        try:
+            tests.append(re.compile("|".join(f"(?:{p})" for p in combinable), re.IGNORECASE).search)
+        except re.error:
+            # e.g. inline global flags that are only legal at the start
+            separate += combinable
+    tests.extend(re.compile(p, re.IGNORECASE).search for p in separate)
+    return tests
+
+
+# exe path and command line per (pid, create_time), fetched on first use.
+# Shared across matcher rebuilds; bounded by clearing when full.
+class ProcessAttrCache:
+    MAX_ENTRIES = 50000
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, pid, create_time):
+        key = (pid, create_time)
+        with self._lock:
+            cached = self._entries.get(key)
+        if cached is None:
+            cached = self._fetch(pid, create_time)
+            with self._lock:
+                if len(self._entries) >= self.MAX_ENTRIES:
+                    self._entries.clear()
+                self._entries[key] = cached
+        return cached
+
+    def _fetch(self, pid, create_time):
+        try:
+            proc = psutil.Process(pid)
+            with proc.oneshot():
+                if create_time and proc.create_time() != create_time:
+                    return ("", "")
+                exe = cmdline = ""
+                try:
+                    exe = proc.exe() or ""
+                except psutil.AccessDenied:
+                    pass
+                try:
+                    cmdline = " ".join(proc.cmdline())
+                except psutil.AccessDenied:
+                    pass
+                return (exe, cmdline)
+        except (psutil.NoSuchProcess, psutil.ZombieProcess, psutil.AccessDenied):
+            return ("", "")
+
+
+# Decides whether a process is protected by any exact name, glob or regex
+# rule. Name results are cached per distinct name. exe/cmdline are only
+# looked up when some rule needs them and the name alone did not match.
+class ProtectionMatcher:
+    MAX_CACHED_NAMES = 50000
+
+    def __init__(self, rules=(), exact=(), attrs=None):
+        self.rules = list(rules)
+        self.exact = set(exact) | {r.pattern for r in self.rules if r.kind == 'exact'}
+        self.tests = {field: _compile_field([r for r in self.rules if r.field == field and r.kind != 'exact'])
+                      for field in ('name', 'exe', 'cmd')}
+        self.needs_process = bool(self.tests['exe'] or self.tests['cmd'])
+        self.attrs = attrs or ProcessAttrCache()
+        self._names = {}
+
+    def name_matches(self, name):
+        name = name.lower()
+        if name in self.exact:
+            return True
+        hit = self._names.get(name)
+        if hit is None:
+            if len(self._names) >= self.MAX_CACHED_NAMES:
+                self._names.clear()
+            hit = self._names[name] = any(test(name) for test in self.tests['name'])
+        return hit
+
+    def is_protected(self, name, pid=None, create_time=None):
+        if self.name_matches(name):
+            return True
+        if not self.needs_process or pid is None:
+            return False
+        exe, cmdline = self.attrs.get(pid, create_time)
+        return bool(exe and any(test(exe) for test in self.tests['exe'])) or \
+            bool(cmdline and any(test(cmdline) for test in self.tests['cmd']))
+
+    # Row indices of every protected process in a snapshot
+    def protected_rows(self, snapshot):
+        rows = []
+        for i, name in enumerate(snapshot.names):
+            if self.is_protected(name, snapshot.pids[i], snapshot.create_times[i]):
+                rows.append(i)
+        return rows
@@ -0,0 +1,279 @@
+import bisect
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+import zlib
+from array import array
+
+from .logs import LOGGER_NAME
+from .snapshot import ProcessSnapshot, collect_snapshot
+
+MAGIC = b"QXKREC1"
+_BYTE_ORDER = b"L" if sys.byteorder == 'little' else b"B"
+# flags, timestamp, length of the compressed new-strings block, length of
+# the compressed column block
+_FRAME = struct.Struct("<BdII")
+_KEYFRAME = 1
+# A full frame every this many snapshots bounds the work to decode any one
+KEYFRAME_INTERVAL = 30
+COMPRESS_LEVEL = 6
+DEFAULT_RECORD_INTERVAL = 5.0
+
+# Snapshot column, how it is stored as int64 ('centi': hundredths, since
+# CPU% is only ever shown to one decimal), and how it is encoded against the
+# same pid in the previous frame: 'sub' stores the difference, 'xor' the
+# changed bits of a float, 'row' the difference to the previous row.
+_COLUMNS = [
+    ('pids', 'int', 'row'),
+    ('ppids', 'int', 'sub'),
+    ('names', 'str', 'sub'),
+    ('statuses', 'str', 'sub'),
+    ('rss', 'int', 'sub'),
+    ('create_times', 'float', 'xor'),
+    ('cpu_times', 'float', 'xor'),
+    ('cpu_percent', 'centi', 'sub'),
+]
+
+
+def _float_bits(values):
+    bits = array('q')
+    bits.frombytes(array('d', values).tobytes())
+    return bits
+
+
+def _bits_float(bits):
+    values = array('d')
+    values.frombytes(bits.tobytes())
+    return values
+
+
+# Row j of this frame -> row of the same pid in the previous frame, or -1
+def _match(pids, previous_pids):
+    rows = {pid: i for i, pid in enumerate(previous_pids)}
+    return [rows.get(pid, -1) for pid in pids]
+
+
+def _encode_column(values, how, match, previous):
+    if how == 'row':
+        return array('q', [values[0]] if values else []) + array('q', [b - a for a, b in zip(values, values[1:])])
+    if match is None:
+        return values
+    if how == 'sub':
+        return array('q', [v - previous[j] if j >= 0 else v for v, j in zip(values, match)])
+    return array('q', [v ^ previous[j] if j >= 0 else v for v, j in zip(values, match)])
+
+
+def _decode_column(stored, how, match, previous):
+    if how == 'row':
+        total, values = 0, array('q')
+        for d in stored:
+            total += d
+            values.append(total)
+        return values
+    if match is None:
+        return stored
+    if how == 'sub':
+        return array('q', [v + previous[j] if j >= 0 else v for v, j in zip(stored, match)])
+    return array('q', [v ^ previous[j] if j >= 0 else v for v, j in zip(stored, match)])
+
+
+# Appends snapshots to a recording file. Each frame is one zlib-compressed
+# block of int64 columns. Names and statuses are interned: a frame carries
+# only the strings never seen before and refers to them by number. Columns
+# other than pids are stored relative to the same pid in the previous
+# frame, so a process whose memory did not change costs a run of zeros.
+# Every KEYFRAME_INTERVAL-th frame, and the first one after opening, is
+# self-contained. An existing recording is continued after its last
+# complete frame.
+class SnapshotRecorder:
+    def __init__(self, path, keyframe_interval=KEYFRAME_INTERVAL):
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self._strings = {}
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            reader = SnapshotReader(path)
+            try:
+                self._strings = {s: i for i, s in enumerate(reader.strings)}
+                end = reader.end
+            finally:
+                reader.close()
+            self._file = open(path, 'r+b')
+            self._file.truncate(end)
+            self._file.seek(end)
+        else:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(path, 'wb')
+            self._file.write(MAGIC + _BYTE_ORDER)
+        self._previous = None
+        self._since_keyframe = 0
+        self.frames_written = 0
+
+    def _intern(self, values, new):
+        strings = self._strings
+        ids = array('q')
+        for s in values:
+            i = strings.get(s)
+            if i is None:
+                i = strings[s] = len(strings)
+                new.append(s)
+            ids.append(i)
+        return ids
+
+    def append(self, snapshot):
+        new = []
+        raw = []
+        for attr, kind, _ in _COLUMNS:
+            values = getattr(snapshot, attr)
+            if kind == 'str':
+                raw.append(self._intern(values, new))
+            elif kind == 'float':
+                raw.append(_float_bits(values))
+            elif kind == 'centi':
+                raw.append(array('q', [round(v * 100) for v in values]))
+            else:
+                raw.append(array('q', values))
+        keyframe = self._previous is None or self._since_keyframe >= self.keyframe_interval
+        match = None if keyframe else _match(raw[0], self._previous[0])
+        block = struct.pack("<I", len(snapshot)) + b"".join(
+            _encode_column(values, how, match, self._previous[c] if match else None).tobytes()
+            for c, (values, (_, _, how)) in enumerate(zip(raw, _COLUMNS)))
+        names = zlib.compress("\0".join(new).encode(), COMPRESS_LEVEL) if new else b""
+        data = zlib.compress(block, COMPRESS_LEVEL)
+        self._file.write(_FRAME.pack(_KEYFRAME if keyframe else 0, snapshot.timestamp, len(names), len(data)))
+        self._file.write(names)
+        self._file.write(data)
+        self._file.flush()
+        self._previous = raw
+        self._since_keyframe = 1 if keyframe else self._since_keyframe + 1
+        self.frames_written += 1
+
+    def close(self):
+        self._file.close()
+
+
+# Random access to a recording through a memory map. Opening walks the
+# frame headers once and unpacks only the new-strings blocks; columns are
+# decompressed when a snapshot is asked for, starting from the nearest
+# keyframe or from the last decoded frame when reading forward. A frame cut
+# short by a crash ends the recording.
+class SnapshotReader:
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        header = self._file.read(len(MAGIC) + 1)
+        if len(header) < len(MAGIC) + 1 or not header.startswith(MAGIC):
+            self._file.close()
+            raise ValueError(f"{path} is not a Qt-XKiller recording.")
+        self._swap = header[len(MAGIC):] != _BYTE_ORDER
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.strings = []
+        self.timestamps = array('d')
+        self._frames = []
+        self._keyframes = []
+        offset = len(header)
+        while offset + _FRAME.size <= size:
+            flags, timestamp, names_len, data_len = _FRAME.unpack_from(self._map, offset)
+            start = offset + _FRAME.size
+            end = start + names_len + data_len
+            if end > size:
+                break
+            if names_len:
+                try:
+                    self.strings.extend(zlib.decompress(self._map[start:start + names_len]).decode().split("\0"))
+                except (zlib.error, UnicodeDecodeError):
+                    break
+            if flags & _KEYFRAME:
+                self._keyframes.append(len(self._frames))
+            elif not self._frames:
+                break
+            self._frames.append((start + names_len, data_len))
+            self.timestamps.append(timestamp)
+            offset = end
+        self.end = offset
+        self._cached = None
+
+    def __len__(self):
+        return len(self._frames)
+
+    # Frame shown at `timestamp`: the last one recorded at or before it
+    def index_at(self, timestamp):
+        return max(0, bisect.bisect_right(self.timestamps, timestamp) - 1)
+
+    def _decode(self, k, previous):
+        start, length = self._frames[k]
+        block = zlib.decompress(self._map[start:start + length])
+        n = struct.unpack_from("<I", block)[0]
+        columns, offset = [], 4
+        for _ in _COLUMNS:
+            stored = array('q')
+            stored.frombytes(block[offset:offset + n * 8])
+            if self._swap:
+                stored.byteswap()
+            columns.append(stored)
+            offset += n * 8
+        pids = _decode_column(columns[0], 'row', None, None)
+        match = None if previous is None else _match(pids, previous[0])
+        return [pids] + [_decode_column(stored, how, match, previous[c] if match else None)
+                         for c, (stored, (_, _, how)) in enumerate(zip(columns, _COLUMNS)) if c > 0]
+
+    def _raw(self, k):
+        keyframe = self._keyframes[bisect.bisect_right(self._keyframes, k) - 1]
+        if self._cached is not None and keyframe <= self._cached[0] <= k:
+            first, raw = self._cached[0] + 1, self._cached[1]
+        else:
+            first, raw = keyframe + 1, self._decode(keyframe, None)
+        for j in range(first, k + 1):
+            raw = self._decode(j, raw)
+        self._cached = (k, raw)
+        return raw
+
+    # A frame whose bytes were damaged after it was written raises ValueError
+    def snapshot(self, k):
+        if not 0 <= k < len(self._frames):
+            raise IndexError(f"frame {k} is outside the recording")
+        try:
+            pids, ppids, names, statuses, rss, create_times, cpu_times, cpu_percent = self._raw(k)
+            strings = self.strings
+            return ProcessSnapshot(pids, [strings[i] for i in names], [strings[i] for i in statuses], rss,
+                                   _bits_float(create_times), _bits_float(cpu_times),
+                                   [v / 100 for v in cpu_percent], self.timestamps[k], ppids)
+        except (zlib.error, struct.error, ValueError, IndexError, OverflowError) as e:
+            self._cached = None
+            raise ValueError(f"Frame {k + 1} of {self.path} is corrupt: {e}") from e
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+# Headless recording loop for the daemon: one snapshot every `interval`
+# seconds until `stopped` is set
+def record_snapshots(recorder, interval, stopped):
+    previous = None
+    while not stopped.is_set():
+        previous = collect_snapshot(previous)
+        try:
+            recorder.append(previous)
+        except (OSError, ValueError) as e:
+            logging.getLogger(LOGGER_NAME).error("Recording stopped: %s", e)
+            return
+        stopped.wait(interval)
+
+
+def start_recording(recorder, interval=DEFAULT_RECORD_INTERVAL):
+    stopped = threading.Event()
+    thread = threading.Thread(target=record_snapshots, args=(recorder, interval, stopped),
+                              name="snapshot-recorder", daemon=True)
+    thread.start()
+
+    def stop():
+        stopped.set()
+        thread.join()
+        recorder.close()
+    return stop
@@ -0,0 +1,229 @@
+import bisect
+import datetime
+import fnmatch
+import functools
+import os
+import re
+import time
+
+import psutil
+
+_MONTHS = {name: i for i, name in enumerate(
+    ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'], 1)}
+_WEEKDAYS = {name: i for i, name in enumerate(['sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat'])}
+_ALIASES = {
+    '@yearly': '0 0 1 1 *', '@annually': '0 0 1 1 *', '@monthly': '0 0 1 * *', '@weekly': '0 0 * * 0',
+    '@daily': '0 0 * * *', '@midnight': '0 0 * * *', '@hourly': '0 * * * *',
+}
+_DAY_WORDS = {'daily': '*', 'weekdays': '1-5', 'weekends': '0,6'}
+_AT_RE = re.compile(r'^([a-z,\-]+)\s+(?:at\s+)?(\d{1,2}):(\d{2})$', re.IGNORECASE)
+_EVERY_RE = re.compile(r'^every\s+(\d+)\s*([smh])$', re.IGNORECASE)
+_UNITS = {'s': 1, 'm': 60, 'h': 3600}
+# One-off deadlines: "+N" with no unit counts minutes
+_WHEN_RE = re.compile(r'^\+(\d+)([smh]?)$')
+_WHEN_UNITS = {'': 60, 's': 1, 'm': 60, 'h': 3600}
+# How far ahead to look for specs that fire rarely (Feb 29 on a Monday)
+# before deciding they never fire (Feb 30)
+HORIZON_YEARS = 30
+
+
+def _value(text, names):
+    text = text.lower()
+    if names and text in names:
+        return names[text]
+    if not text.isdigit():
+        raise ValueError(f"Invalid value '{text}'.")
+    return int(text)
+
+
+# One cron field ("*", "1-5", "*/15", "mon,wed", "9-17/2") -> sorted values
+def _field(text, low, high, names=None):
+    values = set()
+    for part in text.split(','):
+        expr, slash, step = part.partition('/')
+        if slash and not (step.isdigit() and int(step) > 0):
+            raise ValueError(f"Invalid step in '{part}'.")
+        step = int(step) if slash else 1
+        if expr == '*':
+            start, end = low, high
+        else:
+            first, dash, last = expr.partition('-')
+            start = _value(first, names)
+            end = _value(last, names) if dash else (high if slash else start)
+        if not low <= start <= end <= high:
+            raise ValueError(f"'{part}' is outside {low}-{high}.")
+        values.update(range(start, end + 1, step))
+    return tuple(sorted(values))
+
+
+# Standard five-field cron spec (minute hour day-of-month month
+# day-of-week) in local time. When both day fields are restricted a day
+# matches either, as in cron.
+class CronSchedule:
+    def __init__(self, text, spec):
+        fields = spec.split()
+        if len(fields) != 5:
+            raise ValueError(f"Invalid schedule '{text}'. Expected 5 cron fields, e.g. '0 23 * * 1-5'.")
+        self.text = text
+        self.minutes = _field(fields[0], 0, 59)
+        self.hours = _field(fields[1], 0, 23)
+        self.days = _field(fields[2], 1, 31)
+        self.months = _field(fields[3], 1, 12, _MONTHS)
+        self.weekdays = tuple(sorted({d % 7 for d in _field(fields[4], 0, 7, _WEEKDAYS)}))
+        self.any_day = fields[2] == '*'
+        self.any_weekday = fields[4] == '*'
+
+    def _day_matches(self, t):
+        in_month = t.day in self.days
+        in_week = t.isoweekday() % 7 in self.weekdays
+        if self.any_day:
+            return in_week
+        if self.any_weekday:
+            return in_month
+        return in_month or in_week
+
+    # First fire strictly after `after` (epoch seconds), or None. Jumps
+    # straight to the next allowed month, day, hour and minute instead of
+    # stepping minute by minute.
+    def next_fire(self, after):
+        t = datetime.datetime.fromtimestamp(after).replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        last_year = t.year + HORIZON_YEARS
+        while t.year <= last_year:
+            if t.month not in self.months:
+                i = bisect.bisect_left(self.months, t.month)
+                if i < len(self.months):
+                    t = datetime.datetime(t.year, self.months[i], 1)
+                else:
+                    t = datetime.datetime(t.year + 1, self.months[0], 1)
+                continue
+            if not self._day_matches(t):
+                t = datetime.datetime(t.year, t.month, t.day) + datetime.timedelta(days=1)
+                continue
+            i = bisect.bisect_left(self.hours, t.hour)
+            if i == len(self.hours):
+                t = datetime.datetime(t.year, t.month, t.day) + datetime.timedelta(days=1)
+                continue
+            if self.hours[i] != t.hour:
+                t = t.replace(hour=self.hours[i], minute=0)
+            i = bisect.bisect_left(self.minutes, t.minute)
+            if i == len(self.minutes):
+                t = t.replace(minute=0) + datetime.timedelta(hours=1)
+                continue
+            t = t.replace(minute=self.minutes[i])
+            fire = t.timestamp()
+            # Wall-clock times repeated when DST ends map to the first one
+            if fire > after:
+                return fire
+            t += datetime.timedelta(minutes=1)
+        return None
+
+
+# Fixed period aligned to multiples of `seconds` since the epoch, so the
+# next fire follows from the clock alone and survives restarts.
+class IntervalSchedule:
+    def __init__(self, text, seconds):
+        self.text = text
+        self.seconds = seconds
+
+    def next_fire(self, after):
+        return (after // self.seconds + 1) * self.seconds
+
+
+# "0 23 * * 1-5"       cron spec, local time
+# "@daily", "@hourly"  cron shortcuts
+# "weekdays 23:00"     also "daily", "weekends" or days such as "mon,wed" / "mon-fri"
+# "every 2h"           every N s/m/h; periods that divide an hour or a day
+#                      fall on round local times (00:00, 02:00, ...)
+@functools.lru_cache(maxsize=256)
+def parse_schedule(text):
+    text = " ".join(text.split())
+    lowered = text.lower()
+    m = _EVERY_RE.match(text)
+    if m:
+        count, unit = int(m.group(1)), m.group(2).lower()
+        if count <= 0:
+            raise ValueError(f"Invalid schedule '{text}'. The period must be positive.")
+        if unit == 'm' and 60 % count == 0:
+            return CronSchedule(text, f"*/{count} * * * *")
+        if unit == 'h' and 24 % count == 0:
+            return CronSchedule(text, f"0 */{count} * * *")
+        return IntervalSchedule(text, count * _UNITS[unit])
+    if lowered in _ALIASES:
+        return CronSchedule(text, _ALIASES[lowered])
+    m = _AT_RE.match(text)
+    if m:
+        days, hour, minute = m.groups()
+        days = _DAY_WORDS.get(days.lower(), days)
+        schedule = CronSchedule(text, f"{int(minute)} {int(hour)} * * {days}")
+    else:
+        schedule = CronSchedule(text, text)
+    if schedule.next_fire(time.time()) is None:
+        raise ValueError(f"Schedule '{text}' never fires.")
+    return schedule
+
+
+# "+30s", "+10m", "+2h" or a wall-clock "HH:MM[:SS]" later today
+def parse_when(text, now=None):
+    now = time.time() if now is None else now
+    m = _WHEN_RE.match(text)
+    if m:
+        return now + int(m.group(1)) * _WHEN_UNITS[m.group(2)]
+    for fmt in ("%H:%M:%S", "%H:%M"):
+        try:
+            clock = datetime.datetime.strptime(text, fmt).time()
+            break
+        except ValueError:
+            continue
+    else:
+        raise ValueError(f"Invalid time '{text}'. Use +N[s|m|h] or HH:MM[:SS].")
+    today = datetime.datetime.fromtimestamp(now).date()
+    deadline = datetime.datetime.combine(today, clock).timestamp()
+    if deadline < now:
+        raise ValueError(f"Time {text} already passed today.")
+    return deadline
+
+
+# Recurring task for every process named `name` (case-insensitive, globs
+# allowed). pid is 0: targets are looked up each time it fires.
+def make_recurring_task(name, schedule, now=None, tree=False):
+    name = name.strip()
+    if not name:
+        raise ValueError("A recurring kill needs a process name.")
+    parsed = parse_schedule(schedule)
+    now = time.time() if now is None else now
+    return {'pid': 0, 'name': name, 'create_time': None, 'tree': bool(tree), 'deadline': parsed.next_fire(now),
+            'mode': 'Recurring', 'type': 'recurring', 'schedule': parsed.text}
+
+
+@functools.lru_cache(maxsize=256)
+def name_matcher(pattern):
+    return re.compile(fnmatch.translate(pattern), re.IGNORECASE).match
+
+
+# Kill targets for a fired recurring task: every running process whose name
+# matches, except this one
+def resolve_targets(task, process_iter=psutil.process_iter):
+    match = name_matcher(task['name'])
+    own = os.getpid()
+    targets = []
+    for proc in process_iter(['pid', 'name', 'create_time']):
+        info = proc.info
+        if info['pid'] != own and info['name'] and match(info['name']):
+            targets.append(_target(task, info['pid'], info['name'], info['create_time']))
+    return targets
+
+
+# Same, matched against a local snapshot instead of listing processes again.
+# The kill checks create_time, so processes gone since are not mistaken for
+# a new owner of their pid.
+def snapshot_targets(task, snapshot):
+    match = name_matcher(task['name'])
+    own = os.getpid()
+    pids, names, create_times = snapshot.pids, snapshot.names, snapshot.create_times
+    return [_target(task, pids[i], names[i], create_times[i])
+            for i in range(len(snapshot)) if pids[i] != own and names[i] and match(names[i])]
+
+
+def _target(task, pid, name, create_time):
+    return {'pid': pid, 'name': name, 'create_time': create_time, 'tree': task.get('tree', False),
+            'type': 'recurring'}
@@ -0,0 +1,137 @@
+import bisect
+import fnmatch
+import re
+import time
+from collections import namedtuple
+
+MB = 1024 * 1024
+
+# metric name -> (snapshot column, scale applied to the rule threshold)
+METRICS = {
+    'rss': ('rss', MB),
+    'cpu': ('cpu_percent', 1),
+}
+
+WatchdogRule = namedtuple('WatchdogRule', ['pattern', 'metric', 'threshold', 'duration', 'text'])
+
+_RULE_RE = re.compile(r'^\s*(\S+)\s+(\w+)\s*>\s*(\d+(?:\.\d+)?)\s*(?:for\s+(\d+)\s*([smh]?))?\s*$', re.IGNORECASE)
+_LAUNCH_RE = re.compile(r'^\s*(\S+)\s+on\s+launch\s*$', re.IGNORECASE)
+_UNITS = {'': 1, 's': 1, 'm': 60, 'h': 3600}
+
+
+# "node* rss>4096 for 30s" -> kill node* processes above 4096 MB for 30 s
+# "* cpu>95 for 5m" -> kill anything above 95% of a core for 5 minutes
+# "miner* on launch" -> kill miner* processes as soon as they start
+def parse_rule(text):
+    m = _LAUNCH_RE.match(text)
+    if m:
+        pattern = m.group(1).lower()
+        if pattern == '*':
+            raise ValueError("A launch rule needs a name pattern narrower than '*'.")
+        return WatchdogRule(pattern, 'launch', 0.0, 0, text.strip())
+    m = _RULE_RE.match(text)
+    if not m:
+        raise ValueError(f"Invalid rule '{text}'. Expected e.g. 'node* rss>4096 for 30s'.")
+    pattern, metric, threshold, duration, unit = m.groups()
+    metric = metric.lower()
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric '{metric}'. Supported: {', '.join(sorted(METRICS))}.")
+    seconds = int(duration) * _UNITS[unit.lower()] if duration else 0
+    return WatchdogRule(pattern.lower(), metric, float(threshold), seconds, text.strip())
+
+
+# What a rule checks, without its display text
+def _condition(rule):
+    return (rule.pattern, rule.metric, rule.threshold, rule.duration)
+
+
+# Evaluates watchdog rules against each snapshot. Every metric column is
+# argsorted once per snapshot, so a wildcard rule's threshold test is a
+# bisect plus a slice of the rows above it. Name patterns are matched once
+# per distinct process name and remembered across snapshots. Hysteresis
+# state is kept per (rule condition, process key) and dropped as soon as the
+# condition clears, or when its rule is removed or edited. Launch rules
+# match every process with the name, which catches anything the launch
+# watcher missed. After each evaluate(), last_match_ms and last_rule_ms hold
+# the time spent matching name patterns and on each rule.
+class RuleEngine:
+    MAX_CACHED_NAMES = 50000
+
+    def __init__(self):
+        self._over_since = {}
+        self._fired = set()
+        self.set_rules([])
+
+    # Rules still in the list keep their timers, so adding or editing one
+    # rule does not restart every other rule's "for 30s"
+    def set_rules(self, rules):
+        self.rules = list(rules)
+        self._conditions = [_condition(rule) for rule in self.rules]
+        self._patterns = sorted({rule.pattern for rule in self.rules if rule.pattern != '*'})
+        self._compiled = [re.compile(fnmatch.translate(p)).match for p in self._patterns]
+        self._name_patterns = {}
+        kept = set(self._conditions)
+        self._over_since = {state: since for state, since in self._over_since.items() if state[0] in kept}
+        self._fired = {state for state in self._fired if state[0] in kept}
+        self.last_match_ms = 0.0
+        self.last_rule_ms = [0.0] * len(self.rules)
+
+    # Name patterns a LaunchWatcher should react to
+    def launch_patterns(self):
+        return sorted({rule.pattern for rule in self.rules if rule.metric == 'launch'})
+
+    def _patterns_for(self, name):
+        matched = self._name_patterns.get(name)
+        if matched is None:
+            if len(self._name_patterns) >= self.MAX_CACHED_NAMES:
+                self._name_patterns.clear()
+            matched = self._name_patterns[name] = tuple(
+                p for p, match in zip(self._patterns, self._compiled) if match(name))
+        return matched
+
+    def evaluate(self, index, now):
+        snapshot = index.snapshot
+        hits = []
+        if not self.rules or not len(snapshot):
+            return hits
+
+        start = time.perf_counter()
+        pattern_rows = {p: [] for p in self._patterns}
+        for n, name in enumerate(index.names):
+            for p in self._patterns_for(name):
+                pattern_rows[p].extend(index.name_rows[n])
+        self.last_match_ms = (time.perf_counter() - start) * 1000
+
+        sorted_columns = {}
+        over_since = {}
+        fired = set()
+        for r, rule in enumerate(self.rules):
+            condition = self._conditions[r]
+            start = time.perf_counter()
+            if rule.metric == 'launch':
+                over = pattern_rows[rule.pattern]
+            else:
+                attr, scale = METRICS[rule.metric]
+                values = getattr(snapshot, attr)
+                limit = rule.threshold * scale
+                if rule.pattern == '*':
+                    if attr not in sorted_columns:
+                        order = sorted(range(len(values)), key=values.__getitem__)
+                        sorted_columns[attr] = (order, [values[i] for i in order])
+                    order, ordered_values = sorted_columns[attr]
+                    over = order[bisect.bisect_right(ordered_values, limit):]
+                else:
+                    over = [i for i in pattern_rows[rule.pattern] if values[i] > limit]
+            for i in over:
+                state = (condition,) + snapshot.key(i)
+                since = self._over_since.get(state, now)
+                over_since[state] = since
+                if state in self._fired:
+                    fired.add(state)
+                elif now - since >= rule.duration:
+                    fired.add(state)
+                    hits.append((rule, i))
+            self.last_rule_ms[r] = (time.perf_counter() - start) * 1000
+        self._over_since = over_since
+        self._fired = fired
+        return hits
@@ -0,0 +1,54 @@
+import heapq
+import itertools
+
+
+# Min-heap of (deadline, seq, task). Cancelled entries are blanked in place
+# and dropped lazily when they reach the top, so cancel is O(1) and the
+# owner only ever needs to look at the earliest deadline.
+class DeadlineQueue:
+    def __init__(self):
+        self._heap = []
+        self._entries = {}
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, task):
+        return id(task) in self._entries
+
+    def push(self, deadline, task):
+        self.cancel(task)
+        entry = [deadline, next(self._seq), task]
+        self._entries[id(task)] = entry
+        heapq.heappush(self._heap, entry)
+
+    # Bulk load into an empty or populated queue in O(n) instead of n pushes
+    def push_many(self, items):
+        for deadline, task in items:
+            self.cancel(task)
+            entry = [deadline, next(self._seq), task]
+            self._entries[id(task)] = entry
+            self._heap.append(entry)
+        heapq.heapify(self._heap)
+
+    def cancel(self, task):
+        entry = self._entries.pop(id(task), None)
+        if entry is not None:
+            entry[2] = None
+
+    def next_deadline(self):
+        heap = self._heap
+        while heap and heap[0][2] is None:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def pop_due(self, now):
+        due = []
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            _, _, task = heapq.heappop(heap)
+            if task is not None:
+                del self._entries[id(task)]
+                due.append(task)
+        return due
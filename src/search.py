@@ -0,0 +1,175 @@
+import re
+from array import array
+from collections import namedtuple
+
+MB = 1024 * 1024
+
+# kind: 'text', 'pid', 'status', 'mem', 'cpu' or 'regex'
+Term = namedtuple('Term', ['kind', 'op', 'value'])
+
+_METRIC_RE = re.compile(r'^(mem|cpu)(>=|<=|>|<|=)(\d+(?:\.\d+)?)$')
+
+
+def parse_query(text):
+    terms = []
+    for token in text.split():
+        lowered = token.lower()
+        if len(token) > 2 and token.startswith('/') and token.endswith('/'):
+            try:
+                terms.append(Term('regex', None, re.compile(token[1:-1], re.IGNORECASE)))
+            except re.error:
+                terms.append(Term('text', None, lowered))
+            continue
+        if lowered.startswith('pid:') and lowered[4:].isdigit():
+            terms.append(Term('pid', None, int(lowered[4:])))
+            continue
+        if lowered.startswith('status:') and len(lowered) > 7:
+            terms.append(Term('status', None, lowered[7:]))
+            continue
+        m = _METRIC_RE.match(lowered)
+        if m:
+            terms.append(Term(m.group(1), m.group(2), float(m.group(3))))
+            continue
+        terms.append(Term('text', None, lowered))
+    return tuple(terms)
+
+
+def _implies(new, old):
+    if new.kind != old.kind:
+        return False
+    if new.kind == 'text':
+        return old.value in new.value
+    if new.kind == 'regex':
+        return new.value.pattern == old.value.pattern
+    if new.kind in ('mem', 'cpu'):
+        if new.op != old.op:
+            return False
+        if new.op in ('>', '>='):
+            return new.value >= old.value
+        if new.op in ('<', '<='):
+            return new.value <= old.value
+        return new.value == old.value
+    return new.value == old.value
+
+
+def narrows(new_terms, old_terms):
+    return all(any(_implies(n, o) for n in new_terms) for o in old_terms)
+
+
+# Per-snapshot search index. Names are lowercased and de-duplicated once;
+# substring lookups go through a trigram index over the distinct names, which
+# is far smaller than the row count (dozens of chrome.exe share one entry).
+class SearchIndex:
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.names = []
+        self.name_rows = []
+        self.name_ids = array('l')
+        ids = {}
+        for i, name in enumerate(snapshot.names):
+            lowered = name.lower()
+            n = ids.get(lowered)
+            if n is None:
+                n = ids[lowered] = len(self.names)
+                self.names.append(lowered)
+                self.name_rows.append(array('l'))
+            self.name_ids.append(n)
+            self.name_rows[n].append(i)
+        self.trigrams = {}
+        for n, name in enumerate(self.names):
+            for tri in {name[k:k + 3] for k in range(len(name) - 2)}:
+                self.trigrams.setdefault(tri, []).append(n)
+        self._pid_strs = None
+        self._last_terms = None
+        self._last_rows = None
+
+    def pid_strs(self):
+        if self._pid_strs is None:
+            self._pid_strs = [str(pid) for pid in self.snapshot.pids]
+        return self._pid_strs
+
+    def names_containing(self, text):
+        if len(text) < 3:
+            return {n for n, name in enumerate(self.names) if text in name}
+        posting = [self.trigrams.get(text[k:k + 3], ()) for k in range(len(text) - 2)]
+        candidates = min(posting, key=len)
+        return {n for n in candidates if text in self.names[n]}
+
+    def names_matching(self, pattern):
+        return {n for n, name in enumerate(self.names) if pattern.search(name)}
+
+    def search(self, text):
+        terms = parse_query(text)
+        if not terms:
+            rows = range(len(self.snapshot))
+        elif self._last_terms is not None and narrows(terms, self._last_terms):
+            rows = self._filter(self._last_rows, terms)
+        else:
+            rows = self._filter(self._candidates(terms), terms)
+        self._last_terms = terms
+        self._last_rows = rows
+        return rows
+
+    def predicate(self, text):
+        terms = parse_query(text)
+        tests = [self._row_test(t) for t in terms]
+        return lambda i: all(test(i) for test in tests)
+
+    def _candidates(self, terms):
+        best = None
+        for term in terms:
+            if term.kind == 'pid':
+                return [i for i, pid in enumerate(self.snapshot.pids) if pid == term.value]
+            if term.kind in ('text', 'regex') and not (term.kind == 'text' and term.value.isdigit()):
+                ids = self.names_containing(term.value) if term.kind == 'text' else self.names_matching(term.value)
+                count = sum(len(self.name_rows[n]) for n in ids)
+                if best is None or count < best[0]:
+                    best = (count, ids)
+        if best is None:
+            return range(len(self.snapshot))
+        rows = []
+        for n in best[1]:
+            rows.extend(self.name_rows[n])
+        rows.sort()
+        return rows
+
+    def _filter(self, rows, terms):
+        tests = [self._row_test(t) for t in terms]
+        if len(tests) == 1:
+            test = tests[0]
+            return [i for i in rows if test(i)]
+        return [i for i in rows if all(test(i) for test in tests)]
+
+    def _row_test(self, term):
+        snapshot = self.snapshot
+        if term.kind == 'pid':
+            pids, value = snapshot.pids, term.value
+            return lambda i: pids[i] == value
+        if term.kind == 'status':
+            statuses, value = snapshot.statuses, term.value
+            return lambda i: statuses[i].startswith(value)
+        if term.kind in ('mem', 'cpu'):
+            if term.kind == 'mem':
+                values, scale = snapshot.rss, MB
+            else:
+                values, scale = snapshot.cpu_percent, 1
+            limit = term.value * scale
+            op = term.op
+            if op == '>':
+                return lambda i: values[i] > limit
+            if op == '>=':
+                return lambda i: values[i] >= limit
+            if op == '<':
+                return lambda i: values[i] < limit
+            if op == '<=':
+                return lambda i: values[i] <= limit
+            return lambda i: values[i] // scale == limit // scale
+        name_ids = self.name_ids
+        if term.kind == 'regex':
+            ids = self.names_matching(term.value)
+            return lambda i: name_ids[i] in ids
+        ids = self.names_containing(term.value)
+        if term.value.isdigit():
+            pid_strs, value = self.pid_strs(), term.value
+            return lambda i: name_ids[i] in ids or value in pid_strs[i]
+        return lambda i: name_ids[i] in ids
@@ -0,0 +1,129 @@
+import time
+from array import array
+from collections import namedtuple
+
+import psutil
+
+from .process_groups import ProcessGroups
+from .process_tree import ProcessTree
+
+ProcessInfo = namedtuple('ProcessInfo', ['pid', 'name', 'status', 'rss', 'create_time', 'cpu_percent'])
+
+PROCESS_ATTRS = ['pid', 'ppid', 'name', 'status', 'memory_info', 'create_time', 'cpu_times']
+
+
+def _column(typecode, values, length):
+    return array(typecode, values) if values is not None else array(typecode, [0]) * length
+
+
+# Column-oriented, immutable view of the process list. Row i of every
+# column describes the same process; (pid, create_time) identifies it
+# across snapshots even when the OS recycles the pid. cpu_times holds the
+# cumulative user+system seconds that cpu_percent is derived from. hosts is
+# only set on fleet snapshots and names the agent each row came from; keys
+# then end with the host, since two machines can share a pid and start time.
+class ProcessSnapshot:
+    __slots__ = ('pids', 'names', 'statuses', 'rss', 'create_times', 'cpu_times', 'cpu_percent',
+                 'timestamp', 'ppids', 'hosts', '_key_index', '_tree', '_groups')
+
+    def __init__(self, pids=(), names=(), statuses=(), rss=(), create_times=None, cpu_times=None,
+                 cpu_percent=None, timestamp=None, ppids=None, hosts=None):
+        self.pids = array('q', pids)
+        n = len(self.pids)
+        self.names = tuple(names)
+        self.statuses = tuple(statuses)
+        self.rss = array('Q', rss)
+        self.create_times = _column('d', create_times, n)
+        self.cpu_times = _column('d', cpu_times, n)
+        self.cpu_percent = _column('d', cpu_percent, n)
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.ppids = _column('q', ppids, n)
+        self.hosts = tuple(hosts) if hosts is not None else None
+        self._key_index = None
+        self._tree = None
+        self._groups = None
+
+    def __len__(self):
+        return len(self.pids)
+
+    def __iter__(self):
+        return (self.row(i) for i in range(len(self.pids)))
+
+    def row(self, i):
+        return ProcessInfo(self.pids[i], self.names[i], self.statuses[i], self.rss[i], self.create_times[i],
+                           self.cpu_percent[i])
+
+    def key(self, i):
+        if self.hosts is not None:
+            return (self.pids[i], self.create_times[i], self.hosts[i])
+        return (self.pids[i], self.create_times[i])
+
+    def keys(self):
+        if self.hosts is not None:
+            return zip(self.pids, self.create_times, self.hosts)
+        return zip(self.pids, self.create_times)
+
+    def find(self, key):
+        if self._key_index is None:
+            self._key_index = {k: i for i, k in enumerate(self.keys())}
+        return self._key_index.get(key)
+
+    # Parent/child index, built on first use
+    def tree(self):
+        if self._tree is None:
+            self._tree = ProcessTree(self)
+        return self._tree
+
+    # Per-application aggregates, built on first use
+    def groups(self):
+        if self._groups is None:
+            self._groups = ProcessGroups(self)
+        return self._groups
+
+
+# Snapshot key of a task dict, matching ProcessSnapshot.key
+def task_key(task):
+    if task.get('host'):
+        return (task['pid'], task['create_time'], task['host'])
+    return (task['pid'], task['create_time'])
+
+
+# CPU% per row from the cpu_times delta against the previous snapshot.
+# Processes with no previous sample fall back to their lifetime average.
+def compute_cpu_percent(previous, cpu_times, pids, create_times, timestamp):
+    percent = array('d', [0.0]) * len(cpu_times)
+    dt = timestamp - previous.timestamp if previous is not None else 0.0
+    prev_times = previous.cpu_times if previous is not None else None
+    for j, key in enumerate(zip(pids, create_times)):
+        i = previous.find(key) if dt > 0 else None
+        if i is not None:
+            used, elapsed = cpu_times[j] - prev_times[i], dt
+        else:
+            used, elapsed = cpu_times[j], timestamp - create_times[j]
+        if elapsed > 0 and used > 0:
+            percent[j] = used / elapsed * 100.0
+    return percent
+
+
+# process_iter is anything with psutil.process_iter's signature that yields
+# objects with an .info dict; the benchmarks substitute a synthetic table.
+def collect_snapshot(previous=None, process_iter=psutil.process_iter):
+    pids, ppids, names, statuses = array('q'), array('q'), [], []
+    rss, create_times, cpu_times = array('Q'), array('d'), array('d')
+    timestamp = time.time()
+    for proc in process_iter(PROCESS_ATTRS):
+        try:
+            info = proc.info
+            mem = info['memory_info']
+            cpu = info['cpu_times']
+            pids.append(info['pid'])
+            ppids.append(info['ppid'] or 0)
+            names.append(info['name'] or "")
+            statuses.append(info['status'] or "")
+            rss.append(mem.rss if mem else 0)
+            create_times.append(info['create_time'] or 0.0)
+            cpu_times.append(cpu.user + cpu.system if cpu else 0.0)
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            pass
+    cpu_percent = compute_cpu_percent(previous, cpu_times, pids, create_times, timestamp)
+    return ProcessSnapshot(pids, names, statuses, rss, create_times, cpu_times, cpu_percent, timestamp, ppids)
@@ -0,0 +1,70 @@
+from PyQt6.QtCore import Qt, QPointF
+from PyQt6.QtGui import QColor, QPainter, QPen, QPolygonF
+from PyQt6.QtWidgets import QStyledItemDelegate, QWidget, QStyle
+
+HISTORY_ROLE = Qt.ItemDataRole.UserRole + 1
+
+
+def _polyline(values, rect, low=None):
+    low = min(values) if low is None else low
+    span = max(values) - low
+    n = len(values)
+    step = rect.width() / max(n - 1, 1)
+    if span <= 0:
+        # Flat series: draw through the middle rather than pinned to an edge
+        y = rect.center().y() if low else rect.bottom()
+        return QPolygonF([QPointF(rect.left() + k * step, y) for k in range(n)])
+    return QPolygonF([QPointF(rect.left() + k * step, rect.bottom() - (v - low) / span * rect.height())
+                      for k, v in enumerate(values)])
+
+
+# Paints the HISTORY_ROLE series of a cell as a small line chart
+class SparklineDelegate(QStyledItemDelegate):
+    def __init__(self, parent=None, color="#00d0ff"):
+        super().__init__(parent)
+        self.pen = QPen(QColor(color), 1.2)
+
+    def paint(self, painter, option, index):
+        if option.state & QStyle.StateFlag.State_Selected:
+            painter.fillRect(option.rect, option.palette.highlight())
+        values = index.data(HISTORY_ROLE)
+        if not values or len(values) < 2:
+            return
+        rect = option.rect.adjusted(3, 3, -3, -3)
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(self.pen)
+        painter.drawPolyline(_polyline(values, rect))
+        painter.restore()
+
+
+# Larger history graph for the selected process: one or more labelled series
+class HistoryGraph(QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.series = []
+        self.setMinimumHeight(80)
+
+    def set_series(self, series):
+        # series: list of (label, values, color, unit)
+        self.series = series
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        if not self.series:
+            painter.setPen(QColor("#888888"))
+            painter.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter, "Select a process to see its history")
+            return
+        band = self.height() / len(self.series)
+        for n, (label, values, color, unit) in enumerate(self.series):
+            rect = self.rect().adjusted(6, int(n * band) + 18, -6, -int((len(self.series) - n - 1) * band) - 4)
+            painter.setPen(QColor("#888888"))
+            current = f"{values[-1]:.1f} {unit}" if values else "-"
+            peak = f"{max(values):.1f} {unit}" if values else "-"
+            painter.drawText(rect.left(), rect.top() - 4, f"{label}: {current} (peak {peak})")
+            painter.drawRect(rect)
+            if len(values) >= 2:
+                painter.setPen(QPen(QColor(color), 1.5))
+                painter.drawPolyline(_polyline(values, rect, low=0.0))
@@ -0,0 +1,67 @@
+import os
+import sys
+import tempfile
+import time
+
+
+# Records named startup phases and reports them relative to process start.
+# Disabled (and free) unless main.py is run with --profile-startup.
+class StartupProfiler:
+    def __init__(self):
+        self.enabled = False
+        self.output = None
+        self.marks = []
+        self._reported = False
+
+    def enable(self, output=None):
+        self.enabled = True
+        self.output = output
+        self.marks = [("process start", self._process_start()), ("python ready", time.perf_counter())]
+
+    def mark(self, phase):
+        if self.enabled:
+            self.marks.append((phase, time.perf_counter()))
+
+    def report(self):
+        if not self.enabled or self._reported:
+            return
+        self._reported = True
+        lines = ["Startup profile (ms)", f"  {'phase':<28}{'step':>9}{'total':>9}"]
+        start = previous = self.marks[0][1]
+        for phase, t in self.marks[1:]:
+            lines.append(f"  {phase:<28}{(t - previous) * 1000:9.1f}{(t - start) * 1000:9.1f}")
+            previous = t
+        text = "\n".join(lines) + "\n"
+        if self.output and self.output != '-':
+            with open(self.output, 'w') as f:
+                f.write(text)
+        elif sys.stderr is not None:
+            sys.stderr.write(text)
+        else:
+            # --windowed builds have no console
+            with open(os.path.join(tempfile.gettempdir(), "qt-xkiller-startup.txt"), 'w') as f:
+                f.write(text)
+
+    def _process_start(self):
+        pid = os.getpid()
+        # A --onefile build runs inside a child of the unpacking bootloader
+        if os.path.basename(getattr(sys, '_MEIPASS', '')).startswith('_MEI'):
+            pid = os.getppid()
+        try:
+            return time.perf_counter() - self._age(pid)
+        except Exception:
+            return time.perf_counter()
+
+    def _age(self, pid):
+        if sys.platform.startswith('linux'):
+            # psutil rounds boot time to whole seconds; /proc is exact to the clock tick
+            with open(f"/proc/{pid}/stat") as f:
+                start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+            with open("/proc/uptime") as f:
+                uptime = float(f.read().split()[0])
+            return uptime - start_ticks / os.sysconf('SC_CLK_TCK')
+        import psutil
+        return time.time() - psutil.Process(pid).create_time()
+
+
+PROFILER = StartupProfiler()
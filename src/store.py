@@ -0,0 +1,87 @@
+import os
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    pid INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    create_time REAL,
+    tree INTEGER NOT NULL DEFAULT 0,
+    deadline REAL NOT NULL,
+    mode TEXT,
+    type TEXT,
+    schedule TEXT
+);
+CREATE TABLE IF NOT EXISTS whitelist (name TEXT PRIMARY KEY);
+"""
+TASK_FIELDS = ('id', 'pid', 'name', 'create_time', 'tree', 'deadline', 'mode', 'type', 'schedule')
+
+
+# Per-user state directory: %APPDATA% on Windows, $XDG_STATE_HOME (or
+# ~/.local/state) elsewhere.
+def default_path(filename):
+    base = os.environ.get('APPDATA') or os.environ.get('XDG_STATE_HOME') \
+        or os.path.join(os.path.expanduser('~'), '.local', 'state')
+    return os.path.join(base, 'qt-xkiller', filename)
+
+
+# SQLite-backed copy of the scheduled kills and the user whitelist. Every
+# change is its own small autocommitted write; WAL mode keeps those cheap
+# and a crash mid-write leaves the previous state intact. Safe to call from
+# any thread.
+class StateStore:
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        # Files written before recurring kills existed
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(tasks)")}
+        if 'schedule' not in columns:
+            self._conn.execute("ALTER TABLE tasks ADD COLUMN schedule TEXT")
+
+    def save_task(self, task):
+        self.save_tasks([task])
+
+    def save_tasks(self, tasks):
+        rows = [tuple(task.get(field) for field in TASK_FIELDS) for task in tasks]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(f"INSERT OR REPLACE INTO tasks ({', '.join(TASK_FIELDS)}) "
+                                   f"VALUES ({', '.join('?' * len(TASK_FIELDS))})", rows)
+            self._conn.execute("COMMIT")
+
+    def delete_tasks(self, task_ids):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("DELETE FROM tasks WHERE id = ?", ((i,) for i in task_ids))
+            self._conn.execute("COMMIT")
+
+    def add_whitelist(self, name):
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO whitelist VALUES (?)", (name,))
+
+    def remove_whitelist(self, name):
+        with self._lock:
+            self._conn.execute("DELETE FROM whitelist WHERE name = ?", (name,))
+
+    # (tasks, whitelist names) as last written
+    def load(self):
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {', '.join(TASK_FIELDS)} FROM tasks").fetchall()
+            whitelist = [name for (name,) in self._conn.execute("SELECT name FROM whitelist")]
+        tasks = [{'id': i, 'pid': pid, 'name': name, 'create_time': create_time, 'tree': bool(tree),
+                  'deadline': deadline, 'mode': mode, 'type': kind, 'schedule': schedule}
+                 for i, pid, name, create_time, tree, deadline, mode, kind, schedule in rows]
+        return tasks, whitelist
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
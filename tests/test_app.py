@@ -0,0 +1,31 @@
+import unittest
+from PyQt6.QtWidgets import QApplication
+from src.app import TaskKillerApp
+from benchmarks.fake_psutil import FakeProcessTable
+
+app = QApplication.instance() or QApplication([])
+
+class TestLazyTabs(unittest.TestCase):
+    def setUp(self):
+        self.window = TaskKillerApp(process_iter=FakeProcessTable(50).process_iter)
+        self.addCleanup(self.window.force_quit)
+
+    def test_tab_is_built_when_first_shown(self):
+        tabs, built = self.window.tabs, []
+        page = self.window.add_lazy_tab(tabs, built.append, "Extra")
+        self.assertEqual(built, [])
+        tabs.setCurrentWidget(page)
+        self.assertEqual(built, [page])
+        # Switching away and back does not build it again
+        tabs.setCurrentIndex(0)
+        tabs.setCurrentWidget(page)
+        self.assertEqual(built, [page])
+
+    def test_info_tabs_start_unbuilt(self):
+        window = self.window
+        self.assertIsNone(window.whitelist_list)
+        window.info_tabs.setCurrentIndex(1)
+        self.assertIsNotNone(window.whitelist_list)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+from PyQt6.QtCore import QCoreApplication, QEventLoop, QTimer
+from src.collector import SnapshotCollector
+from src.snapshot import collect_snapshot, compute_cpu_percent, ProcessSnapshot
+from benchmarks.fake_psutil import FakeProcessTable
+import os
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+class TestSnapshot(unittest.TestCase):
+    def test_snapshot_contains_self(self):
+        snapshot = collect_snapshot()
+        self.assertIsInstance(snapshot, ProcessSnapshot)
+        self.assertIn(os.getpid(), [p.pid for p in snapshot])
+
+    def test_snapshot_from_synthetic_provider(self):
+        table = FakeProcessTable(500, churn=0.1)
+        first = collect_snapshot(process_iter=table.process_iter)
+        table.tick()
+        second = collect_snapshot(first, table.process_iter)
+        self.assertEqual(len(first), 500)
+        self.assertEqual(len(second), 500)
+        self.assertEqual(len(set(first.keys()) - set(second.keys())), 50)
+
+    def test_cpu_percent_from_cpu_times_delta(self):
+        previous = ProcessSnapshot(pids=[1, 2], names=["a", "b"], statuses=["running"] * 2, rss=[0, 0],
+                                   create_times=[100.0, 100.0], cpu_times=[10.0, 4.0], timestamp=1000.0)
+        # pid 1 used 1 s over 2 s, pid 2 was replaced by a new process, pid 3 appeared
+        percent = compute_cpu_percent(previous, [11.0, 0.5, 3.0], [1, 2, 3], [100.0, 1001.0, 998.0], 1002.0)
+        self.assertAlmostEqual(percent[0], 50.0)
+        self.assertAlmostEqual(percent[1], 50.0)
+        self.assertAlmostEqual(percent[2], 75.0)
+
+    def test_first_snapshot_uses_lifetime_average(self):
+        percent = compute_cpu_percent(None, [5.0], [1], [90.0], 100.0)
+        self.assertAlmostEqual(percent[0], 50.0)
+
+class TestCollector(unittest.TestCase):
+    def test_overlapping_requests_are_coalesced(self):
+        collector = SnapshotCollector()
+        received = []
+        loop = QEventLoop()
+        collector.snapshot_ready.connect(received.append)
+        collector.snapshot_ready.connect(lambda s: None if collector.is_busy() else loop.quit())
+        QTimer.singleShot(10000, loop.quit)
+        for _ in range(10):
+            collector.request_refresh()
+        loop.exec()
+        collector.stop()
+        self.assertTrue(1 <= len(received) <= 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+import urllib.error
+import urllib.request
+from src.control_api import ControlAPI, start_control_server
+from src.engine import KillerEngine
+from src.recurrence import make_recurring_task
+from src.snapshot import collect_snapshot
+
+class RecordingHost:
+    def __init__(self):
+        self.calls = []
+
+    def snapshot(self):
+        return collect_snapshot()
+
+    def on_scheduled(self, tasks):
+        self.calls.append(('scheduled', len(tasks)))
+
+    def on_cancelled(self, tasks):
+        self.calls.append(('cancelled', len(tasks)))
+
+    def kill_now(self, tasks):
+        self.calls.append(('kill', [t['pid'] for t in tasks]))
+
+    def on_whitelist_changed(self):
+        self.calls.append(('whitelist', None))
+
+class TestControlAPI(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.engine = KillerEngine()
+        self.host = RecordingHost()
+        self.server = start_control_server(0, ControlAPI(self.engine, self.host),
+                                           os.path.join(self.dir.name, "token"))
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        with open(os.path.join(self.dir.name, "token")) as f:
+            self.token = f.read()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.dir.cleanup()
+
+    def call(self, method, path, body=None, token=None):
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(self.url + path, data=data, method=method)
+        request.add_header("Authorization", f"Bearer {token or self.token}")
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    def test_requires_token(self):
+        status, reply = self.call('GET', '/tasks', token="wrong")
+        self.assertEqual(status, 401)
+
+    def test_bulk_schedule_and_cancel(self):
+        me = os.getpid()
+        entries = [{'pid': me, 'in': 3600 + i} for i in range(1000)] + [{'pid': -1, 'in': 10}, {'in': 10}]
+        start = time.perf_counter()
+        status, reply = self.call('POST', '/tasks', {'tasks': entries})
+        self.assertLess(time.perf_counter() - start, 5)
+        self.assertEqual(status, 200)
+        self.assertEqual(len(reply['scheduled']), 1000)
+        self.assertEqual([e['index'] for e in reply['errors']], [1000, 1001])
+        self.assertEqual(len(self.engine.tasks), 1000)
+        self.assertEqual(self.host.calls, [('scheduled', 1000)])
+
+        status, reply = self.call('GET', '/tasks')
+        self.assertEqual(len(reply['tasks']), 1000)
+        first = reply['tasks'][0]['id']
+        status, reply = self.call('POST', '/tasks/cancel', {'ids': [first]})
+        self.assertEqual(reply['cancelled'], [first])
+        status, reply = self.call('POST', '/tasks/cancel', {'all': True})
+        self.assertEqual(len(reply['cancelled']), 999)
+        self.assertEqual(self.engine.next_deadline(), None)
+
+    def test_cancel_by_pid_skips_recurring_tasks(self):
+        self.engine.schedule(make_recurring_task("chrome", "every 1h"))
+        status, reply = self.call('POST', '/tasks/cancel', {'pids': [0]})
+        self.assertEqual(reply['cancelled'], [])
+        self.assertEqual(len(self.engine.tasks), 1)
+
+    def test_kill_respects_whitelist(self):
+        status, reply = self.call('POST', '/whitelist', {'add': ["Python3", "svchost.exe"]})
+        self.assertEqual(reply['added'], ["python3"])
+        self.assertIn("python3", self.call('GET', '/whitelist')[1]['user'])
+        me = os.getpid()
+        name = [p for p in collect_snapshot() if p.pid == me][0].name
+        self.engine.add_to_whitelist(name)
+        status, reply = self.call('POST', '/kill', {'targets': [{'pid': me}]})
+        self.assertEqual(reply['protected'], [me])
+        self.assertNotIn('kill', [c[0] for c in self.host.calls])
+
+    def test_list_processes_with_query(self):
+        status, reply = self.call('GET', f'/processes?q=pid:{os.getpid()}')
+        self.assertEqual([p['pid'] for p in reply['processes']], [os.getpid()])
+        self.assertEqual(self.call('GET', '/nope')[0], 404)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import subprocess
+import sys
+import threading
+import time
+import unittest
+import psutil
+from src.daemon import SchedulerDaemon
+
+class TestDaemon(unittest.TestCase):
+    def test_daemon_does_not_import_qt(self):
+        code = "import sys, main, src.daemon; print(any(m.startswith('PyQt6') for m in sys.modules))"
+        out = subprocess.check_output([sys.executable, "-c", code], text=True)
+        self.assertEqual(out.strip(), "False")
+
+    def test_scheduled_kill_fires(self):
+        child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+        proc = psutil.Process(child.pid)
+        daemon = SchedulerDaemon(grace=1.0, exit_when_idle=True)
+        daemon.schedule({'pid': child.pid, 'name': 'sleeper', 'create_time': proc.create_time(),
+                         'deadline': time.time() + 0.2})
+        runner = threading.Thread(target=daemon.run)
+        runner.start()
+        runner.join(10)
+        self.assertFalse(runner.is_alive())
+        self.assertIsNotNone(child.wait(5))
+
+    def test_exits_at_once_with_nothing_queued(self):
+        start = time.monotonic()
+        SchedulerDaemon(exit_when_idle=True).run()
+        self.assertLess(time.monotonic() - start, 1.0)
+        subprocess.run([sys.executable, "main.py", "--daemon", "--exit-when-idle", "--no-state"],
+                       check=True, timeout=10, capture_output=True)
+
+    def test_whitelisted_task_is_blocked(self):
+        child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+        daemon = SchedulerDaemon(grace=1.0, exit_when_idle=True)
+        daemon.engine.add_to_whitelist("Sleeper")
+        daemon.schedule({'pid': child.pid, 'name': 'sleeper', 'deadline': time.time()})
+        daemon.run()
+        self.assertIsNone(child.poll())
+        child.kill()
+        child.wait()
+
+if __name__ == '__main__':
+    unittest.main()
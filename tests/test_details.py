@@ -0,0 +1,139 @@
+import os
+import threading
+import time
+import unittest
+import psutil
+from PyQt6.QtCore import QCoreApplication, Qt
+from src.details import DETAIL_FIELDS, DetailCache, fetch_details
+from src.process_model import COLUMNS, DETAIL_COLUMNS, ProcessTableModel
+from src.snapshot import ProcessSnapshot
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+
+def counting_fetch(calls):
+    def fetch(pid, create_time):
+        calls.append(pid)
+        return {'uss': pid * 1024 * 1024, 'threads': pid}
+    return fetch
+
+
+# on_ready callback that can be waited on
+class Ready:
+    def __init__(self):
+        self.keys = []
+        self._arrived = threading.Semaphore(0)
+
+    def __call__(self, key):
+        self.keys.append(key)
+        self._arrived.release()
+
+    def wait(self, count):
+        for _ in range(count):
+            if not self._arrived.acquire(timeout=5):
+                raise AssertionError("details never arrived")
+
+
+class TestFetchDetails(unittest.TestCase):
+    def test_own_process(self):
+        create_time = psutil.Process().create_time()
+        details = fetch_details(os.getpid(), create_time)
+        self.assertEqual(set(details), set(DETAIL_FIELDS))
+        self.assertGreaterEqual(details['threads'], 1)
+        self.assertEqual(details['username'], psutil.Process().username())
+
+    def test_replaced_pid_is_not_reported(self):
+        self.assertIsNone(fetch_details(os.getpid(), psutil.Process().create_time() - 1))
+
+
+class TestDetailCache(unittest.TestCase):
+    def test_fetches_once_per_ttl(self):
+        calls, ready = [], Ready()
+        cache = DetailCache(ready, ttl=10, workers=2, fetch=counting_fetch(calls))
+        self.addCleanup(cache.close)
+        cache.request([(1, 1.0), (2, 2.0)])
+        ready.wait(2)
+        self.assertEqual(sorted(calls), [1, 2])
+        self.assertEqual(sorted(ready.keys), [(1, 1.0), (2, 2.0)])
+        self.assertEqual(cache.get((2, 2.0))['threads'], 2)
+        cache.request([(1, 1.0), (2, 2.0)])
+        cache.close()
+        self.assertEqual(len(calls), 2)
+
+    def test_expired_details_are_refetched_then_evicted(self):
+        calls, ready = [], Ready()
+        cache = DetailCache(ready, ttl=0.0, workers=1, fetch=counting_fetch(calls))
+        self.addCleanup(cache.close)
+        cache.request([(1, 1.0)])
+        ready.wait(1)
+        cache.request([(1, 1.0)])
+        ready.wait(1)
+        self.assertEqual(calls, [1, 1])
+        # Nobody asks for it any more, so it is dropped
+        cache.request([(2, 2.0)])
+        self.assertIsNone(cache.get((1, 1.0)))
+
+    def test_rows_scrolled_past_are_not_fetched(self):
+        gate = threading.Event()
+        calls, ready = [], Ready()
+        fetch = counting_fetch(calls)
+
+        def slow_fetch(pid, create_time):
+            gate.wait(5)
+            return fetch(pid, create_time)
+        cache = DetailCache(ready, workers=1, fetch=slow_fetch)
+        self.addCleanup(cache.close)
+        cache.request([(pid, 0.0) for pid in range(1, 51)])
+        cache.request([(100, 0.0)])
+        gate.set()
+        while (100, 0.0) not in ready.keys:
+            ready.wait(1)
+        # At most the fetch already running when the view moved on
+        self.assertLessEqual(len(calls), 2)
+
+    def test_failed_fetch_is_retried_after_ttl(self):
+        calls = []
+        fetched = threading.Event()
+
+        def failing_fetch(pid, create_time):
+            calls.append(pid)
+            fetched.set()
+            raise RuntimeError("boom")
+        cache = DetailCache(ttl=0.0, workers=1, fetch=failing_fetch)
+        self.addCleanup(cache.close)
+        cache.request([(1, 1.0)])
+        self.assertTrue(fetched.wait(5))
+        deadline = time.monotonic() + 5
+        while cache._queued and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertIsNone(cache.get((1, 1.0)))
+        fetched.clear()
+        cache.request([(1, 1.0)])
+        self.assertTrue(fetched.wait(5))
+        self.assertEqual(calls, [1, 1])
+
+
+class TestDetailColumns(unittest.TestCase):
+    def test_cells_fill_in_from_the_cache(self):
+        ready = Ready()
+        cache = DetailCache(ready, fetch=counting_fetch([]))
+        self.addCleanup(cache.close)
+        model = ProcessTableModel()
+        model.details = cache
+        model.set_columns(COLUMNS + DETAIL_COLUMNS)
+        model.set_snapshot(ProcessSnapshot([3, 5], ["a", "b"], ["running"] * 2, [1, 2], [30.0, 50.0]))
+        uss = len(COLUMNS)
+        self.assertEqual(model.data(model.index(0, uss)), "")
+        cache.request([(3, 30.0), (5, 50.0)])
+        ready.wait(2)
+        self.assertEqual(model.data(model.index(0, uss)), "3.00 MB")
+        self.assertEqual(model.data(model.index(1, uss + 2)), "5")
+        self.assertEqual(model.data(model.index(1, uss + 1)), "")
+        model.sort(uss, Qt.SortOrder.DescendingOrder)
+        self.assertEqual(model.process_at(0).pid, 5)
+        model.set_columns(COLUMNS)
+        self.assertEqual(model.columnCount(), len(COLUMNS))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+from PyQt6.QtCore import QCoreApplication, QPersistentModelIndex
+from src.diff import diff_snapshots
+from src.process_model import ProcessTableModel
+from src.search import MB, SearchIndex
+from src.snapshot import ProcessSnapshot
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+OLD = ProcessSnapshot(pids=[1, 2, 3, 4], names=["a", "b", "c", "d"], statuses=["running"] * 4,
+                      rss=[10, 20, 30, 40], create_times=[1.0, 2.0, 3.0, 4.0])
+# pid 2 exited, pid 3 was reused by a new process, pid 4 grew, pid 5 started
+NEW = ProcessSnapshot(pids=[1, 3, 4, 5], names=["a", "x", "d", "e"], statuses=["running"] * 4,
+                      rss=[10, 30, 45, 50], create_times=[1.0, 9.0, 4.0, 5.0])
+
+class TestDiff(unittest.TestCase):
+    def test_diff_keyed_by_pid_and_create_time(self):
+        diff = diff_snapshots(OLD, NEW)
+        self.assertEqual(list(diff.removed), [1, 2])
+        self.assertEqual(list(diff.added), [1, 3])
+        self.assertEqual(list(diff.changed), [2])
+        self.assertEqual(list(diff.remap), [0, -1, -1, 2])
+
+    def test_model_applies_minimal_updates(self):
+        model = ProcessTableModel()
+        model.set_snapshot(OLD)
+        selected = QPersistentModelIndex(model.index(3, 0))
+        removed = []
+        model.rowsRemoved.connect(lambda parent, first, last: removed.append((first, last)))
+        model.modelReset.connect(lambda: self.fail("model was reset"))
+        model.apply_diff(NEW, diff_snapshots(OLD, NEW), lambda i: NEW.names[i] != "e")
+        self.assertEqual(removed, [(1, 2)])
+        self.assertEqual([model.process_at(r).name for r in range(model.rowCount())], ["a", "d", "x"])
+        self.assertEqual(model.process_at(selected.row()).pid, 4)
+
+    def test_value_filters_follow_changed_rows(self):
+        before = ProcessSnapshot(pids=[1, 2, 3], names=["a", "b", "c"], statuses=["running"] * 3,
+                                 rss=[800 * MB, 100 * MB, 900 * MB], create_times=[1.0, 2.0, 3.0])
+        after = ProcessSnapshot(pids=[1, 2, 3], names=["a", "b", "c"], statuses=["running"] * 3,
+                                rss=[10 * MB, 700 * MB, 900 * MB], create_times=[1.0, 2.0, 3.0])
+        model = ProcessTableModel()
+        model.set_snapshot(before, SearchIndex(before).search("mem>500"))
+        model.modelReset.connect(lambda: self.fail("model was reset"))
+        model.apply_diff(after, diff_snapshots(before, after), SearchIndex(after).predicate("mem>500"))
+        self.assertEqual(sorted(model.process_at(r).pid for r in range(model.rowCount())), [2, 3])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,184 @@
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from src.control_api import ControlAPI
+from src.daemon import SchedulerDaemon
+from src.diff import diff_snapshots
+from src.engine import KillerEngine
+from src.fleet import (AgentServer, FleetAgent, FleetClient, SnapshotSource, apply_delta, is_loopback,
+                       load_token, parse_address, snapshot_delta)
+from src.history import MetricsHistory
+from src.snapshot import ProcessSnapshot, task_key
+
+TOKEN = "test-token"
+
+
+def make_snapshot(rows):
+    # rows: (pid, name, rss)
+    return ProcessSnapshot([r[0] for r in rows], [r[1] for r in rows], ['running'] * len(rows),
+                           [r[2] for r in rows], [float(r[0]) for r in rows])
+
+
+class TestFleetProtocol(unittest.TestCase):
+    def test_delta_round_trip(self):
+        old = make_snapshot([(1, 'init', 10), (2, 'a', 20), (3, 'b', 30)])
+        new = make_snapshot([(1, 'init', 10), (3, 'b', 35), (4, 'c', 40)])
+        rows = {}
+        apply_delta(rows, snapshot_delta(None, old))
+        self.assertEqual(sorted(rows), [1, 2, 3])
+        delta = snapshot_delta(old, new)
+        self.assertFalse(delta['full'])
+        self.assertEqual(delta['removed'], [2])
+        # Only the changed and the new process travel
+        self.assertEqual(sorted(r[0] for r in delta['rows']), [3, 4])
+        apply_delta(rows, delta)
+        self.assertEqual({pid: row[4] for pid, row in rows.items()}, {1: 10, 3: 35, 4: 40})
+        self.assertEqual(snapshot_delta(new, new)['rows'], [])
+
+    def test_delta_skips_changes_lost_to_rounding(self):
+        old = ProcessSnapshot([1, 2], ['a', 'b'], ['running'] * 2, [10, 20], [1.0, 2.0], cpu_percent=[1.01, 5.0])
+        new = ProcessSnapshot([1, 2], ['a', 'b'], ['running'] * 2, [10, 20], [1.0, 2.0], cpu_percent=[1.02, 7.5])
+        self.assertEqual([r[0] for r in snapshot_delta(old, new)['rows']], [2])
+
+    def test_same_process_key_on_two_hosts(self):
+        def merged(rss):
+            return ProcessSnapshot([1, 1], ['init', 'init'], ['running'] * 2, rss, [5.0, 5.0],
+                                   hosts=['a:9000', 'b:9000'])
+        old, new = merged([10, 20]), merged([10, 25])
+        self.assertEqual(new.find((1, 5.0, 'b:9000')), 1)
+        self.assertEqual(new.find(task_key({'pid': 1, 'create_time': 5.0, 'host': 'a:9000'})), 0)
+        diff = diff_snapshots(old, new)
+        self.assertEqual((list(diff.added), list(diff.changed), list(diff.remap)), ([], [1], [0, 1]))
+        history = MetricsHistory()
+        history.record(old)
+        history.record(new)
+        self.assertEqual(len(history), 2)
+        self.assertEqual(history.series((1, 5.0, 'b:9000')), [20 / 1024 / 1024, 25 / 1024 / 1024])
+
+    def test_parse_address(self):
+        self.assertEqual(parse_address("box:9000"), ("box", 9000))
+        self.assertEqual(parse_address("[::1]:9000"), ("::1", 9000))
+        self.assertEqual(parse_address("box")[0], "box")
+        with self.assertRaises(ValueError):
+            parse_address("box:http")
+
+    def test_is_loopback(self):
+        self.assertTrue(is_loopback("127.0.0.1"))
+        self.assertTrue(is_loopback("::1"))
+        self.assertTrue(is_loopback("localhost"))
+        self.assertFalse(is_loopback("0.0.0.0"))
+        self.assertFalse(is_loopback("10.0.0.5"))
+        self.assertFalse(is_loopback("web1"))
+
+    def test_load_token_is_reused(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "fleet-token")
+            token = load_token(path)
+            self.assertEqual(load_token(path), token)
+
+
+class TestFleet(unittest.TestCase):
+    def setUp(self):
+        self.daemon = SchedulerDaemon(KillerEngine())
+        self.daemon_thread = threading.Thread(target=self.daemon.run, daemon=True)
+        self.daemon_thread.start()
+        agent = FleetAgent(ControlAPI(self.daemon.engine, self.daemon), TOKEN, SnapshotSource(min_interval=0))
+        self.server = AgentServer(agent, 0)
+        self.address = "%s:%d" % self.server.address
+        self.snapshots = []
+        self.events = []
+        self.received = threading.Event()
+        self.children = []
+
+    def tearDown(self):
+        for child in self.children:
+            if child.poll() is None:
+                child.kill()
+                child.wait()
+        self.server.shutdown()
+        self.daemon.stop()
+        self.daemon_thread.join()
+
+    def client(self, token=TOKEN, addresses=None):
+        def on_snapshot(snapshot):
+            self.snapshots.append(snapshot)
+            self.received.set()
+        fleet = FleetClient(addresses or [self.address], token, on_snapshot,
+                            lambda level, message: self.events.append((level, message)))
+        fleet.start()
+        self.addCleanup(fleet.stop)
+        return fleet
+
+    def poll(self, fleet):
+        self.received.clear()
+        fleet.refresh()
+        self.assertTrue(self.received.wait(10))
+        return self.snapshots[-1]
+
+    def spawn(self):
+        child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+        self.children.append(child)
+        return child
+
+    def test_merged_snapshot_has_host_column(self):
+        fleet = self.client()
+        snapshot = self.poll(fleet)
+        row = list(snapshot.pids).index(os.getpid())
+        self.assertEqual(snapshot.find((os.getpid(), snapshot.create_times[row], self.address)), row)
+        self.assertEqual(snapshot.hosts[row], self.address)
+        self.assertEqual(set(snapshot.hosts), {self.address})
+        # Later polls stay on the same connection and see new processes
+        child = self.spawn()
+        self.assertIn(child.pid, self.poll(fleet).pids)
+        self.assertEqual(fleet.connected_count(), 1)
+
+    def test_wrong_token_and_unreachable_agent(self):
+        fleet = self.client(token="wrong", addresses=[self.address, "127.0.0.1:1"])
+        snapshot = self.poll(fleet)
+        self.assertEqual(len(snapshot), 0)
+        self.assertEqual(fleet.connected_count(), 0)
+        messages = " ".join(message for _, message in self.events)
+        self.assertIn("wrong token", messages)
+        self.assertIn("127.0.0.1:1", messages)
+
+    def test_kill_and_whitelist_run_on_the_agent(self):
+        fleet = self.client()
+        child = self.spawn()
+        snapshot = self.poll(fleet)
+        row = list(snapshot.pids).index(child.pid)
+        task = {'pid': child.pid, 'name': snapshot.names[row], 'create_time': snapshot.create_times[row],
+                'host': snapshot.hosts[row]}
+
+        fleet.set_whitelist([task['name']])
+        deadline = time.time() + 10
+        while task['name'] not in self.daemon.engine.whitelist_names() and time.time() < deadline:
+            time.sleep(0.02)
+        self.assertIn(task['name'], self.daemon.engine.whitelist_names())
+        fleet.kill([task])
+        deadline = time.time() + 10
+        while not any("whitelisted" in m for _, m in self.events) and time.time() < deadline:
+            time.sleep(0.02)
+        self.assertIsNone(child.poll())
+
+        fleet.set_whitelist([])
+        fleet.kill([task])
+        child.wait(10)
+        self.assertNotIn(task['name'], self.daemon.engine.whitelist_names())
+
+    def test_schedule_on_the_agent(self):
+        fleet = self.client()
+        child = self.spawn()
+        snapshot = self.poll(fleet)
+        row = list(snapshot.pids).index(child.pid)
+        fleet.schedule([{'pid': child.pid, 'name': snapshot.names[row], 'create_time': snapshot.create_times[row],
+                         'host': self.address, 'deadline': time.time() + 0.2}])
+        child.wait(10)
+        self.assertTrue(any("scheduled kill" in m for _, m in self.events))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+from src.history import MetricsHistory
+from src.snapshot import ProcessSnapshot
+
+MB = 1024 * 1024
+
+def snapshot(rows):
+    # rows: list of (pid, rss_mb, cpu)
+    return ProcessSnapshot(pids=[r[0] for r in rows], names=["p"] * len(rows), statuses=["running"] * len(rows),
+                           rss=[r[1] * MB for r in rows], create_times=[1.0] * len(rows),
+                           cpu_percent=[r[2] for r in rows])
+
+class TestMetricsHistory(unittest.TestCase):
+    def test_ring_keeps_latest_samples_in_order(self):
+        history = MetricsHistory(samples=3)
+        for k in range(5):
+            history.record(snapshot([(1, k, k * 10)]))
+        self.assertEqual(history.series((1, 1.0)), [2.0, 3.0, 4.0])
+        self.assertEqual(history.series((1, 1.0), 'cpu'), [20.0, 30.0, 40.0])
+
+    def test_clear(self):
+        history = MetricsHistory(samples=3)
+        history.record(snapshot([(1, 5, 0)]))
+        history.clear()
+        self.assertEqual((len(history), history.series((1, 1.0))), (0, []))
+        history.record(snapshot([(1, 6, 0)]))
+        self.assertEqual(history.series((1, 1.0)), [6.0])
+
+    def test_new_process_has_short_history(self):
+        history = MetricsHistory(samples=4)
+        history.record(snapshot([(1, 1, 0)]))
+        history.record(snapshot([(1, 1, 0), (2, 7, 0)]))
+        self.assertEqual(history.series((2, 1.0)), [7.0])
+        self.assertEqual(history.series((1, 1.0)), [1.0, 1.0])
+
+    def test_exited_processes_are_evicted_and_slots_reused(self):
+        history = MetricsHistory(samples=4)
+        history.record(snapshot([(1, 1, 0), (2, 2, 0)]))
+        history.record(snapshot([(2, 2, 0)]))
+        self.assertEqual(history.series((1, 1.0)), [])
+        self.assertEqual(len(history), 1)
+        history.record(snapshot([(2, 2, 0), (3, 3, 0)]))
+        self.assertEqual(history.capacity(), 2)
+        self.assertEqual(history.series((3, 1.0)), [3.0])
+
+if __name__ == '__main__':
+    unittest.main()
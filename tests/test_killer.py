@@ -0,0 +1,78 @@
+import subprocess
+import sys
+import time
+import unittest
+import psutil
+from src.killer import expand_tree, kill_targets
+
+SPAWN_TREE = ("import subprocess, sys, time; "
+              "[subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)']) for _ in range(3)]; "
+              "print('ready', flush=True); time.sleep(60)")
+IGNORE_TERM = "import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); print('ready', flush=True); time.sleep(60)"
+
+def spawn(stubborn=False):
+    if stubborn:
+        proc = subprocess.Popen([sys.executable, "-c", IGNORE_TERM], stdout=subprocess.PIPE)
+        proc.stdout.readline()
+    else:
+        proc = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+    return proc
+
+def task_for(proc):
+    return {'pid': proc.pid, 'name': 'python', 'create_time': psutil.Process(proc.pid).create_time()}
+
+class TestKillTargets(unittest.TestCase):
+    def test_batch_shares_one_grace_period(self):
+        children = [spawn() for _ in range(5)]
+        if sys.platform != "win32":
+            children += [spawn(stubborn=True) for _ in range(5)]
+        start = time.monotonic()
+        results = kill_targets([task_for(c) for c in children], grace=0.5)
+        elapsed = time.monotonic() - start
+        self.assertEqual(len(results), len(children))
+        self.assertTrue(all(r.outcome in ('terminated', 'killed') for r in results))
+        self.assertLess(elapsed, 2.0)
+        for c in children:
+            c.wait(5)
+
+    def test_reused_and_missing_pids(self):
+        child = spawn()
+        task = task_for(child)
+        stale = dict(task, create_time=task['create_time'] - 100)
+        results = kill_targets([stale], grace=0.5)
+        self.assertEqual(results[0].outcome, 'reused')
+        self.assertIsNone(child.poll())
+        kill_targets([task], grace=0.5)
+        child.wait(5)
+        self.assertEqual(kill_targets([task], grace=0.5)[0].outcome, 'not_found')
+
+class TestKillTree(unittest.TestCase):
+    def test_tree_is_expanded_leaves_first(self):
+        parent = subprocess.Popen([sys.executable, "-c", SPAWN_TREE], stdout=subprocess.PIPE)
+        parent.stdout.readline()
+        children = psutil.Process(parent.pid).children(recursive=True)
+        task = dict(task_for(parent), tree=True)
+        expanded = expand_tree([task])
+        self.assertEqual(len(expanded), 4)
+        self.assertIs(expanded[-1], task)
+
+        results = kill_targets([task], grace=1.0)
+        self.assertEqual(len(results), 4)
+        self.assertTrue(all(r.outcome in ('terminated', 'killed') for r in results))
+        parent.wait(5)
+        self.assertFalse(any(c.is_running() and c.status() != psutil.STATUS_ZOMBIE for c in children))
+
+    def test_protection_covers_expanded_members(self):
+        parent = subprocess.Popen([sys.executable, "-c", SPAWN_TREE], stdout=subprocess.PIPE)
+        parent.stdout.readline()
+        children = psutil.Process(parent.pid).children(recursive=True)
+        task = dict(task_for(parent), name='launcher', tree=True)
+        results = kill_targets([task], grace=1.0, is_protected=lambda name, **process: name != 'launcher')
+        self.assertEqual([r.outcome for r in results].count('protected'), 3)
+        self.assertTrue(all(c.is_running() for c in children))
+        parent.wait(5)
+        for c in children:
+            c.kill()
+
+if __name__ == '__main__':
+    unittest.main()
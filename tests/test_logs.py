@@ -0,0 +1,47 @@
+import json
+import logging
+import os
+import tempfile
+import unittest
+from src.logs import LogBuffer, start_file_sink
+
+class TestLogs(unittest.TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger(f"qt-xkiller.test.{self.id()}")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+
+    def test_buffer_is_bounded_and_filters_by_level(self):
+        buffer = LogBuffer(capacity=3)
+        self.logger.addHandler(buffer)
+        for i in range(5):
+            self.logger.info("message %d", i)
+        self.logger.warning("careful")
+        self.assertEqual(len(buffer.lines()), 3)
+        self.assertTrue(buffer.lines()[-1].endswith("[WARNING] careful"))
+        self.assertEqual(len(buffer.lines(logging.WARNING)), 1)
+        # Pending lines are handed out once
+        self.assertEqual(len(buffer.take_pending()), 3)
+        self.assertEqual(buffer.take_pending(), [])
+        self.logger.info("later")
+        self.assertEqual(buffer.take_pending(logging.WARNING), [])
+
+    def test_file_sink_writes_json_lines(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "logs", "app.log")
+            listener = start_file_sink(self.logger, path, max_bytes=2000, backups=2)
+            for i in range(100):
+                self.logger.info("event %d", i)
+            listener.stop()
+            for handler in listener.handlers:
+                handler.close()
+            with open(path) as f:
+                records = [json.loads(line) for line in f]
+            self.assertEqual(records[-1]['msg'], "event 99")
+            self.assertEqual(records[-1]['level'], "INFO")
+            # Rotated, keeping at most two backups
+            self.assertTrue(os.path.exists(path + ".1"))
+            self.assertFalse(os.path.exists(path + ".3"))
+
+if __name__ == '__main__':
+    unittest.main()
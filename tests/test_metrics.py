@@ -0,0 +1,51 @@
+import os
+import tempfile
+import unittest
+import urllib.request
+from src.metrics import Histogram, MetricsRegistry, TextfileWriter, start_metrics_server
+
+class TestMetrics(unittest.TestCase):
+    def test_histogram_buckets_and_quantiles(self):
+        h = Histogram("x", "help", buckets=(1, 10, 100))
+        for ms in [0.5] * 50 + [5] * 40 + [50] * 9 + [500]:
+            h.observe(ms)
+        self.assertEqual(h.counts, [50, 40, 9, 1])
+        self.assertEqual(h.count, 100)
+        self.assertEqual(h.max, 500)
+        self.assertLessEqual(h.quantile(0.5), 1)
+        self.assertTrue(10 <= h.quantile(0.95) <= 100)
+        self.assertEqual(h.quantile(1.0), 500)
+
+    def test_prometheus_text(self):
+        registry = MetricsRegistry(prefix="t")
+        registry.histogram("filter", "Filter time.").observe(2.0)
+        registry.histogram("rule_eval", "Rule time.", rule='node* "big"').observe(20.0)
+        text = registry.render()
+        self.assertIn("# TYPE t_filter_seconds histogram", text)
+        self.assertIn('t_filter_seconds_bucket{le="0.0025"} 1', text)
+        self.assertIn('t_filter_seconds_bucket{le="+Inf"} 1', text)
+        self.assertIn("t_filter_seconds_count 1", text)
+        self.assertIn('t_rule_eval_seconds_sum{rule="node* \\"big\\""} 0.02', text)
+
+    def test_exports(self):
+        registry = MetricsRegistry(prefix="t")
+        registry.histogram("tick", "Tick.").observe(1.0)
+        server = start_metrics_server(0, registry)
+        try:
+            url = registry.exports[0]
+            with urllib.request.urlopen(url) as response:
+                self.assertIn("t_tick_seconds_count 1", response.read().decode())
+        finally:
+            server.shutdown()
+            server.server_close()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "metrics.prom")
+            writer = TextfileWriter(path, interval=60, registry=registry)
+            writer.start()
+            writer.stop()
+            writer.join()
+            with open(path) as f:
+                self.assertIn("t_tick_seconds_count 1", f.read())
+
+if __name__ == '__main__':
+    unittest.main()
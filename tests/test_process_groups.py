@@ -0,0 +1,74 @@
+import unittest
+from PyQt6.QtCore import QCoreApplication, QModelIndex, Qt
+from src.process_groups import normalize_name
+from src.process_model import ProcessGroupModel
+from src.snapshot import ProcessSnapshot
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+MB = 1024 * 1024
+
+def make_snapshot():
+    return ProcessSnapshot(pids=[10, 11, 12, 20, 21, 30], names=["chrome", "Chrome.exe", "chrome", "code", "code", "init"],
+                           statuses=["running"] * 6, rss=[MB, 5 * MB, 2 * MB, 3 * MB, 3 * MB, MB],
+                           create_times=[1.0] * 6, cpu_percent=[1.0, 2.5, 0.5, 10.0, 0.0, 0.0])
+
+class TestProcessGroups(unittest.TestCase):
+    def test_normalize(self):
+        self.assertEqual(normalize_name("Chrome.EXE"), "chrome")
+        self.assertEqual(normalize_name("exe"), "exe")
+
+    def test_aggregates(self):
+        groups = make_snapshot().groups()
+        self.assertEqual(groups.names, ("chrome", "code", "init"))
+        self.assertEqual(list(groups.members[0]), [0, 1, 2])
+        self.assertEqual(list(groups.count), [3, 2, 1])
+        self.assertEqual(list(groups.total_rss), [8 * MB, 6 * MB, MB])
+        self.assertEqual(list(groups.max_rss), [5 * MB, 3 * MB, MB])
+        self.assertEqual(list(groups.total_cpu), [4.0, 10.0, 0.0])
+        self.assertEqual(list(groups.group_of), [0, 0, 0, 1, 1, 2])
+        self.assertEqual(groups.groups_of([5, 3, 4]), [1, 2])
+
+    def test_snapshot_caches_groups(self):
+        snapshot = make_snapshot()
+        self.assertIs(snapshot.groups(), snapshot.groups())
+        self.assertEqual(len(ProcessSnapshot().groups()), 0)
+
+class TestProcessGroupModel(unittest.TestCase):
+    def test_groups_and_members(self):
+        model = ProcessGroupModel()
+        model.set_snapshot(make_snapshot())
+        self.assertEqual(model.rowCount(), 3)
+        chrome = model.index(0, 0)
+        self.assertEqual(model.data(chrome), "chrome")
+        self.assertEqual(model.data(model.index(0, 2)), "3")
+        self.assertIsNone(model.data(model.index(0, 1)))
+        self.assertEqual(model.rowCount(chrome), 3)
+        member = model.index(1, 1, chrome)
+        self.assertEqual(model.data(member), "11")
+        self.assertIsNone(model.data(model.index(1, 2, chrome)))
+        self.assertEqual(model.parent(member), chrome)
+        self.assertFalse(model.parent(chrome).isValid())
+        self.assertEqual(model.rowCount(member), 0)
+        self.assertEqual(model.rows_at(chrome), [0, 1, 2])
+        self.assertEqual(model.rows_at(member), [1])
+        self.assertEqual(model.index_of(4), model.index(1, 0, model.index(1, 0)))
+
+    def test_filter_keeps_totals(self):
+        model = ProcessGroupModel()
+        model.set_snapshot(make_snapshot(), [1, 5])
+        self.assertEqual(model.rowCount(), 2)
+        chrome = model.index(0, 0)
+        self.assertEqual(model.rows_at(chrome), [1])
+        self.assertEqual(model.data(model.index(0, 3), Qt.ItemDataRole.UserRole), 8 * MB)
+        self.assertFalse(model.index_of(0).isValid())
+        self.assertFalse(model.index_of_group(1).isValid())
+
+    def test_sort(self):
+        model = ProcessGroupModel()
+        model.set_snapshot(make_snapshot())
+        model.sort(5, Qt.SortOrder.DescendingOrder)
+        self.assertEqual([model.data(model.index(i, 0)) for i in range(3)], ["code", "chrome", "init"])
+        chrome = model.index(1, 0)
+        self.assertEqual([model.data(model.index(i, 1, chrome)) for i in range(3)], ["11", "10", "12"])
+        self.assertFalse(model.index(3, 0, QModelIndex()).isValid())
@@ -0,0 +1,33 @@
+import unittest
+from PyQt6.QtCore import QCoreApplication, Qt
+from src.process_model import ProcessTableModel
+from src.snapshot import ProcessSnapshot
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+def make_snapshot():
+    return ProcessSnapshot(pids=[10, 20, 30], names=["beta", "Alpha", "gamma"],
+                           statuses=["running", "sleeping", "zombie"],
+                           rss=[3 * 1024 * 1024, 1024 * 1024, 2 * 1024 * 1024])
+
+class TestProcessTableModel(unittest.TestCase):
+    def test_rows_follow_index_layer(self):
+        model = ProcessTableModel()
+        model.set_snapshot(make_snapshot(), [2, 0])
+        self.assertEqual(model.rowCount(), 2)
+        self.assertEqual(model.process_at(0).name, "gamma")
+        self.assertEqual(model.data(model.index(1, 3)), "3.00 MB")
+
+    def test_sort_by_name_and_memory(self):
+        model = ProcessTableModel()
+        model.set_snapshot(make_snapshot())
+        model.sort(1)
+        self.assertEqual([model.process_at(r).pid for r in range(3)], [20, 10, 30])
+        model.sort(3, Qt.SortOrder.DescendingOrder)
+        self.assertEqual([model.process_at(r).pid for r in range(3)], [10, 30, 20])
+        # Sort order survives a new filter
+        model.set_rows([1, 2])
+        self.assertEqual([model.process_at(r).pid for r in range(2)], [30, 20])
+
+if __name__ == '__main__':
+    unittest.main()
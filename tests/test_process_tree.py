@@ -0,0 +1,92 @@
+import unittest
+from PyQt6.QtCore import QCoreApplication, QModelIndex, Qt
+import src.process_model as process_model
+from src.process_model import ProcessTreeModel
+from src.snapshot import ProcessSnapshot
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+MB = 1024 * 1024
+
+# 1 -> (2 -> (4, 5), 3); 6 claims parent 3 but started before it (recycled
+# pid); 7 and 8 name each other as parent
+def make_snapshot():
+    return ProcessSnapshot(pids=[1, 2, 3, 4, 5, 6, 7, 8], ppids=[0, 1, 1, 2, 2, 3, 8, 7],
+                           names=["init", "shell", "sshd", "worker", "Worker", "old", "a", "b"],
+                           statuses=["running"] * 8, rss=[MB, 2 * MB, 3 * MB, 4 * MB, 5 * MB, 6 * MB, MB, MB],
+                           create_times=[1.0, 2.0, 2.0, 3.0, 3.0, 0.5, 4.0, 4.0])
+
+class TestProcessTree(unittest.TestCase):
+    def test_index_and_aggregates(self):
+        tree = make_snapshot().tree()
+        self.assertEqual(list(tree.parents[:6]), [-1, 0, 0, 1, 1, -1])
+        self.assertEqual(tree.children_of(1), [3, 4])
+        self.assertEqual(tree.subtree_count[0], 5)
+        self.assertEqual(tree.subtree_rss[1], 11 * MB)
+        self.assertEqual(list(tree.ancestors(4)), [1, 0])
+        self.assertEqual(sorted(tree.descendants(0)), [1, 2, 3, 4])
+
+    def test_cycle_is_broken(self):
+        tree = make_snapshot().tree()
+        self.assertEqual(sorted(tree.roots), [0, 5, 6])
+        self.assertEqual(tree.subtree_count[6] + tree.subtree_count[7], 3)
+
+    def test_snapshot_caches_tree(self):
+        snapshot = make_snapshot()
+        self.assertIs(snapshot.tree(), snapshot.tree())
+
+class TestProcessTreeModel(unittest.TestCase):
+    def test_children_are_fetched_lazily(self):
+        model = ProcessTreeModel()
+        model.set_snapshot(make_snapshot())
+        root = QModelIndex()
+        self.assertEqual(model.rowCount(root), 0)
+        self.assertTrue(model.canFetchMore(root))
+        model.fetchMore(root)
+        self.assertEqual(model.rowCount(root), 3)
+        init = model.index(0, 0, root)
+        self.assertTrue(model.hasChildren(init))
+        self.assertEqual(model.rowCount(init), 0)
+        self.assertNotIn(1, model._children)
+        model.fetchMore(init)
+        shell = model.index(0, 0, init)
+        self.assertEqual(model.process_at(shell).name, "shell")
+        self.assertEqual(model.parent(shell).internalId(), 0)
+        self.assertEqual(model.data(model.index(0, 6, root)), "5")
+        self.assertEqual(model.data(model.index(0, 5, root)), "15.00 MB")
+
+    def test_fetch_in_batches(self):
+        n = 1200
+        snapshot = ProcessSnapshot(pids=range(1, n + 1), ppids=[0] + [1] * (n - 1), names=["p"] * n,
+                                   statuses=["running"] * n, rss=[0] * n, create_times=[1.0] * n)
+        model = ProcessTreeModel()
+        model.set_snapshot(snapshot)
+        parent = model.index_of(0)
+        model.fetchMore(parent)
+        self.assertEqual(model.rowCount(parent), process_model.TREE_FETCH_BATCH)
+        # Reaching a deep row fetches just far enough
+        self.assertEqual(model.index_of(n - 1).row(), n - 2)
+        self.assertEqual(model.rowCount(parent), n - 1)
+
+    def test_filter_keeps_ancestors(self):
+        model = ProcessTreeModel()
+        model.set_snapshot(make_snapshot(), [4])
+        self.assertEqual(model.visible_count(), 3)
+        index = model.index_of(4)
+        self.assertEqual(model.process_at(index).pid, 5)
+        self.assertEqual(model.rowCount(model.parent(index)), 1)
+        self.assertFalse(model.index_of(2).isValid())
+        model.set_rows(range(8))
+        self.assertEqual(model.visible_count(), 8)
+
+    def test_sort_siblings(self):
+        model = ProcessTreeModel()
+        model.set_snapshot(make_snapshot())
+        model.sort(3, Qt.SortOrder.DescendingOrder)
+        self.assertEqual(model.index_of(4).row(), 0)
+        self.assertEqual(model.index_of(3).row(), 1)
+        model.sort(5, Qt.SortOrder.DescendingOrder)
+        self.assertEqual(model.index_of(0).row(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
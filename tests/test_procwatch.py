@@ -0,0 +1,92 @@
+import subprocess
+import sys
+import threading
+import time
+import unittest
+import psutil
+from src.procwatch import ExitWatcher, LaunchWatcher
+
+def spawn():
+    return subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+
+class TestExitWatcher(unittest.TestCase):
+    def test_reports_exits_as_they_happen(self):
+        children = [spawn() for _ in range(3)]
+        watcher = ExitWatcher()
+        procs = [psutil.Process(c.pid) for c in children]
+        for p in procs:
+            watcher.add(p)
+        try:
+            procs[0].terminate()
+            procs[1].terminate()
+            gone, alive = watcher.wait(1.0)
+            self.assertEqual({p.pid for p in gone}, {children[0].pid, children[1].pid})
+            self.assertEqual(alive, [procs[2]])
+
+            gone, alive = watcher.wait(0.1)
+            self.assertEqual((gone, alive), ([], [procs[2]]))
+            procs[2].kill()
+            # Returns as soon as the last one exits, not after the timeout
+            start = time.monotonic()
+            gone, alive = watcher.wait(10.0)
+            self.assertEqual((gone, alive), ([procs[2]], []))
+            self.assertLess(time.monotonic() - start, 5.0)
+        finally:
+            watcher.close()
+            for c in children:
+                c.kill()
+                c.wait(5)
+
+    def test_discard(self):
+        child = spawn()
+        watcher = ExitWatcher()
+        proc = psutil.Process(child.pid)
+        watcher.add(proc)
+        watcher.discard(proc)
+        self.assertEqual(watcher.wait(0.1), ([], []))
+        watcher.close()
+        child.kill()
+        child.wait(5)
+
+@unittest.skipIf(sys.platform == "win32", "needs a sleep executable")
+class TestLaunchWatcher(unittest.TestCase):
+    def watch(self, force_scan=False):
+        seen = []
+        hit = threading.Event()
+        def on_match(task):
+            seen.append(task)
+            hit.set()
+        modes = []
+        watcher = LaunchWatcher(["SLEEP"], on_match, scan_interval=0.01, on_mode=modes.append)
+        if force_scan:
+            watcher._subscribe = lambda: None
+        watcher.start()
+        self.assertTrue(watcher.wait_ready())
+        self.assertEqual(modes, [watcher.mode])
+        child = subprocess.Popen(["sleep", "30"])
+        try:
+            self.assertTrue(hit.wait(5.0))
+            self.assertEqual(seen[0]['pid'], child.pid)
+            self.assertEqual(seen[0]['name'], "sleep")
+            self.assertEqual(seen[0]['create_time'], psutil.Process(child.pid).create_time())
+            watcher.check(child.pid)
+            self.assertEqual(len(seen), 1)
+        finally:
+            watcher.stop()
+            child.kill()
+            child.wait(5)
+        self.assertFalse(watcher.is_alive())
+        return watcher
+
+    def test_detects_launch(self):
+        self.assertIn(self.watch().mode, ('connector', 'pid-scan'))
+
+    def test_pid_scan_fallback(self):
+        self.assertEqual(self.watch(force_scan=True).mode, 'pid-scan')
+
+    def test_ignores_other_names(self):
+        seen = []
+        watcher = LaunchWatcher(["no-such-process-name"], seen.append)
+        watcher.check(psutil.Process().pid)
+        watcher.set_patterns([])
+        self.assertEqual(seen, [])
@@ -0,0 +1,79 @@
+import subprocess
+import sys
+import time
+import unittest
+import psutil
+from src.constants import HARD_WHITELIST
+from src.engine import KillerEngine
+from src.protection import ProtectionMatcher, parse_protection_rule
+from src.snapshot import ProcessSnapshot
+
+class TestProtection(unittest.TestCase):
+    def matcher(self, *texts):
+        return ProtectionMatcher([parse_protection_rule(t) for t in texts])
+
+    def test_parse(self):
+        self.assertEqual(parse_protection_rule(" Chrome.EXE ")[:3], ('name', 'exact', 'chrome.exe'))
+        self.assertEqual(parse_protection_rule("python*")[:2], ('name', 'glob'))
+        self.assertEqual(parse_protection_rule("re:^java")[:3], ('name', 'regex', '^java'))
+        self.assertEqual(parse_protection_rule("exe:/usr/bin/*")[:2], ('exe', 'glob'))
+        self.assertEqual(parse_protection_rule("cmdline:re:--prod")[:3], ('cmd', 'regex', '--prod'))
+        for bad in ("", "cmd:", "re:(unclosed"):
+            with self.assertRaises(ValueError):
+                parse_protection_rule(bad)
+
+    def test_name_rules(self):
+        m = self.matcher("chrome.exe", "python*.exe", "re:^java(w)?$")
+        for name in ("Chrome.exe", "python3.exe", "PYTHON.EXE", "java", "javaw"):
+            self.assertTrue(m.is_protected(name), name)
+        for name in ("chrome", "mypython.exe", "javac"):
+            self.assertFalse(m.is_protected(name), name)
+
+    def test_backreference_regex_kept_separate(self):
+        m = self.matcher("re:^a", r"re:^(\w)\1$", "re:x$")
+        self.assertTrue(m.is_protected("zz"))
+        self.assertTrue(m.is_protected("box"))
+        self.assertFalse(m.is_protected("zy"))
+
+    def test_exact_hard_whitelist(self):
+        m = ProtectionMatcher(exact=HARD_WHITELIST)
+        self.assertTrue(m.is_protected(next(iter(HARD_WHITELIST)).upper()))
+        self.assertFalse(m.needs_process)
+
+    def test_exe_and_cmdline_rules(self):
+        child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+        try:
+            proc = psutil.Process(child.pid)
+            # Popen returns after fork; wait until the child has exec'd
+            deadline = time.time() + 10
+            while "sleep" not in " ".join(proc.cmdline()) and time.time() < deadline:
+                time.sleep(0.01)
+            name, create_time = proc.name(), proc.create_time()
+            m = self.matcher("cmd:*sleep(60)*")
+            self.assertTrue(m.is_protected(name, child.pid, create_time))
+            self.assertFalse(m.is_protected(name))
+            self.assertFalse(self.matcher("cmd:*sleep(61)*").is_protected(name, child.pid, create_time))
+            self.assertTrue(self.matcher("exe:re:python").is_protected(name, child.pid, create_time))
+            # Same pid, different start time: treated as a different process
+            self.assertFalse(m.is_protected(name, child.pid, create_time + 1))
+        finally:
+            child.kill()
+            child.wait()
+
+    def test_protected_rows(self):
+        snapshot = ProcessSnapshot(pids=[1, 2, 3], names=["node", "nodemon", "bash"], statuses=["running"] * 3,
+                                   rss=[0, 0, 0], create_times=[1.0, 1.0, 1.0])
+        self.assertEqual(self.matcher("node*").protected_rows(snapshot), [0, 1])
+
+    def test_engine_rules(self):
+        engine = KillerEngine()
+        self.assertTrue(engine.add_to_whitelist("Python*"))
+        self.assertFalse(engine.add_to_whitelist("Python*"))
+        self.assertTrue(engine.is_protected("python3"))
+        with self.assertRaises(ValueError):
+            engine.add_to_whitelist("re:[")
+        self.assertTrue(engine.remove_from_whitelist("Python*"))
+        self.assertFalse(engine.is_protected("python3"))
+
+if __name__ == '__main__':
+    unittest.main()
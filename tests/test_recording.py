@@ -0,0 +1,100 @@
+import os
+import tempfile
+import unittest
+from src.recording import SnapshotReader, SnapshotRecorder
+from src.snapshot import ProcessSnapshot
+
+MB = 1024 * 1024
+
+def make_snapshot(t, pids):
+    return ProcessSnapshot(pids=pids, ppids=[1] * len(pids), names=[f"proc-{p % 3}" for p in pids],
+                           statuses=["running" if t % 2 else "sleeping"] * len(pids),
+                           rss=[(p + t) * MB for p in pids], create_times=[1000.0 + p / 7 for p in pids],
+                           cpu_times=[t * 0.1 + p for p in pids], cpu_percent=[t * 1.25] * len(pids),
+                           timestamp=100.0 + t)
+
+def frames():
+    # Processes come and go between frames, and one frame is empty
+    pid_sets = [[1, 5, 9], [1, 5, 9, 12], [5, 9, 12], [], [9, 12, 40, 2], [2, 9, 12, 40], [2, 40]]
+    return [make_snapshot(t, pids) for t, pids in enumerate(pid_sets)]
+
+def assert_same(case, a, b):
+    for column in ('pids', 'ppids', 'names', 'statuses', 'rss', 'create_times', 'cpu_times', 'cpu_percent'):
+        case.assertEqual(list(getattr(a, column)), list(getattr(b, column)), column)
+    case.assertEqual(a.timestamp, b.timestamp)
+
+class TestRecording(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".qxr")
+        os.close(fd)
+        os.remove(self.path)
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def record(self, snapshots, keyframe_interval=3):
+        recorder = SnapshotRecorder(self.path, keyframe_interval)
+        for snapshot in snapshots:
+            recorder.append(snapshot)
+        recorder.close()
+
+    def test_round_trip_in_any_order(self):
+        expected = frames()
+        self.record(expected)
+        reader = SnapshotReader(self.path)
+        self.assertEqual(len(reader), len(expected))
+        for k in [0, 1, 2, 3, 4, 5, 6, 5, 1, 6, 2, 4]:
+            assert_same(self, reader.snapshot(k), expected[k])
+        self.assertEqual(reader.strings, ["proc-1", "proc-2", "proc-0", "sleeping", "running"])
+        self.assertRaises(IndexError, reader.snapshot, len(expected))
+        reader.close()
+
+    def test_index_at(self):
+        self.record(frames())
+        reader = SnapshotReader(self.path)
+        self.assertEqual(reader.index_at(0.0), 0)
+        self.assertEqual(reader.index_at(102.5), 2)
+        self.assertEqual(reader.index_at(103.0), 3)
+        self.assertEqual(reader.index_at(1e12), 6)
+        reader.close()
+
+    def test_continue_after_truncated_frame(self):
+        expected = frames()
+        self.record(expected[:4])
+        with open(self.path, 'r+b') as f:
+            f.truncate(os.path.getsize(self.path) - 3)
+        reader = SnapshotReader(self.path)
+        self.assertEqual(len(reader), 3)
+        reader.close()
+        self.record(expected[3:])
+        reader = SnapshotReader(self.path)
+        self.assertEqual(len(reader), len(expected))
+        for k in range(len(expected)):
+            assert_same(self, reader.snapshot(k), expected[k])
+        reader.close()
+
+    def test_corrupt_frame(self):
+        self.record(frames()[:2])
+        with open(self.path, 'r+b') as f:
+            f.seek(-8, os.SEEK_END)
+            f.write(b"\xff" * 8)
+        reader = SnapshotReader(self.path)
+        self.assertEqual(len(reader), 2)
+        self.assertEqual(len(reader.snapshot(0)), 3)
+        self.assertRaises(ValueError, reader.snapshot, 1)
+        reader.close()
+
+    def test_unchanged_processes_compress(self):
+        same = [make_snapshot(0, list(range(1000))) for _ in range(10)]
+        self.record(same[:1], keyframe_interval=100)
+        keyframe = os.path.getsize(self.path)
+        os.remove(self.path)
+        self.record(same, keyframe_interval=100)
+        self.assertLess(os.path.getsize(self.path) - keyframe, keyframe)
+
+    def test_not_a_recording(self):
+        with open(self.path, 'wb') as f:
+            f.write(b"SQLite format 3\0")
+        self.assertRaises(ValueError, SnapshotReader, self.path)
+        self.assertRaises(ValueError, SnapshotRecorder, self.path)
@@ -0,0 +1,118 @@
+import datetime
+import os
+import sqlite3
+import tempfile
+import unittest
+from src.engine import KillerEngine
+from src.recurrence import make_recurring_task, parse_schedule, parse_when, resolve_targets, snapshot_targets
+from src.snapshot import ProcessSnapshot
+from src.store import StateStore
+from benchmarks.fake_psutil import FakeProcessTable
+
+def at(*args):
+    return datetime.datetime(*args).timestamp()
+
+def fires(spec, start, count=3):
+    schedule, t, out = parse_schedule(spec), start, []
+    for _ in range(count):
+        t = schedule.next_fire(t)
+        out.append(datetime.datetime.fromtimestamp(t))
+    return out
+
+class TestSchedules(unittest.TestCase):
+    def test_weekdays(self):
+        # 2026-10-16 is a Friday
+        self.assertEqual(fires("weekdays 23:00", at(2026, 10, 16, 22, 30)),
+                         [datetime.datetime(2026, 10, 16, 23), datetime.datetime(2026, 10, 19, 23),
+                          datetime.datetime(2026, 10, 20, 23)])
+        self.assertEqual(fires("0 23 * * mon-fri", at(2026, 10, 16, 23)),
+                         fires("weekdays 23:00", at(2026, 10, 16, 23)))
+
+    def test_every(self):
+        self.assertEqual(fires("every 2h", at(2026, 10, 16, 22, 30)),
+                         [datetime.datetime(2026, 10, 17, 0), datetime.datetime(2026, 10, 17, 2),
+                          datetime.datetime(2026, 10, 17, 4)])
+        schedule = parse_schedule("every 45s")
+        self.assertEqual(schedule.next_fire(90.0), 135.0)
+        self.assertEqual(schedule.next_fire(135.0), 180.0)
+
+    def test_month_and_day_fields(self):
+        self.assertEqual(fires("@monthly", at(2026, 12, 15), 2),
+                         [datetime.datetime(2027, 1, 1), datetime.datetime(2027, 2, 1)])
+        # Both day fields restricted: either one matches, as in cron
+        self.assertEqual(fires("0 12 13 * fri", at(2026, 11, 1), 3),
+                         [datetime.datetime(2026, 11, 6, 12), datetime.datetime(2026, 11, 13, 12),
+                          datetime.datetime(2026, 11, 20, 12)])
+        self.assertEqual(fires("30 9 29 feb *", at(2026, 1, 1), 1), [datetime.datetime(2028, 2, 29, 9, 30)])
+
+    def test_parse_when(self):
+        self.assertEqual(parse_when("+90s", now=1000.0), 1090.0)
+        self.assertEqual(parse_when("+2h", now=1000.0), 1000.0 + 7200)
+        self.assertRaises(ValueError, parse_when, "soon")
+
+    def test_invalid(self):
+        for spec in ("", "0 0 30 2 *", "61 * * * *", "* * *", "every 0m", "0 9 * * funday", "*/0 * * * *"):
+            with self.assertRaises(ValueError, msg=spec):
+                parse_schedule(spec)
+
+class TestRecurringTasks(unittest.TestCase):
+    def test_pop_due_rearms(self):
+        engine = KillerEngine()
+        task = engine.schedule(make_recurring_task("steam", "every 2h", at(2026, 10, 16, 22, 30)))
+        fired_at = task['deadline']
+        self.assertEqual(fired_at, at(2026, 10, 17))
+        due = engine.pop_due(fired_at + 5)
+        self.assertEqual([t['deadline'] for t in due], [fired_at])
+        self.assertIsNot(due[0], task)
+        self.assertEqual(engine.list_tasks(), [task])
+        self.assertEqual(engine.next_deadline(), at(2026, 10, 17, 2))
+        engine.cancel(task)
+        self.assertEqual(engine.pop_due(at(2030, 1, 1)), [])
+
+    def test_restore_skips_missed_runs(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "state.db")
+            engine = KillerEngine(StateStore(path))
+            engine.schedule(make_recurring_task("steam", "daily 23:00", at(2026, 10, 16, 12)))
+            engine.store.close()
+            engine = KillerEngine(StateStore(path))
+            restored, dropped = engine.restore(at(2026, 10, 20, 8))
+            self.assertEqual(dropped, [])
+            self.assertEqual(restored[0]['deadline'], at(2026, 10, 20, 23))
+            self.assertEqual(engine.store.load()[0][0]['deadline'], at(2026, 10, 20, 23))
+            engine.store.close()
+
+    def test_old_database_gains_schedule_column(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "state.db")
+            conn = sqlite3.connect(path)
+            conn.execute("CREATE TABLE tasks (id INTEGER PRIMARY KEY, pid INTEGER NOT NULL, name TEXT NOT NULL, "
+                         "create_time REAL, tree INTEGER NOT NULL DEFAULT 0, deadline REAL NOT NULL, mode TEXT, type TEXT)")
+            conn.execute("INSERT INTO tasks VALUES (1, 10, 'a', 1.0, 0, 5.0, 'Timer', NULL)")
+            conn.commit()
+            conn.close()
+            store = StateStore(path)
+            store.save_task(make_recurring_task("b", "@hourly") | {'id': 2})
+            tasks = {t['id']: t for t in store.load()[0]}
+            self.assertIsNone(tasks[1]['schedule'])
+            self.assertEqual(tasks[2]['schedule'], "@hourly")
+            store.close()
+
+    def test_targets_resolved_by_name(self):
+        table = FakeProcessTable(300)
+        expected = sorted(p.info['pid'] for p in table.processes if p.info['name'].lower() == "chrome.exe")
+        targets = resolve_targets({'id': 1, 'name': "Chrome.EXE", 'tree': True}, table.process_iter)
+        self.assertEqual(sorted(t['pid'] for t in targets), expected)
+        self.assertTrue(all(t['tree'] and t['type'] == 'recurring' for t in targets))
+        globbed = resolve_targets({'id': 1, 'name': "chrome*"}, table.process_iter)
+        self.assertGreater(len(globbed), len(targets))
+
+    def test_targets_resolved_from_snapshot(self):
+        snapshot = ProcessSnapshot([os.getpid(), 7, 8], ["python", "Chrome.exe", "bash"], ["running"] * 3,
+                                   [0, 0, 0], [1.0, 7.0, 8.0])
+        targets = snapshot_targets({'id': 1, 'name': "chrome*", 'tree': True}, snapshot)
+        self.assertEqual([(t['pid'], t['create_time'], t['tree']) for t in targets], [(7, 7.0, True)])
+        self.assertEqual(snapshot_targets({'id': 1, 'name': "python"}, snapshot), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+from src.rules import RuleEngine, parse_rule
+from src.search import SearchIndex
+from src.snapshot import ProcessSnapshot
+
+MB = 1024 * 1024
+
+def snapshot(rss):
+    return SearchIndex(ProcessSnapshot(pids=[1, 2, 3], names=["node", "Node.exe", "chrome"],
+                                       statuses=["running"] * 3, rss=rss, create_times=[1.0, 2.0, 3.0]))
+
+class TestParseRule(unittest.TestCase):
+    def test_parse(self):
+        rule = parse_rule("node* rss>4096 for 30s")
+        self.assertEqual((rule.pattern, rule.metric, rule.threshold, rule.duration), ("node*", "rss", 4096.0, 30))
+        self.assertEqual(parse_rule("* rss>100 for 5m").duration, 300)
+        self.assertEqual(parse_rule("x rss>1").duration, 0)
+        self.assertEqual(parse_rule("* cpu>95 for 5m").metric, "cpu")
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, parse_rule, "node rss<10")
+        self.assertRaises(ValueError, parse_rule, "node disk>10")
+        self.assertRaises(ValueError, parse_rule, "* on launch")
+
+    def test_launch_rule(self):
+        rule = parse_rule("Node* on launch")
+        self.assertEqual((rule.pattern, rule.metric), ("node*", "launch"))
+        engine = RuleEngine()
+        engine.set_rules([rule, parse_rule("chrome rss>1")])
+        self.assertEqual(engine.launch_patterns(), ["node*"])
+        hits = engine.evaluate(snapshot([0, 0, 0]), 0.0)
+        self.assertEqual(sorted(i for _, i in hits), [0, 1])
+        self.assertEqual(engine.evaluate(snapshot([0, 0, 0]), 1.0), [])
+
+class TestRuleEngine(unittest.TestCase):
+    def test_hysteresis(self):
+        engine = RuleEngine()
+        engine.set_rules([parse_rule("node* rss>100 for 30s")])
+        high = [200 * MB, 200 * MB, 200 * MB]
+        self.assertEqual(engine.evaluate(snapshot(high), 0.0), [])
+        self.assertEqual(engine.evaluate(snapshot(high), 20.0), [])
+        hits = engine.evaluate(snapshot(high), 30.0)
+        self.assertEqual(sorted(i for _, i in hits), [0, 1])
+        # Fires once per process, not on every tick
+        self.assertEqual(engine.evaluate(snapshot(high), 40.0), [])
+
+    def test_dropping_below_resets_the_timer(self):
+        engine = RuleEngine()
+        engine.set_rules([parse_rule("chrome rss>100 for 10s")])
+        engine.evaluate(snapshot([0, 0, 200 * MB]), 0.0)
+        engine.evaluate(snapshot([0, 0, 50 * MB]), 5.0)
+        self.assertEqual(engine.evaluate(snapshot([0, 0, 200 * MB]), 12.0), [])
+        self.assertEqual(len(engine.evaluate(snapshot([0, 0, 200 * MB]), 22.0)), 1)
+
+    def test_editing_one_rule_keeps_the_others_timers(self):
+        engine = RuleEngine()
+        node, chrome = parse_rule("node* rss>100 for 30s"), parse_rule("chrome rss>100 for 10s")
+        engine.set_rules([node, chrome])
+        high = [200 * MB, 200 * MB, 200 * MB]
+        self.assertEqual(engine.evaluate(snapshot(high), 0.0), [])
+        engine.set_rules([node, parse_rule("chrome rss>150 for 10s")])
+        hits = engine.evaluate(snapshot(high), 30.0)
+        # node* keeps its start at 0s; the edited chrome rule starts over
+        self.assertEqual(sorted(i for rule, i in hits), [0, 1])
+        self.assertEqual(len(engine.evaluate(snapshot(high), 40.0)), 1)
+        engine.set_rules([node])
+        self.assertEqual(engine.evaluate(snapshot(high), 50.0), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,30 @@
+import unittest
+from src.scheduler import DeadlineQueue
+
+class TestDeadlineQueue(unittest.TestCase):
+    def test_pops_due_tasks_in_deadline_order(self):
+        queue = DeadlineQueue()
+        tasks = [{'name': n} for n in "abc"]
+        queue.push(30.0, tasks[0])
+        queue.push(10.0, tasks[1])
+        queue.push(20.0, tasks[2])
+        self.assertEqual(queue.next_deadline(), 10.0)
+        self.assertEqual(queue.pop_due(25.0), [tasks[1], tasks[2]])
+        self.assertEqual(queue.next_deadline(), 30.0)
+        self.assertEqual(len(queue), 1)
+
+    def test_cancel_and_reschedule(self):
+        queue = DeadlineQueue()
+        a, b = {'name': 'a'}, {'name': 'b'}
+        queue.push(1.0, a)
+        queue.push(2.0, b)
+        queue.cancel(a)
+        self.assertNotIn(a, queue)
+        self.assertEqual(queue.next_deadline(), 2.0)
+        queue.push(5.0, b)
+        self.assertEqual(queue.pop_due(4.0), [])
+        self.assertEqual(queue.pop_due(5.0), [b])
+        self.assertIsNone(queue.next_deadline())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+from src.search import SearchIndex, parse_query, narrows
+from src.snapshot import ProcessSnapshot
+
+MB = 1024 * 1024
+
+SNAPSHOT = ProcessSnapshot(
+    pids=[100, 200, 300, 412, 500],
+    names=["chrome.exe", "Chrome.exe", "code.exe", "python3", "defunct"],
+    statuses=["running", "sleeping", "running", "sleeping", "zombie"],
+    rss=[800 * MB, 200 * MB, 600 * MB, 50 * MB, 0])
+
+class TestQueryParsing(unittest.TestCase):
+    def test_term_kinds(self):
+        kinds = [t.kind for t in parse_query("chrome pid:12 mem>500 cpu>=50 status:zombie /^py/")]
+        self.assertEqual(kinds, ['text', 'pid', 'mem', 'cpu', 'status', 'regex'])
+
+    def test_narrowing(self):
+        self.assertTrue(narrows(parse_query("chrom"), parse_query("chr")))
+        self.assertTrue(narrows(parse_query("chr mem>600"), parse_query("chr mem>500")))
+        self.assertFalse(narrows(parse_query("mem<600"), parse_query("mem<500")))
+        self.assertFalse(narrows(parse_query("pid:12"), parse_query("pid:1")))
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = SearchIndex(SNAPSHOT)
+
+    def test_substring_is_case_insensitive(self):
+        self.assertEqual(self.index.search("chrome"), [0, 1])
+        self.assertEqual(self.index.search("e.e"), [0, 1, 2])
+
+    def test_pid_text_and_filters(self):
+        self.assertEqual(self.index.search("41"), [3])
+        self.assertEqual(self.index.search("pid:300"), [2])
+        self.assertEqual(self.index.search("mem>500"), [0, 2])
+        self.assertEqual(self.index.search("status:zombie"), [4])
+        self.assertEqual(self.index.search("/^c.*e$/ mem<700"), [1, 2])
+
+    def test_narrowed_query_reuses_previous_results(self):
+        self.index.search("chr")
+        self.assertEqual(self.index.search("chrome mem>300"), [0])
+        self.assertEqual(self.index.search(""), range(5))
+
+    def test_predicate_matches_search(self):
+        match = self.index.predicate("exe mem>100")
+        self.assertEqual([i for i in range(5) if match(i)], self.index.search("exe mem>100"))
+
+if __name__ == '__main__':
+    unittest.main()
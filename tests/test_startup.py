@@ -0,0 +1,32 @@
+import os
+import tempfile
+import unittest
+from src.startup import StartupProfiler
+
+class TestStartupProfiler(unittest.TestCase):
+    def test_report_lists_every_phase(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "startup.txt")
+            profiler = StartupProfiler()
+            profiler.enable(path)
+            profiler.mark("imports")
+            profiler.mark("first process list")
+            profiler.report()
+            with open(path) as f:
+                text = f.read()
+            # One line per phase after the heading, timed from process start
+            phases = [line[2:30].strip() for line in text.splitlines()[2:]]
+            self.assertEqual(phases, ["python ready", "imports", "first process list"])
+            # Reported once, even if asked again
+            os.remove(path)
+            profiler.report()
+            self.assertFalse(os.path.exists(path))
+
+    def test_disabled_profiler_records_nothing(self):
+        profiler = StartupProfiler()
+        profiler.mark("imports")
+        profiler.report()
+        self.assertEqual(profiler.marks, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+import psutil
+from src.engine import KillerEngine
+from src.store import StateStore
+
+class TestStateStore(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "state.db")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def reopen(self, engine):
+        engine.store.close()
+        return KillerEngine(StateStore(self.path))
+
+    def test_changes_survive_restart(self):
+        engine = KillerEngine(StateStore(self.path))
+        engine.add_to_whitelist("Foo.exe")
+        engine.add_to_whitelist("bar.exe")
+        engine.remove_from_whitelist("bar.exe")
+        now = time.time()
+        keep = engine.schedule({'pid': 10, 'name': 'a', 'deadline': now + 60, 'tree': True, 'mode': 'Timer'})
+        drop = engine.schedule({'pid': 11, 'name': 'b', 'deadline': now + 120})
+        engine.cancel(drop)
+
+        engine = self.reopen(engine)
+        restored, dropped = engine.restore(now)
+        self.assertEqual(engine.user_whitelist, {"foo.exe"})
+        self.assertEqual([t['id'] for t in restored], [keep['id']])
+        self.assertEqual(restored[0]['tree'], True)
+        self.assertEqual(restored[0]['mode'], 'Timer')
+        self.assertEqual(engine.next_deadline(), keep['deadline'])
+        # New ids never collide with restored ones
+        self.assertGreater(engine.schedule({'pid': 12, 'name': 'c', 'deadline': now})['id'], keep['id'])
+        self.assertEqual(dropped, [])
+
+    def test_fired_tasks_are_removed(self):
+        engine = KillerEngine(StateStore(self.path))
+        engine.schedule({'pid': 10, 'name': 'a', 'deadline': 100.0})
+        self.assertEqual(len(engine.pop_due(200.0)), 1)
+        engine = self.reopen(engine)
+        self.assertEqual(engine.restore(200.0), ([], []))
+
+    def test_overdue_tasks_are_revalidated(self):
+        child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+        try:
+            create_time = psutil.Process(child.pid).create_time()
+            engine = KillerEngine(StateStore(self.path))
+            alive = engine.schedule({'pid': child.pid, 'name': 'sleeper', 'create_time': create_time, 'deadline': 100.0})
+            reused = engine.schedule({'pid': child.pid, 'name': 'old', 'create_time': create_time - 50, 'deadline': 100.0})
+            engine = self.reopen(engine)
+            restored, dropped = engine.restore(200.0)
+            self.assertEqual([t['id'] for t in restored], [alive['id']])
+            self.assertEqual([t['id'] for t in dropped], [reused['id']])
+            self.assertEqual([t['id'] for t in engine.pop_due(200.0)], [alive['id']])
+            # Dropped tasks are gone from disk as well
+            self.assertEqual(engine.store.load()[0], [])
+            engine.store.close()
+        finally:
+            child.kill()
+            child.wait()
+
+if __name__ == '__main__':
+    unittest.main()